@@ -0,0 +1,58 @@
+"""
+Recall and latency of the IVF index against brute force search.
+Catalog is grown from skills_config.json embeddings with gaussian noise, queries are noisy copies of catalog vectors.
+
+Run: python -m benchmarks.ann_recall [catalog sizes...]
+"""
+import sys
+
+import numpy as np
+
+from core.skill.storage import SkillsConfigStorage
+from text_to_command.ann import ExactIndex, IVFIndex, get_recall_report
+
+
+def load_embeddings(config_file: str = "skills_config.json") -> np.ndarray:
+    config = SkillsConfigStorage(config_file).load()
+    return np.asarray([
+        unit.embedding
+        for skill in config
+        for indexed_data in [skill.indexed_data, *[f.indexed_data for f in skill.functions.values()]]
+        if indexed_data for unit in indexed_data.embeddings
+    ], dtype=np.float32)
+
+
+def grow_catalog(embeddings: np.ndarray, size: int, noise: float = 0.5, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = embeddings[rng.integers(len(embeddings), size=size)]
+    return base + noise * base.std() * rng.normal(size=base.shape).astype(np.float32)
+
+
+def main(sizes):
+    embeddings = load_embeddings()
+    rng = np.random.default_rng(1)
+
+    print(f"{'size':>8} {'n_probe':>8} {'recall@10':>10} {'ivf, ms':>10} {'exact, ms':>10}")
+    for size in sizes:
+        catalog = grow_catalog(embeddings, size)
+        keys = [str(i) for i in range(size)]
+        queries = catalog[rng.integers(size, size=200)] + 0.1 * rng.normal(size=(200, catalog.shape[1]))
+
+        exact = ExactIndex(catalog.shape[1])
+        exact.add(keys, catalog)
+
+        ivf = IVFIndex(catalog.shape[1], n_lists=max(1, int(np.sqrt(size))))
+        ivf.train(catalog)
+        ivf.add(keys, catalog)
+
+        for n_probe in (1, 4, 8, 16, 32):
+            if n_probe > ivf.n_lists:
+                break
+            ivf.n_probe = n_probe
+            report = get_recall_report(ivf, exact, queries, k=10)
+            print(f"{size:>8} {n_probe:>8} {report['recall']:>10.3f} "
+                  f"{report['latency'] * 1000:>10.3f} {report['reference_latency'] * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 50000])
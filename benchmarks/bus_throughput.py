@@ -0,0 +1,108 @@
+"""
+Message bus throughput: two applications pass a message back and forth through the controller, each hop
+is dispatched, queued, routed to the command and its response is sent back through the bus.
+
+Run: python -m benchmarks.bus_throughput [hops]
+"""
+import logging
+import sys
+from time import perf_counter
+from typing import Dict, Callable, Optional
+
+from core.application.application import Application
+from core.application.function import Function, CommandResponse
+from core.communication.callback import Callback
+from core.communication.command_identifier import CommandIdentifier, ApplicationType
+from core.communication.connection import SyncConnection
+from core.communication.connection_service import ConnectionService
+from core.communication.message import Message
+from core.controller.controller import Controller
+
+
+class BounceFunction(Function):
+    hops: int
+    other: str
+    on_done: Callable[[], None]
+
+    def __init__(self, hops: int, other: str, on_done: Callable[[], None]):
+        self.hops = hops
+        self.other = other
+        self.on_done = on_done
+        super().__init__()
+
+    def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
+        return {
+            "main": self._bounce
+        }
+
+    def _bounce(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
+        if payload['hop'] >= self.hops:
+            self.on_done()
+            return
+        return CommandResponse(
+            payload={"hop": payload['hop'] + 1, "query": payload['query']},
+            context={},
+            target=CommandIdentifier(ApplicationType.CORE, self.other, "bounce", "main")
+        )
+
+
+class BounceApplication(Application):
+    hops: int
+    other: str
+    on_done: Callable[[], None]
+
+    def __init__(self, id: str, other: str, hops: int, on_done: Callable[[], None]):
+        self.hops = hops
+        self.other = other
+        self.on_done = on_done
+        super().__init__(id, ApplicationType.CORE)
+
+    def _init_functions(self) -> Dict[str, Function]:
+        return {
+            "bounce": BounceFunction(self.hops, self.other, self.on_done)
+        }
+
+    def setup(self, connection_service: ConnectionService):
+        self._connection = SyncConnection(self._on_event)
+        connection_service.add_connection(self.application_type, self.id, self._connection)
+
+
+class BenchmarkController(Controller):
+    hops: int
+    done: bool
+    elapsed: float
+
+    def __init__(self, hops: int):
+        self.hops = hops
+        self.done = False
+        super().__init__({}, {
+            "Ping": BounceApplication("Ping", "Pong", hops, self._on_done),
+            "Pong": BounceApplication("Pong", "Ping", hops, self._on_done)
+        })
+
+    def _on_done(self):
+        self.done = True
+
+    def _start_event_loop(self):
+        started = perf_counter()
+        self._connection_service.dispatch(Message(
+            payload={"hop": 0, "query": {"raw": "send mail", "cleared": "send mail"}},
+            target=CommandIdentifier(ApplicationType.CORE, "Ping", "bounce", "main"),
+            source=None,
+            context={}
+        ))
+        while not self.done:
+            self._scheduler.run_once(timeout=0)
+        self.elapsed = perf_counter() - started
+
+
+def main(hops: int = 100000):
+    logging.disable(logging.ERROR)  # there is no UI to wake up
+    controller = BenchmarkController(hops)
+    controller.setup()
+    print(f"{hops} hops in {controller.elapsed:.2f}s: {hops / controller.elapsed:.0f} messages/s, "
+          f"{controller.elapsed / hops * 1e6:.1f} us/message")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,73 @@
+"""
+Size and encode / decode throughput of messages with embeddings in the JSON and the binary codec.
+Messages: an indexed query (300-d embedding), a batch of 64 indexed queries and a TextToCommand index
+load with 200 entities of 2 embeddings each, all with float32 array embeddings as they are sent in-process.
+
+Run: python -m benchmarks.codec
+"""
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+
+from core.communication.codec import BinaryCodec, JsonCodec, MessageCodec
+from core.communication.command_identifier import CommandIdentifier, ApplicationType
+from core.communication.context_scope import ContextScope
+from core.communication.message import Message
+
+DIM = 300
+
+
+def get_messages(rng: np.random.Generator) -> dict:
+    def get_query(i: int) -> dict:
+        return {"raw": f"query {i}", "cleared": f"query {i}", "embedding": rng.normal(size=DIM).astype(np.float32)}
+
+    target = CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "main")
+    source = CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "main")
+    context = {ContextScope("UserQueryProcessing", "processUserQueryFunction"): {"query_id": 1}}
+    return {
+        "query": Message({"query": get_query(0), "index_version": 1}, target, source, context),
+        "batch of 64": Message({"queries": [get_query(i) for i in range(64)], "index_version": 1}, target, source, {}),
+        "index of 200": Message({"version": 1, "entities": {
+            f"skill.function-{i}": {"exact": [], "embeddings": [
+                {"weight": 0.5, "embedding": rng.normal(size=DIM).astype(np.float32)} for _ in range(2)
+            ]} for i in range(200)
+        }}, target, source, {})
+    }
+
+
+def measure(function: Callable[[], object], min_time: float = 0.5) -> float:
+    """Calls per second"""
+    calls = 0
+    start = perf_counter()
+    while perf_counter() - start < min_time:
+        function()
+        calls += 1
+    return calls / (perf_counter() - start)
+
+
+def check_round_trip(codec: MessageCodec, message: Message):
+    decoded = codec.decode(codec.encode(message))
+    assert str(decoded.target) == str(message.target) and decoded.context == message.context
+    embedding = decoded.payload.get("query", {}).get("embedding")
+    if embedding is not None:
+        assert np.allclose(embedding, message.payload["query"]["embedding"])
+
+
+def main():
+    messages = get_messages(np.random.default_rng(0))
+    print(f"{'message':>14} {'codec':>7} {'size, KB':>9} {'encode/s':>10} {'decode/s':>10} {'round trip/s':>13}")
+    for name, message in messages.items():
+        for codec_name, codec in [("json", JsonCodec()), ("binary", BinaryCodec())]:
+            check_round_trip(codec, message)
+            encoded = codec.encode(message)
+            size = len(encoded.encode() if isinstance(encoded, str) else encoded)
+            encode_rate = measure(lambda: codec.encode(message))
+            decode_rate = measure(lambda: codec.decode(encoded))
+            round_trip_rate = measure(lambda: codec.decode(codec.encode(message)))
+            print(f"{name:>14} {codec_name:>7} {size / 1024:>9.1f} {encode_rate:>10.0f} {decode_rate:>10.0f} "
+                  f"{round_trip_rate:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
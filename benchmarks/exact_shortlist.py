@@ -0,0 +1,85 @@
+"""
+Latency and result stability of trigram shortlisting of exact-match variants for growing catalogs.
+Entity names and tags are generated from snips vocabulary, queries are names with typos and snips texts.
+
+Run: python -m benchmarks.exact_shortlist [catalog sizes...]
+"""
+import random
+import sys
+from time import perf_counter
+from typing import List
+
+import pandas as pd
+
+from core.module.impl.text_to_command.rating import RatingIndex
+from core.skill.index import IndexData, ExactWeightedUnit
+from text_to_command.indexer import Indexer
+
+
+class FullRatingIndex(RatingIndex):
+    exact_shortlist_limit = sys.maxsize
+
+
+class ShortlistedRatingIndex(RatingIndex):
+    exact_shortlist_limit = 0
+
+
+def get_vocabulary() -> List[str]:
+    texts = pd.read_csv("test_data/snips/train.csv")['text']
+    return sorted({word for text in texts for word in Indexer.clear_string(text).split(" ") if len(word) > 2})
+
+
+def get_catalog(vocabulary: List[str], size: int, rng: random.Random) -> dict:
+    def phrase(max_words: int):
+        return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, max_words)))
+
+    return {
+        f"entity-{i}": IndexData(exact=[
+            ExactWeightedUnit(weight=0.6, variants=[phrase(3)]),
+            ExactWeightedUnit(weight=0.4, variants=[phrase(2) for _ in range(rng.randint(1, 4))]),
+        ], embeddings=[]) for i in range(size)
+    }
+
+
+def add_typo(s: str, rng: random.Random) -> str:
+    i = rng.randrange(len(s))
+    return s[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + s[i + 1:]
+
+
+def measure(rating_index: RatingIndex, queries: List[str]):
+    start = perf_counter()
+    ratings = [rating_index.get_rating(q, None) for q in queries]
+    return ratings, (perf_counter() - start) / len(queries)
+
+
+def main(sizes: List[int]):
+    rng = random.Random(0)
+    vocabulary = get_vocabulary()
+    snips_queries = [Indexer.clear_string(t) for t in pd.read_csv("test_data/snips/test.csv")['text'][:100]]
+
+    print(f"{'entities':>9} {'variants':>9} {'queries':>8} {'full, ms':>9} {'shortlist, ms':>14} "
+          f"{'top-1 same':>11} {'top-5 overlap':>14}")
+    for size in sizes:
+        catalog = get_catalog(vocabulary, size, rng)
+        variants_count = sum(len(unit.variants) for indexed_data in catalog.values() for unit in indexed_data.exact)
+        names = [indexed_data.exact[0].variants[0] for indexed_data in catalog.values()]
+        queries_groups = {
+            "typos": [add_typo(rng.choice(names), rng) for _ in range(100)],
+            "snips": snips_queries
+        }
+
+        full = FullRatingIndex(catalog)
+        shortlisted = ShortlistedRatingIndex(catalog)
+
+        for group, queries in queries_groups.items():
+            full_ratings, full_latency = measure(full, queries)
+            shortlisted_ratings, shortlisted_latency = measure(shortlisted, queries)
+
+            same_top = sum(list(f)[:1] == list(s)[:1] for f, s in zip(full_ratings, shortlisted_ratings))
+            overlap = sum(len(set(f) & set(s)) for f, s in zip(full_ratings, shortlisted_ratings))
+            print(f"{size:>9} {variants_count:>9} {group:>8} {full_latency * 1000:>9.2f} "
+                  f"{shortlisted_latency * 1000:>14.2f} {same_top / len(queries):>11.3f} "
+                  f"{overlap / (5 * len(queries)):>14.3f}")
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,116 @@
+"""
+PCA projection of embeddings: fitting for the runtime and F1 / latency / memory report for several component counts.
+
+fit: embeds skills config call examples (plus texts of optional csv files with a text column), fits the projection
+on them together with the stored catalog embeddings and saves it next to the index:
+    python -m benchmarks.projection fit 64 [--texts test_data/snips/train.csv] [--vectors store path]
+report: each snips / atis train query is an entity with a single embedding unit, the intent of the top rated
+entity is the prediction, the projection is fitted on train queries:
+    python -m benchmarks.projection report [64 128 ...] [--vectors store path]
+Without vectors store path texts are embedded with en_core_web_md.
+"""
+import argparse
+from time import perf_counter
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.quantization import get_model, embed
+from core.module.impl.text_to_command.rating import RatingIndex
+from core.skill.index import IndexData, EmbeddingWeightedUnit
+from core.skill.storage import SkillsConfigStorage
+from text_to_command.indexer import Indexer
+from text_to_command.projection import Projection
+
+
+def fit(n_components: int, texts_files: List[str], vectors_file: Optional[str], config_file: str, output: str):
+    indexer = Indexer(get_model(vectors_file))
+    config = SkillsConfigStorage(config_file).load()
+
+    vectors = [
+        unit.embedding
+        for skill in config
+        for indexed_data in [skill.indexed_data, *[f.indexed_data for f in skill.functions.values()]]
+        if indexed_data for unit in indexed_data.embeddings
+    ]
+    texts = [example for skill in config for f in skill.functions.values() for example in f.call_examples]
+    for texts_file in texts_files:
+        texts.extend(pd.read_csv(texts_file)['text'].tolist())
+    vectors.extend(e for e in embed(indexer, texts) if e is not None)
+
+    projection = Projection.fit(np.asarray(vectors, dtype=np.float32), n_components)
+    projection.save(output)
+    print(f"Projection to {n_components} components fitted on {len(vectors)} embeddings, "
+          f"explained variance {projection.explained_variance_ratio.sum():.3f}, saved to {output}.")
+
+
+def get_f1_macro(expected: np.ndarray, predicted: np.ndarray) -> float:
+    scores = []
+    for label in np.unique(expected):
+        true_positive = np.sum((predicted == label) & (expected == label))
+        precision = true_positive / max(np.sum(predicted == label), 1)
+        recall = true_positive / max(np.sum(expected == label), 1)
+        scores.append(2 * precision * recall / (precision + recall) if true_positive else 0.)
+    return float(np.mean(scores))
+
+
+def report(components_counts: List[int], vectors_file: Optional[str]):
+    indexer = Indexer(get_model(vectors_file))
+    print(f"{'dataset':>8} {'components':>11} {'variance':>9} {'memory, MB':>11} {'f1 micro':>9} {'f1 macro':>9} "
+          f"{'ms/query':>9}")
+    for dataset in ["snips", "atis"]:
+        train = pd.read_csv(f"test_data/{dataset}/train.csv")
+        test = pd.read_csv(f"test_data/{dataset}/test.csv")
+        train_embeddings = embed(indexer, train['text'].tolist())
+        known = [i for i, e in enumerate(train_embeddings) if e is not None]
+        train_vectors = np.asarray([train_embeddings[i] for i in known], dtype=np.float32)
+        test_vectors = np.asarray([
+            e if e is not None else np.zeros(train_vectors.shape[1]) for e in embed(indexer, test['text'].tolist())
+        ], dtype=np.float32)
+        intents = train['intent'].values[known]
+        expected = test['intent'].values
+
+        for n_components in [None, *components_counts]:
+            projection = Projection.fit(train_vectors, n_components) if n_components else None
+            index_vectors = projection.transform(train_vectors) if projection else train_vectors
+            queries = projection.transform(test_vectors) if projection else test_vectors
+
+            rating_index = RatingIndex({
+                str(i): IndexData(exact=[], embeddings=[EmbeddingWeightedUnit(1., vector)])
+                for i, vector in enumerate(index_vectors)
+            })
+            start = perf_counter()
+            ratings = [rating_index.get_rating("", query, limit=1) for query in queries]
+            latency = (perf_counter() - start) / len(queries)
+            predicted = np.asarray([intents[int(next(iter(rating)))] for rating in ratings])
+
+            variance = projection.explained_variance_ratio.sum() if projection else 1.
+            print(f"{dataset:>8} {n_components or train_vectors.shape[1]:>11} {variance:>9.3f} "
+                  f"{rating_index._embeddings.nbytes / 2 ** 20:>11.1f} {np.mean(predicted == expected):>9.3f} "
+                  f"{get_f1_macro(expected, predicted):>9.3f} {latency * 1000:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", help="memory-mapped vectors store used instead of en_core_web_md")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit_parser = commands.add_parser("fit")
+    fit_parser.add_argument("n_components", type=int)
+    fit_parser.add_argument("--texts", nargs="*", default=[], help="csv files with extra texts to fit on")
+    fit_parser.add_argument("--config", default="skills_config.json")
+    fit_parser.add_argument("--output", default="skills_config.projection.npz")
+
+    report_parser = commands.add_parser("report")
+    report_parser.add_argument("components", type=int, nargs="*", default=[16, 32, 64, 128, 200])
+
+    args = parser.parse_args()
+    if args.command == "fit":
+        fit(args.n_components, args.texts, args.vectors, args.config, args.output)
+    else:
+        report(args.components, args.vectors)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Accuracy, latency and embeddings memory of the rating index with quantized embeddings on snips and atis.
+Each train query is an entity with a single embedding unit, the intent of the top rated entity is the prediction.
+int8 is measured with and without full precision re-ranking.
+
+Run: python -m benchmarks.quantization [vectors store path]
+Without vectors store path queries are embedded with en_core_web_md.
+"""
+import sys
+from time import perf_counter
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.module.impl.text_to_command.rating import RatingIndex
+from core.skill.index import IndexData, EmbeddingWeightedUnit
+from text_to_command.indexer import Indexer
+from text_to_command.vectors_store import MmapWordVectors
+
+
+class NotRerankedRatingIndex(RatingIndex):
+    rerank_candidates = 0
+
+
+def get_model(vectors_file: Optional[str]) -> Any:
+    if vectors_file:
+        return MmapWordVectors(vectors_file)
+    import spacy
+    return spacy.load("en_core_web_md")
+
+
+def embed(indexer: Indexer, texts: List[str]) -> List[list]:
+    return [
+        embedding.tolist() if embedding is not None else None
+        for embedding in indexer.get_embeddings([Indexer.clear_string(t) for t in texts])
+    ]
+
+
+def evaluate(rating_index: RatingIndex, intents: np.ndarray, queries: List[list], expected: np.ndarray):
+    start = perf_counter()
+    ratings = [rating_index.get_rating("", q, limit=1) for q in queries]
+    latency = (perf_counter() - start) / len(queries)
+
+    start = perf_counter()
+    rating_index.get_ratings([""] * len(queries), queries, limit=1)
+    batch_latency = (perf_counter() - start) / len(queries)
+
+    predicted = np.asarray([intents[int(next(iter(rating)))] if rating else None for rating in ratings])
+    return float(np.mean(predicted == expected)), latency, batch_latency
+
+
+def main(vectors_file: Optional[str] = None):
+    indexer = Indexer(get_model(vectors_file))
+    print(f"{'dataset':>8} {'embeddings':>18} {'memory, MB':>11} {'accuracy':>9} {'ms/query':>9} {'ms/query batch':>15}")
+    for dataset in ["snips", "atis"]:
+        train = pd.read_csv(f"test_data/{dataset}/train.csv")
+        test = pd.read_csv(f"test_data/{dataset}/test.csv")
+        config = {
+            str(i): IndexData(exact=[], embeddings=[EmbeddingWeightedUnit(1., embedding)])
+            for i, embedding in enumerate(embed(indexer, train['text'].tolist())) if embedding is not None
+        }
+        queries = embed(indexer, test['text'].tolist())
+        intents = train['intent'].values
+
+        for name, rating_index in [
+            ("float32", RatingIndex(config)),
+            ("float16", RatingIndex(config, embeddings_dtype="float16")),
+            ("int8", RatingIndex(config, embeddings_dtype="int8")),
+            ("int8, no re-rank", NotRerankedRatingIndex(config, embeddings_dtype="int8")),
+        ]:
+            quantized = rating_index._quantized
+            memory = quantized.nbytes if quantized is not None else rating_index._embeddings.nbytes
+            accuracy, latency, batch_latency = evaluate(rating_index, intents, queries, test['intent'].values)
+            print(f"{dataset:>8} {name:>18} {memory / 2 ** 20:>11.1f} {accuracy:>9.3f} "
+                  f"{latency * 1000:>9.3f} {batch_latency * 1000:>15.3f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,81 @@
+"""
+Snips intent accuracy, load time and size of memory-mapped word vector stores against the full spaCy model.
+Intents are predicted by the nearest centroid of train query embeddings. Stores are exported from en_core_web_md
+in every precision, pruned ones keep the skills config terms and the most frequent words.
+
+Run: python -m benchmarks.vectors_store [top_n...]
+"""
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+from typing import Any, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+import spacy
+
+from text_to_command.indexer import Indexer
+from text_to_command.vectors_store import DTYPES, export_spacy_vectors, get_vectors_files, MmapWordVectors, tokenize
+
+
+def get_skill_terms(config_file: str = "skills_config.json") -> Set[str]:
+    """Tokens of the skills config texts, read without loading (and migrating) the config"""
+    with open(config_file) as f:
+        data = json.load(f)
+    texts = []
+    for skill in data['skills'] if isinstance(data, dict) else data:
+        texts.extend([skill['name'], skill['description'], *skill['tags']])
+        for function in skill['functions']:
+            texts.extend([function['name'], function['description'], *function['call_examples']])
+    return {token for text in texts for token in tokenize(Indexer.clear_string(text))}
+
+
+def get_accuracy(model: Any, train: pd.DataFrame, test: pd.DataFrame) -> float:
+    indexer = Indexer(model)
+
+    def embed(texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(indexer.get_embeddings([Indexer.clear_string(t) for t in texts]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    train_vectors = embed(train['text'].tolist())
+    intents = sorted(train['intent'].unique())
+    centroids = np.asarray([train_vectors[(train['intent'] == intent).values].mean(axis=0) for intent in intents])
+    predicted = np.argmax(embed(test['text'].tolist()) @ centroids.T, axis=1)
+    return float(np.mean(np.asarray(intents)[predicted] == test['intent'].values))
+
+
+def get_size(path: str) -> int:
+    return sum(os.path.getsize(f) for f in get_vectors_files(path).values() if os.path.exists(f))
+
+
+def main(top_ns: List[Optional[int]]):
+    train = pd.read_csv("test_data/snips/train.csv")
+    test = pd.read_csv("test_data/snips/test.csv")
+
+    start = perf_counter()
+    nlp = spacy.load("en_core_web_md")
+    print(f"{'backend':>24} {'rows':>8} {'size, MB':>9} {'load, ms':>9} {'accuracy':>9}")
+    print(f"{'spacy en_core_web_md':>24} {len(nlp.vocab.vectors):>8} {'':>9} "
+          f"{(perf_counter() - start) * 1000:>9.1f} {get_accuracy(nlp, train, test):>9.3f}")
+
+    skill_terms = get_skill_terms()
+    with tempfile.TemporaryDirectory() as directory:
+        for top_n in top_ns:
+            for dtype in DTYPES:
+                path = os.path.join(directory, f"{dtype}-{top_n}")
+                rows = export_spacy_vectors(nlp, path, dtype=dtype, keep_words=skill_terms, top_n=top_n)
+
+                start = perf_counter()
+                store = MmapWordVectors(path)
+                load_time = perf_counter() - start
+
+                name = f"{dtype}, top {top_n or 'all'}"
+                print(f"{name:>24} {rows:>8} {get_size(path) / 2 ** 20:>9.1f} {load_time * 1000:>9.1f} "
+                      f"{get_accuracy(store, train, test):>9.3f}")
+
+
+if __name__ == "__main__":
+    main([int(top_n) for top_n in sys.argv[1:]] or [None, 50000, 10000])
@@ -1,13 +1,16 @@
 import asyncio
+import importlib
+import os
 import threading
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Coroutine, NamedTuple, Optional
 
 import spacy
 import websockets
 
-from configs_main import apps_config_factory
-from controller.server import ConnectionServer, Event
-from text_to_command.configuration_units import SessionConfiguration, SystemConfiguration
+import configs_main
+from controller.server import ConnectionServer, Event, OffloadedRoute
+from core.application.execution import ExecutionPolicy
+from text_to_command.configuration_units import SessionConfiguration, SystemConfiguration, SkillsConfiguration
 from text_to_command.indexer import Indexer
 from text_to_command.intent_resolver import IntentResolver
 
@@ -15,42 +18,120 @@ indexer = Indexer(spacy.load("en_core_web_md"))
 intent_resolver = IntentResolver(indexer)
 
 
-async def user_text_command_entered(event: Event, send_event: Callable[[Event], Coroutine[Any, Any, None]]):
-    print("user_text_command_entered called")
+class ConfigurationSnapshot(NamedTuple):
+    """
+    Indexed configuration shared by all requests.
+    ---
+    It is never changed after it is built: when configs_main changes a new snapshot is built and indexed aside
+    and replaces the reference to the old one, so a request uses either the old or the new one as a whole.
+    """
+    skills: SkillsConfiguration
+    system: SystemConfiguration
+    session: SessionConfiguration
+    source_mtime: float  # modification time of configs_main the snapshot was built from
+
+
+_snapshot: Optional[ConfigurationSnapshot] = None
+_snapshot_lock = threading.Lock()  # only one snapshot is built at a time
+
+
+def build_configuration_snapshot() -> ConfigurationSnapshot:
+    source_mtime = os.path.getmtime(configs_main.__file__)
+    if _snapshot is not None and source_mtime != _snapshot.source_mtime:
+        importlib.reload(configs_main)
+
+    snapshot = ConfigurationSnapshot(
+        skills=configs_main.apps_config_factory(),
+        system=SystemConfiguration([]),
+        session=SessionConfiguration("", []),
+        source_mtime=source_mtime
+    )
+    indexer.ensure_indexed(snapshot.skills.skills)
+    indexer.ensure_indexed(snapshot.system.functions)
+    indexer.ensure_indexed(snapshot.session.functions)
+    return snapshot
+
+
+def get_configuration_snapshot() -> ConfigurationSnapshot:
+    """
+    Current snapshot, rebuilt when configs_main is changed. Pool processes check the source themselves,
+    so each of them swaps its copy on its next request.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and os.path.getmtime(configs_main.__file__) == snapshot.source_mtime:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is snapshot:  # not swapped by another thread meanwhile
+            try:
+                _snapshot = build_configuration_snapshot()
+            except Exception as e:
+                if snapshot is None:
+                    raise
+                print(f"--CONFIGURATION RELOAD ERROR--, previous snapshot is used: {e}")
+                return snapshot
+            print(f"Configuration snapshot built: {len(_snapshot.skills.skills)} skills.")
+        return _snapshot
+
+
+def resolve_command_variants(payload: dict) -> dict:
+    """CPU-bound part of USER_TEXT_COMMAND_ENTERED, runs in a pool process with its own copy of the model"""
+    snapshot = get_configuration_snapshot()
     commands = intent_resolver.resolve_intent_recommendations(
-        event.payload['user_text_command'],
-        apps_config_factory(),
-        SystemConfiguration([]), SessionConfiguration("", [])
+        payload['user_text_command'], snapshot.skills, snapshot.system, snapshot.session
     )
 
-    payload = dict(
+    variants = dict(
         items=[]
     )
     for c in sorted(commands, key=lambda x: x.score, reverse=True)[:5]:
         print(round(c.score, 3), " | ", c)
-        payload['items'].append(dict(
+        variants['items'].append(dict(
             label=c.descriptive_name
         ))
+    return variants
+
 
-    await send_event(Event("FrontEnd", "SHOW_COMMAND_VARIANTS", payload))
+async def user_text_command_entered(
+        event: Event, variants: dict, send_event: Callable[[Event], Coroutine[Any, Any, None]]
+):
+    print("user_text_command_entered called")
+    await send_event(Event("FrontEnd", "SHOW_COMMAND_VARIANTS", variants))
 
 
 routes = {
-    "USER_TEXT_COMMAND_ENTERED": user_text_command_entered
+    "USER_TEXT_COMMAND_ENTERED": OffloadedRoute(
+        compute=resolve_command_variants,
+        respond=user_text_command_entered,
+        policy=ExecutionPolicy.PROCESS,  # scoring holds the GIL, threads would still block the loop
+        max_concurrency=2
+    )
 }
 
 if __name__ == "__main__":
+    get_configuration_snapshot()  # built before the pool processes are forked, so they start with it indexed
     server = ConnectionServer(routes)
 
 
+    loop = asyncio.new_event_loop()
+
+
     def start_server():
-        loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         start_server = websockets.serve(server.on_websocket_connection, 'localhost', 4000)
         print("Server started!")
         loop.run_until_complete(start_server)
-        loop.run_forever()
+        try:
+            loop.run_forever()
+        finally:
+            server.shutdown()  # pending offloaded computations are cancelled, pool processes exit
 
 
     t1 = threading.Thread(target=start_server)  # makes no sense.
     t1.start()
+    try:
+        t1.join()
+    except KeyboardInterrupt:
+        loop.call_soon_threadsafe(loop.stop)
+        t1.join()
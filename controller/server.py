@@ -1,10 +1,14 @@
+import asyncio
 import json
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from json.decoder import JSONDecodeError
-from typing import Dict, Union, Callable, Coroutine, Any
+from typing import Dict, Set, Union, Callable, Coroutine, Any
 
 from websockets import WebSocketServerProtocol, ConnectionClosed
 
+from core.application.execution import ExecutionPolicy
+
 
 @dataclass
 class Event:
@@ -31,6 +35,28 @@ class Connection:
     connection: WebSocketServerProtocol
 
 
+@dataclass
+class OffloadedRoute:
+    """
+    Route with a CPU-bound part, which is executed out of the event loop.
+    ---
+    compute(payload) runs on the thread pool or the process pool of the server (see ExecutionPolicy), with PROCESS
+    it has to be a module level function and its result picklable. Then respond(event, result, expose_event)
+    is awaited on the loop. At most max_concurrency events of the route are computed at once, the others
+    wait for their turn without blocking the loop, so other connections keep receiving frames.
+    """
+    compute: Callable[[dict], Any]
+    respond: Callable[
+        [
+            Event,
+            Any,  # result of compute
+            Callable[[Event], Coroutine[Any, Any, None]]  # expose_event callback
+        ], Coroutine[Any, Any, None]
+    ]
+    policy: ExecutionPolicy = ExecutionPolicy.THREAD
+    max_concurrency: int = 1
+
+
 class ConnectionServerException(Exception):
     code: int
     reason: str
@@ -44,27 +70,77 @@ class ConnectionServerException(Exception):
 class ConnectionServer:
     connections: Dict[str, Connection]
     routes: Dict[
-        str, Callable[  # event, handler callback
-            [
-                Event,
-                Callable[[Event], Coroutine[Any, Any, None]]  # expose_event callback
-            ], Coroutine[Any, Any, None]
+        str, Union[
+            Callable[  # event, handler callback
+                [
+                    Event,
+                    Callable[[Event], Coroutine[Any, Any, None]]  # expose_event callback
+                ], Coroutine[Any, Any, None]
+            ],
+            OffloadedRoute
         ]
     ]
+    thread_pool_size: int
+    process_pool_size: int
+
+    _executors: Dict[ExecutionPolicy, Executor]
+    _semaphores: Dict[str, asyncio.Semaphore]  # concurrency limits of offloaded routes, by action
+    _pending: Set[Future]  # submitted computations, which are cancelled on shutdown unless already running
 
     def __init__(
             self,
             routes: Dict[
-                str, Callable[  # event, handler callback
-                    [
-                        Event,
-                        Callable[[Event], Coroutine[Any, Any, None]]  # expose_event callback
-                    ], Coroutine[Any, Any, None]
+                str, Union[
+                    Callable[  # event, handler callback
+                        [
+                            Event,
+                            Callable[[Event], Coroutine[Any, Any, None]]  # expose_event callback
+                        ], Coroutine[Any, Any, None]
+                    ],
+                    OffloadedRoute
                 ]
-            ]
+            ],
+            thread_pool_size: int = 4,
+            process_pool_size: int = 2
     ):
         self.connections = {}
         self.routes = routes
+        self.thread_pool_size = thread_pool_size
+        self.process_pool_size = process_pool_size
+        self._executors = {}
+        self._semaphores = {}
+        self._pending = set()
+
+    def _get_executor(self, policy: ExecutionPolicy) -> Executor:
+        if policy not in self._executors:
+            if policy == ExecutionPolicy.PROCESS:
+                self._executors[policy] = ProcessPoolExecutor(self.process_pool_size)
+            else:
+                self._executors[policy] = ThreadPoolExecutor(
+                    self.thread_pool_size, thread_name_prefix="ConnectionServerExecutor"
+                )
+        return self._executors[policy]
+
+    async def _run_offloaded(self, action: str, route: OffloadedRoute, event: Event):
+        if route.policy == ExecutionPolicy.INLINE:
+            result = route.compute(event.payload)
+        else:
+            semaphore = self._semaphores.get(action)
+            if semaphore is None:
+                semaphore = self._semaphores[action] = asyncio.Semaphore(route.max_concurrency)
+            async with semaphore:
+                future = self._get_executor(route.policy).submit(route.compute, event.payload)
+                self._pending.add(future)
+                future.add_done_callback(self._pending.discard)
+                result = await asyncio.wrap_future(future)
+        await route.respond(event, result, self.expose_event)
+
+    def shutdown(self):
+        for future in list(self._pending):
+            future.cancel()
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        self._executors = {}
 
     async def on_connection_event(self, connection: Connection, event: Event):
         # TODO: logic
@@ -73,7 +149,10 @@ class ConnectionServer:
         if not route:
             print("HANDLER NOT FOUND!")
             return
-        await route(event, self.expose_event)
+        if isinstance(route, OffloadedRoute):
+            await self._run_offloaded(event.action, route, event)
+        else:
+            await route(event, self.expose_event)
 
     async def expose_event(self, event: Event):
         await self.connections[event.target].connection.send(event.to_message())
@@ -0,0 +1,124 @@
+import importlib
+import threading
+
+import pytest
+
+pytest.importorskip("spacy")
+pytest.importorskip("en_core_web_md")  # loaded by controller.main on import
+
+import configs_main  # noqa: E402
+from controller import main  # noqa: E402
+from text_to_command.configuration_units import SkillsConfiguration, SkillConfiguration, SkillFunction  # noqa: E402
+
+
+class Source:
+    """configs_main as the snapshot sees it: its modification time and what its factory builds"""
+
+    def __init__(self, monkeypatch):
+        self.mtime = 1.
+        self.fail = False
+        self.builds = []
+        self.reloads = 0
+        self.building = 0
+        self.overlapping_builds = 0
+        self.lock = threading.Lock()
+        self.build_started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+        monkeypatch.setattr(main, "_snapshot", None)
+        monkeypatch.setattr(main.os.path, "getmtime", lambda path: self.mtime)
+        monkeypatch.setattr(importlib, "reload", self.reload)
+        monkeypatch.setattr(configs_main, "apps_config_factory", self.build)
+
+    def reload(self, module):
+        assert module is configs_main
+        self.reloads += 1
+        return module
+
+    def build(self) -> SkillsConfiguration:
+        with self.lock:
+            self.building += 1
+            self.overlapping_builds += self.building > 1
+        try:
+            self.build_started.set()
+            assert self.release.wait(5)
+            if self.fail:
+                raise SyntaxError("configs_main is being edited")
+            skills = SkillsConfiguration([SkillConfiguration(
+                id="telegram", name="Telegram", description="Telegram client.", tags=["Messenger"],
+                functions=[SkillFunction("send_message", "Send message", "Sends a message.", ["Send message"], [])]
+            )])
+            self.builds.append(skills)
+            return skills
+        finally:
+            with self.lock:
+                self.building -= 1
+
+
+@pytest.fixture
+def source(monkeypatch):
+    return Source(monkeypatch)
+
+
+def is_indexed(snapshot: main.ConfigurationSnapshot) -> bool:
+    return all(
+        skill.indexed_data and all(function.indexed_data for function in skill.functions)
+        for skill in snapshot.skills.skills
+    )
+
+
+class TestConfigurationSnapshot:
+    def test_snapshot_is_rebuilt_when_source_changes(self, source):
+        snapshot = main.get_configuration_snapshot()
+        assert main.get_configuration_snapshot() is snapshot
+        assert (len(source.builds), source.reloads) == (1, 0)
+        assert snapshot.source_mtime == 1. and is_indexed(snapshot)
+
+        source.mtime = 2.
+        rebuilt = main.get_configuration_snapshot()
+        assert rebuilt is not snapshot and rebuilt.skills is source.builds[-1]
+        assert rebuilt.source_mtime == 2. and is_indexed(rebuilt)
+        assert (len(source.builds), source.reloads) == (2, 1)
+
+    def test_previous_snapshot_is_kept_when_reload_fails(self, source):
+        snapshot = main.get_configuration_snapshot()
+
+        source.mtime, source.fail = 2., True
+        assert main.get_configuration_snapshot() is snapshot
+        assert main._snapshot is snapshot
+
+        source.fail = False  # retried on the next request, the source is still newer
+        rebuilt = main.get_configuration_snapshot()
+        assert rebuilt is not snapshot and rebuilt.source_mtime == 2.
+
+    def test_first_build_failure_is_raised(self, source):
+        source.fail = True
+        with pytest.raises(SyntaxError):
+            main.get_configuration_snapshot()
+        assert main._snapshot is None
+
+    def test_concurrent_readers_see_whole_snapshots(self, source):
+        snapshot = main.get_configuration_snapshot()
+        seen = []
+
+        def read():
+            for _ in range(50):
+                seen.append(main.get_configuration_snapshot())
+
+        source.release.clear()
+        source.build_started.clear()
+        source.mtime = 2.
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        assert source.build_started.wait(5)
+        source.release.set()
+        for reader in readers:
+            reader.join(5)
+
+        rebuilt = main._snapshot
+        assert rebuilt is not snapshot and len(seen) == 200
+        assert {id(s) for s in seen} <= {id(snapshot), id(rebuilt)}
+        assert all(is_indexed(s) and s.skills in source.builds for s in seen)
+        assert source.overlapping_builds == 0 and len(source.builds) == 2  # readers waited for one rebuild
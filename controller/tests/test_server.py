@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from typing import Tuple
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from core.application.execution import ExecutionPolicy  # noqa: E402
+from controller.server import ConnectionServer, Event, OffloadedRoute, Connection  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message: str):
+        self.sent.append(Event.from_message(message))
+
+
+async def respond(event: Event, result, expose_event):
+    await expose_event(Event(event.payload["source"], "RESULT", result))
+
+
+def get_server(route: OffloadedRoute) -> Tuple[ConnectionServer, FakeWebSocket]:
+    websocket = FakeWebSocket()
+    server = ConnectionServer({"COMPUTE": route})
+    server.connections["FrontEnd"] = Connection("FrontEnd", websocket)
+    return server, websocket
+
+
+def get_event(value: int) -> Event:
+    return Event("CONTROLLER", "COMPUTE", {"source": "FrontEnd", "value": value})
+
+
+class TestOffloadedRoute:
+    @pytest.mark.parametrize("policy", [ExecutionPolicy.INLINE, ExecutionPolicy.THREAD])
+    def test_result_is_responded(self, policy):
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def compute(payload: dict) -> dict:
+            threads.append(threading.get_ident())
+            return {"value": payload["value"] * 2}
+
+        server, websocket = get_server(OffloadedRoute(compute, respond, policy))
+        asyncio.run(server.on_connection_event(server.connections["FrontEnd"], get_event(21)))
+        server.shutdown()
+
+        assert [(e.action, e.payload) for e in websocket.sent] == [("RESULT", {"value": 42})]
+        assert (threads[0] == loop_thread) == (policy == ExecutionPolicy.INLINE)
+
+    def test_concurrency_is_limited_without_blocking_loop(self):
+        lock = threading.Lock()
+        running, max_running = [0], [0]
+
+        def compute(payload: dict) -> dict:
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            threading.Event().wait(0.05)
+            with lock:
+                running[0] -= 1
+            return payload
+
+        async def main():
+            connection = server.connections["FrontEnd"]
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.ensure_future(tick())
+            await asyncio.gather(*(server.on_connection_event(connection, get_event(i)) for i in range(4)))
+            ticker.cancel()
+            return ticks
+
+        server, websocket = get_server(OffloadedRoute(compute, respond, max_concurrency=2))
+        ticks = asyncio.run(main())
+        server.shutdown()
+
+        assert max_running[0] == 2
+        assert sorted(e.payload["value"] for e in websocket.sent) == [0, 1, 2, 3]
+        assert ticks >= 5  # the loop kept running while computations were offloaded
+
+
+class TestShutdown:
+    def test_pending_computations_are_cancelled(self):
+        started, release = threading.Event(), threading.Event()
+
+        def compute(payload: dict) -> dict:
+            started.set()
+            release.wait(5)
+            return payload
+
+        async def main():
+            connection = server.connections["FrontEnd"]
+            handled = [
+                asyncio.ensure_future(server.on_connection_event(connection, get_event(i))) for i in range(2)
+            ]
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            pending = [future for future in server._pending if not future.running()]
+
+            server.shutdown()
+            release.set()
+            results = await asyncio.gather(*handled, return_exceptions=True)
+            return pending, results
+
+        server, websocket = get_server(OffloadedRoute(compute, respond, max_concurrency=2))
+        server.thread_pool_size = 1
+        pending, results = asyncio.run(main())
+
+        assert len(pending) == 1 and pending[0].cancelled()
+        assert results[0] is None and isinstance(results[1], asyncio.CancelledError)
+        assert [e.payload["value"] for e in websocket.sent] == [0]
+        assert not server._pending and not server._executors
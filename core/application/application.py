@@ -1,34 +1,51 @@
 import logging
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Optional
+from concurrent.futures import Executor, Future
+from typing import Dict, Optional, Callable, NamedTuple
 
-from core.application.exceptions import CommandNotFound
-from core.application.function import Function
+from core.application.execution import ExecutionPolicy, get_executor, run_in_process, submit
+from core.application.function import Function, CommandResponse
 from core.communication.callback import Callback
 from core.communication.command_identifier import CommandIdentifier, ApplicationType
 from core.communication.connection import Connection
 from core.communication.connection_service import ConnectionService
+from core.communication.dispatcher import OverflowPolicy, QueuePolicy
 from core.communication.message import Message
 
 from core.communication.context_scope import ContextScope
 
 
+class CommandRoute(NamedTuple):
+    function: Function
+    handler: Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]
+    policy: ExecutionPolicy
+    executor: Optional[Executor]  # None for inline execution
+    context_scope: ContextScope
+
+
 class Application(metaclass=ABCMeta):
     """
     A group of functions, related to the same application, functionality, or etc.
     ---
     Accepts events from connection service, resolve which functions should be called.
+    Functions are executed according to their execution policy, or execution_policy of the application
+    if they don't declare one. Responses of commands executed in pools are dispatched when they complete.
+    Each command target is resolved to its route once (compile_routes at setup or on the first message),
+    so handling an event takes a single lookup.
     """
     _connection: Connection
     _functions: Dict[str, Function]
+    _routes: Dict[CommandIdentifier, CommandRoute]
 
     application_type: ApplicationType
     id: str
+    execution_policy: ExecutionPolicy = ExecutionPolicy.INLINE
 
     def __init__(self, id: str, application_type: ApplicationType):
         self.id = id
         self.application_type = application_type
         self._functions = self._init_functions()
+        self._routes = {}
 
     @abstractmethod
     def _init_functions(self) -> Dict[str, Function]:
@@ -48,7 +65,7 @@ class Application(metaclass=ABCMeta):
             target: CommandIdentifier,
             callback: Optional[Callback]
     ) -> None:
-        self._connection.send_message(Message(
+        self._connection.send(Message(
             payload=payload,
             target=target,
             source=CommandIdentifier(
@@ -56,36 +73,93 @@ class Application(metaclass=ABCMeta):
             ),
             context=context,
             callback=callback
-        ).serialize())
+        ))
+
+    def compile_routes(self) -> Dict[CommandIdentifier, QueuePolicy]:
+        """
+        Resolves the handler and the executor of each command in advance,
+        returns identifiers of the commands with the queue policies of their functions
+        """
+        for function_id, function in self._functions.items():
+            for command_id in function.commands:
+                self._compile_route(CommandIdentifier(self.application_type, self.id, function_id, command_id))
+        policies = {}
+        for target, route in self._routes.items():
+            overflow = route.function.get_overflow_policy(target.command)
+            policies[target] = QueuePolicy(
+                overflow=overflow,
+                coalesce_key=route.function.get_coalesce_key if overflow is OverflowPolicy.COALESCE else None
+            )
+        return policies
+
+    def _compile_route(self, target: CommandIdentifier) -> Optional[CommandRoute]:
+        function = self._functions.get(target.function)
+        if function is None or not function.has_command(target.command):
+            return None
+
+        policy = function.execution_policy or self.execution_policy
+        route = CommandRoute(
+            function=function,
+            handler=function.get_command(target.command),
+            policy=policy,
+            executor=get_executor(policy, function),
+            context_scope=ContextScope(application=self.id, function=target.function)
+        )
+        self._routes[target] = route
+        return route
 
     def _on_event(self, event: Message):
-        if event.target.function not in self._functions:
-            logging.error(f"No such function({event.target.function}) in the system.")
+        route = self._routes.get(event.target) or self._compile_route(event.target)
+        if route is None:
+            if event.target.function not in self._functions:
+                logging.error(f"No such function({event.target.function}) in the system.")
+            else:
+                logging.error(f"No such command {event.target.command} in function {event.target.function}.")
             return
 
-        context_scope = ContextScope(application=self.id, function=event.target.function)
-        context = event.context.get(context_scope)
+        context = event.context.get(route.context_scope)
         if context is None:
             context = {}
+            if route.function.source_context_key and event.source is not None:
+                context = {route.function.source_context_key: str(event.source)}
 
-        try:
-            self._functions[event.target.function].execute(
-                event.target.command,
-                event.payload,
-                context,
-                event.callback,
-                lambda payload, context, target, callback: self._dispatch_event(
-                    event.target.function,
-                    event.target.command,
-                    payload,
-                    {
-                        **event.context,  # IMPORTANT: context for the same command can be overwritten
-                        context_scope: context
-                    },
-                    target,
-                    callback
-                )
+        if route.executor is None:
+            response = route.handler(event.payload, context, event.callback)
+            if response:
+                self._dispatch_response(event, route, response)
+        else:
+            self._submit(event, route, context)
+
+    def _dispatch_response(self, event: Message, route: CommandRoute, response: CommandResponse):
+        self._dispatch_event(
+            event.target.function,
+            event.target.command,
+            response.payload,
+            {
+                **event.context,  # IMPORTANT: context for the same command can be overwritten
+                route.context_scope: response.context
+            },
+            response.target,
+            response.callback
+        )
+
+    def _submit(self, event: Message, route: CommandRoute, context: dict) -> None:
+        if route.policy == ExecutionPolicy.PROCESS:
+            future = submit(
+                route.executor, run_in_process, event.target.command, event.payload, context, event.callback
             )
-        except CommandNotFound:
-            logging.error(f"No such command {event.target.command} in function {event.target.function}.")
-            return
+        else:
+            future = submit(route.executor, route.handler, event.payload, context, event.callback)
+
+        def on_done(done: Future):
+            if done.cancelled():
+                return
+            if done.exception() is not None:
+                logging.error(f"Command {event.target} failed.", exc_info=done.exception())
+                return
+
+            response: Optional[CommandResponse] = done.result()
+            if response:
+                self._dispatch_response(event, route, response)
+
+        future.add_done_callback(on_done)
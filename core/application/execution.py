@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from core.application.function import Function, CommandResponse
+    from core.communication.callback import Callback
+
+thread_pool_size: int = 4
+
+
+class ExecutionPolicy(Enum):
+    """
+    Where commands of a function are executed.
+    ---
+    INLINE: in the thread that delivers the message, messages of the target are handled strictly one by one.
+    THREAD: on the thread pool shared by all functions, so long commands don't hold the delivering thread.
+    PROCESS: on a process pool dedicated to the function, for CPU-bound commands that hold the GIL.
+        The function is copied to the pool processes when they start, so it has to be picklable where processes
+        are spawned, and state it changes there is not seen by the application (and vice versa).
+    With THREAD and PROCESS several messages of the same target can be handled at once and responses can come
+    out of order, so they suit commands that only read shared state.
+    """
+    INLINE = "INLINE"
+    THREAD = "THREAD"
+    PROCESS = "PROCESS"
+
+
+_lock = threading.Lock()
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pools: Dict[int, ProcessPoolExecutor] = {}  # by id of the function
+_process_function: Optional['Function'] = None  # function a process pool worker executes commands of
+_pending: Set[Future] = set()  # submitted commands, which are cancelled on shutdown unless already running
+
+
+def get_executor(policy: ExecutionPolicy, function: 'Function') -> Optional[Executor]:
+    """Executor the function commands are submitted to, None when they are executed inline"""
+    global _thread_pool
+    if policy == ExecutionPolicy.INLINE:
+        return None
+
+    with _lock:
+        if policy == ExecutionPolicy.THREAD:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(thread_pool_size, thread_name_prefix="FunctionExecutor")
+            return _thread_pool
+
+        if id(function) not in _process_pools:
+            _process_pools[id(function)] = ProcessPoolExecutor(
+                function.process_pool_size, initializer=_init_process, initargs=(function,)
+            )
+        return _process_pools[id(function)]
+
+
+def submit(executor: Executor, fn: Callable, *args: Any) -> Future:
+    """Submits to the executor, so the command is cancelled by shutdown_executors if it hasn't started yet"""
+    future = executor.submit(fn, *args)
+    with _lock:
+        _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    return future
+
+
+def shutdown_executors() -> None:
+    global _thread_pool
+    with _lock:
+        executors = [_thread_pool, *_process_pools.values()]
+        pending = list(_pending)
+        _thread_pool = None
+        _process_pools.clear()
+    # cancelled futures run their done callbacks right away, so they are cancelled without holding the lock
+    for future in pending:
+        future.cancel()
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _init_process(function: 'Function') -> None:
+    global _process_function
+    _process_function = function
+
+
+def run_in_process(
+        command_id: str, payload: dict, context: dict, callback: Optional['Callback']
+) -> Optional['CommandResponse']:
+    """Entry point of process pool workers, executes the command of the function the worker was started for"""
+    return _process_function.run(command_id, payload, context, callback)
@@ -1,11 +1,12 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Callable, Optional, NamedTuple
+from typing import Dict, Callable, Optional, NamedTuple, List, Hashable
 
 from core.application.exceptions import CommandNotFound
+from core.application.execution import ExecutionPolicy
 from core.communication.callback import Callback
 from core.communication.command_identifier import CommandIdentifier
-
-dispatch_event_function_type = Callable[[dict, CommandIdentifier, Optional[Callback]], None]
+from core.communication.dispatcher import OverflowPolicy
+from core.communication.message import Message
 
 
 class CommandResponse(NamedTuple):
@@ -22,7 +23,18 @@ class Function(metaclass=ABCMeta):
     ---
     Accept event from the Application and resolve each command to execute. Controls lifecycle.
     To each flow should be provided an ability to dispatch event to another function (with callback if needed).
+    execution_policy declares where commands are executed (see ExecutionPolicy), by default the application's one.
+    overflow_policy declares what happens to its messages when the application queue is full (see OverflowPolicy),
+    command_overflow_policies overrides it for single commands, so only the messages that can be lost are dropped.
+    With COALESCE queued messages with the same get_coalesce_key are replaced by the latest one.
+    With source_context_key set, a message that starts a chain of the function (comes with no context for it)
+    gets its source, as a string, in the context under that key.
     """
+    execution_policy: Optional[ExecutionPolicy] = None
+    process_pool_size: int = 1  # processes of the pool with PROCESS policy
+    overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK
+    command_overflow_policies: Dict[str, OverflowPolicy] = {}
+    source_context_key: Optional[str] = None
 
     _commands: Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]
 
@@ -33,19 +45,27 @@ class Function(metaclass=ABCMeta):
     def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
         pass
 
-    def execute(
-            self,
-            command_id: str,
-            payload: dict,
-            context: dict,
-            callback: Optional[Callback],
-            dispatch_event_function: Callable[[dict, dict, CommandIdentifier, Optional[Callback]], None]
-    ) -> None:
+    @property
+    def commands(self) -> List[str]:
+        return list(self._commands.keys())
+
+    def has_command(self, command_id: str) -> bool:
+        return command_id in self._commands
+
+    def get_command(self, command_id: str) -> Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]:
         if command_id not in self._commands:
             raise CommandNotFound("No such command in the system")
+        return self._commands[command_id]
 
-        response = self._commands[command_id](payload, context, callback)
+    def get_overflow_policy(self, command_id: str) -> OverflowPolicy:
+        return self.command_overflow_policies.get(command_id, self.overflow_policy)
 
-        if response:
-            dispatch_event_function(response.payload, response.context, response.target, response.callback)
+    def get_coalesce_key(self, message: Message) -> Optional[Hashable]:
+        """Messages with the same key replace each other in the queue, None - message is never replaced"""
+        return None
 
+    def run(
+            self, command_id: str, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
+        """Executes the command and returns its response without dispatching it"""
+        return self.get_command(command_id)(payload, context, callback)
@@ -1,6 +1,5 @@
-import json
 import logging
-from typing import Dict, Callable, Optional, List
+from typing import Dict, Callable, Optional, List, Hashable, Union
 
 from core.application.application import Application
 from core.application.function import Function, CommandResponse
@@ -8,55 +7,67 @@ from core.communication.callback import Callback
 from core.communication.command_identifier import CommandIdentifier, ApplicationType
 from core.communication.connection import SyncConnection
 from core.communication.connection_service import ConnectionService
+from core.communication.dispatcher import OverflowPolicy
 from core.communication.message import Message
-from core.skill.function_configuration import FunctionConfiguration
 from core.skill.index import IndexData
 from core.skill.skill_configuration import SkillConfiguration
+from core.skill.storage import SkillsConfigStorage
+from core.skill.writer import SkillsConfigWriter
+from text_to_command.indexer import Indexer
+from text_to_command.rating_cache import RatingCache
 
 
 class UserQueryProcessing(Application):
     config_file: str = "skills_config.json"
     skills_config: Dict[str, SkillConfiguration]  # probably needed to be moved to controller or storage
+    index_version: int = 0  # version of the index copy held by TextToCommand
+    rating_cache: RatingCache  # ratings of repeated queries, invalidated when the index changes
+    _storage: SkillsConfigStorage
+    _writer: SkillsConfigWriter
 
-    def __init__(self, id: str):
+    def __init__(self, id: str, rating_cache_size: int = 10000, rating_cache_bytes: int = 16 * 2 ** 20):
+        self.rating_cache = RatingCache(max_size=rating_cache_size, max_bytes=rating_cache_bytes)
         super().__init__(id, ApplicationType.CORE)
 
+    @property
+    def rating_cache_stats(self) -> Dict[str, Union[int, float]]:
+        return self.rating_cache.stats
+
     def _init_functions(self) -> Dict[str, Function]:
         return {
             "saveConfigIndexingFunction": SaveConfigIndexingFunction(self),
             "processUserQueryFunction": ProcessUserQueryFunction(self)
         }
 
-    def __serialize_config(self, config: List[SkillConfiguration]) -> str:
-        result = []
-        for skill in config:
-            result.append(skill.to_dict())
-        return json.dumps(result)
-
-    def __deserialize_config(self, data: List[dict]) -> List[SkillConfiguration]:
-        result = []
-        for config_data in data:
-            functions = [FunctionConfiguration(
-                name=f['name'],
-                description=f['description'],
-                call_examples=f['call_examples'],
-                indexed_data=IndexData.from_dict(f['indexed_data']) if f['indexed_data'] else None
-            ) for f in config_data['functions']]
-
-            result.append(SkillConfiguration(
-                name=config_data['name'],
-                description=config_data['description'],
-                tags=config_data['tags'],
-                functions=functions,
-                indexed_data=IndexData.from_dict(config_data['indexed_data']) if config_data['indexed_data'] else None
-            ))
+    def update_config(self, config: Dict[str, SkillConfiguration], changed: Optional[Dict[str, IndexData]] = None):
+        """Config is written in background, only changed entities are journaled if they are known."""
+        self.skills_config = config
+        self.index_version += 1
+        self.rating_cache.invalidate()
+        self._writer.schedule(list(config.values()), changed)
 
-        return result
+    def get_index(self) -> Dict[str, dict]:
+        index = {}
+        for skill_id, skill in self.skills_config.items():
+            if skill.indexed_data:
+                index[skill.id] = skill.indexed_data.to_dict()
 
-    def update_config(self, config: Dict[str, SkillConfiguration]):
-        self.skills_config = config
-        with open(self.config_file, 'w') as f:
-            f.write(self.__serialize_config(list(config.values())))
+            for function_id, function in skill.functions.items():
+                if function.indexed_data:
+                    index[function.id] = function.indexed_data.to_dict()
+        return index
+
+    def __publish_index(self, connection_service: ConnectionService):
+        self.index_version += 1
+        connection_service.dispatch(Message(
+            payload={
+                "version": self.index_version,
+                "entities": self.get_index()
+            },
+            target=CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "indexStorage", "load"),
+            source=CommandIdentifier(ApplicationType.CORE, self.id, None, None),
+            context={}
+        ))
 
     def __ensure_indexed(self, connection_service: ConnectionService):
         to_be_indexed = {}
@@ -97,10 +108,10 @@ class UserQueryProcessing(Application):
         self._connection = SyncConnection(self._on_event)
         connection_service.add_connection(self.application_type, self.id, self._connection)
 
-        with open(self.config_file) as f:
-            data = json.load(f)
-
-        self.skills_config = {s.id: s for s in self.__deserialize_config(data)}
+        self._storage = SkillsConfigStorage(self.config_file)
+        self.skills_config = {s.id: s for s in self._storage.load()}
+        self._writer = SkillsConfigWriter(self._storage)
+        self.__publish_index(connection_service)
         self.__ensure_indexed(connection_service)
 
 
@@ -116,41 +127,85 @@ class SaveConfigIndexingFunction(Function):
             "main": self._save_index_data
         }
 
-    def _save_index_data(self, payload: dict, context: dict, callback: Optional[Callback]):
+    def _save_index_data(
+            self, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
         logging.info(f"New indexed entities: {len(payload.keys())}")
         config = self._application.skills_config
+        changed = {}
         for entity_id, indexed_data in payload.items():
+            changed[entity_id] = IndexData.from_dict(indexed_data)
             if "." in entity_id:
                 skill_id, function_id = entity_id.split(".")
-                config[skill_id].functions[function_id].indexed_data = IndexData.from_dict(indexed_data)
+                config[skill_id].functions[function_id].indexed_data = changed[entity_id]
             else:
-                config[entity_id].indexed_data = IndexData.from_dict(indexed_data)
-        self._application.update_config(config)
+                config[entity_id].indexed_data = changed[entity_id]
+        self._application.update_config(config, changed)
+
+        return CommandResponse(
+            payload={
+                "version": self._application.index_version,
+                "entities": payload
+            },
+            context={},
+            target=CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "indexStorage", "update")
+        )
 
 
 class ProcessUserQueryFunction(Function):
+    """
+    Resolves user queries to the command variants.
+    ---
+    Each query gets an id carried in the context through its chain of messages, together with its sender.
+    A new query supersedes the previous query of the same sender: each hop of a superseded query checks its id
+    and abandons the chain, so its remaining work and callbacks are dropped and a stale list of variants
+    is never shown. Queries of other senders are not affected. Batches are never superseded.
+    Ratings are cached by the cleared query and the index version they were rated with, a repeated query is
+    answered from the cache without going to TextIndexer and TextToCommand.
+    """
+    # a burst of queries from one sender is reduced to the latest one, hops of the chain and batches are never lost
+    command_overflow_policies = {"main": OverflowPolicy.COALESCE}
+
+    source_context_key = "source"
+
+    last_query_id: int = 0  # handlers run one at a time on the application connection
+    superseded: int = 0  # hops abandoned because their query was superseded
+
     _application: UserQueryProcessing
+    _latest_query_ids: Dict[Optional[str], int]  # by sender
 
     def __init__(self, application: UserQueryProcessing):
         super().__init__()
         self._application = application
+        self._latest_query_ids = {}
 
     def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
         return {
             "main": self._on_user_query,
             "onQueryIndexed": self._on_query_indexed,
-            "onCommandsRating": self._on_commands_rating
+            "onCommandsRating": self._on_commands_rating,
+            "mainBatch": self._on_user_queries,
+            "onBatchQueryIndexed": self._on_queries_indexed,
+            "onBatchCommandsRating": self._on_batch_commands_rating
         }
 
-    def _on_commands_rating(
-            self, payload: dict, context: dict, callback: Optional[Callback]
-    ) -> Optional[CommandResponse]:
-        print("===========================================", flush=True)
-        for key, value in payload.items():
-            print(f"   {key}: {value}")
-
+    def get_coalesce_key(self, message: Message) -> Optional[Hashable]:
+        if message.target.command != "main":
+            return None
+        return message.source
+
+    def _is_superseded(self, context: dict) -> bool:
+        query_id = context.get("query_id")
+        latest_query_id = self._latest_query_ids.get(context.get("source"))
+        if query_id is None or query_id == latest_query_id:
+            return False
+        self.superseded += 1
+        logging.info(f"Query {query_id} is superseded by query {latest_query_id}, dropped.")
+        return True
+
+    def _get_variants(self, rating: dict) -> List[dict]:
         variants = []
-        for key, value in payload.items():
+        for key, value in rating.items():
             if "." in key:
                 skill_id, function_id = key.split(".")
                 skill = self._application.skills_config[skill_id]
@@ -166,10 +221,29 @@ class ProcessUserQueryFunction(Function):
                     "id": key,
                     "label": f"{skill.name}"
                 })
+        return variants
 
+    def _on_commands_rating(
+            self, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
+        if self._is_superseded(context):
+            return
+
+        rating = payload['rating']
+        print("===========================================", flush=True)
+        for key, value in rating.items():
+            print(f"   {key}: {value}")
+
+        # cached under the version it was rated with, ratings of an outdated index would never be looked up
+        if payload['index_version'] == self._application.index_version:
+            self._application.rating_cache.put(context['cleared'], payload['index_version'], rating)
+
+        return self._get_variants_response(rating)
+
+    def _get_variants_response(self, rating: dict) -> CommandResponse:
         return CommandResponse(
             payload={
-                "variants": variants,
+                "variants": self._get_variants(rating),
             },
             context={},
             target=CommandIdentifier(
@@ -178,9 +252,21 @@ class ProcessUserQueryFunction(Function):
         )
 
     def _on_user_query(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
+        self.last_query_id += 1
+        self._latest_query_ids[context.get("source")] = self.last_query_id
+
+        rating = self._application.rating_cache.get(
+            Indexer.clear_string(payload['user_query']), self._application.index_version
+        )
+        if rating is not None:
+            return self._get_variants_response(rating)
+
         return CommandResponse(
             payload=payload,
-            context={},
+            context={
+                "query_id": self.last_query_id,
+                "source": context.get("source")
+            },
             target=CommandIdentifier(
                 ApplicationType.MODULE, "TextIndexer", "queryIndexation", "main"
             ),
@@ -192,29 +278,80 @@ class ProcessUserQueryFunction(Function):
     def _on_query_indexed(
             self, payload: dict, context: dict, callback: Optional[Callback]
     ) -> Optional[CommandResponse]:
+        if self._is_superseded(context):
+            return
 
-        if not payload['query']['embedding']:
+        embedding = payload['query']['embedding']
+        if embedding is None or not len(embedding):
             logging.error(f"Query {payload['query']['raw']} has no embedding.")
             return
 
-        config = {}
-
-        for skill_id, skill in self._application.skills_config.items():
-            if skill.indexed_data:
-                config[skill.id] = skill.indexed_data.to_dict()
-
-            for function_id, function in skill.functions.items():
-                if function.indexed_data:
-                    config[function.id] = function.indexed_data.to_dict()
-
         return CommandResponse(
             payload={
                 "query": payload['query'],
-                "config": config
+                "index_version": self._application.index_version
+            },
+            context={
+                **context,
+                "cleared": payload['query']['cleared']
             },
-            context={},
             target=CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "main"),
             callback=Callback(CommandIdentifier(
                 ApplicationType.CORE, self._application.id, "processUserQueryFunction", "onCommandsRating"
             ))
         )
+
+    def _on_user_queries(
+            self, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
+        """
+        payload: {
+            user_queries: List[str]
+        }
+        Result is sent to the callback as {results: [{variants: [{id: str, label: str}, ...]}, ...]},
+        in the same order as user_queries
+        """
+        if not callback:
+            logging.error("Batch of user queries has no callback to send results to.")
+            return
+
+        return CommandResponse(
+            payload=payload,
+            context={
+                "callback": callback.to_dict()
+            },
+            target=CommandIdentifier(
+                ApplicationType.MODULE, "TextIndexer", "queryIndexation", "mainBatch"
+            ),
+            callback=Callback(CommandIdentifier(
+                ApplicationType.CORE, self._application.id, "processUserQueryFunction", "onBatchQueryIndexed"
+            ))
+        )
+
+    def _on_queries_indexed(
+            self, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
+        return CommandResponse(
+            payload={
+                "queries": payload['queries'],
+                "index_version": self._application.index_version
+            },
+            context=context,
+            target=CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "mainBatch"),
+            callback=Callback(CommandIdentifier(
+                ApplicationType.CORE, self._application.id, "processUserQueryFunction", "onBatchCommandsRating"
+            ))
+        )
+
+    def _on_batch_commands_rating(
+            self, payload: dict, context: dict, callback: Optional[Callback]
+    ) -> Optional[CommandResponse]:
+        return CommandResponse(
+            payload={
+                "results": [{
+                    "variants": self._get_variants(rating)
+                } for rating in payload['ratings']]
+            },
+            context={},
+            target=Callback.from_dict(context['callback']).target
+        )
@@ -0,0 +1,112 @@
+import json
+import struct
+from abc import ABCMeta, abstractmethod
+from typing import Any, List, Union
+
+import numpy as np
+
+from core.communication.message import Message, to_json_value
+
+
+class MessageCodec(metaclass=ABCMeta):
+    """Encoding of messages that cross a process or network boundary, selected per connection"""
+
+    @abstractmethod
+    def encode(self, message: Message) -> Union[str, bytes]:
+        pass
+
+    @abstractmethod
+    def decode(self, data: Union[str, bytes]) -> Message:
+        pass
+
+
+class JsonCodec(MessageCodec):
+    """Human readable, arrays are sent as lists of decimal floats"""
+
+    def encode(self, message: Message) -> str:
+        return message.serialize()
+
+    def decode(self, data: Union[str, bytes]) -> Message:
+        return Message.deserialize(data)
+
+
+class BinaryCodec(MessageCodec):
+    """
+    Length-prefixed JSON header with numpy arrays sent as raw buffers after it.
+    ---
+    Layout: magic, version, header length (struct PREFIX), header JSON padded to ALIGNMENT, then buffers,
+    each one aligned to ALIGNMENT. Header holds identifiers, context and payload with each array replaced
+    by {BUFFER_KEY: index} and the dtype, shape and offset of the buffers.
+    Arrays are decoded with np.frombuffer as read-only views of the received data, without copying.
+    Arrays of object dtype can't be sent as buffers and are sent as lists.
+    """
+    MAGIC = b"ALTM"
+    VERSION = 1
+    PREFIX = struct.Struct("<4sBxxxI")
+    ALIGNMENT = 16
+    BUFFER_KEY = "__buffer__"
+
+    def encode(self, message: Message) -> bytes:
+        arrays = []
+        data = self._extract_arrays(message.to_dict(), arrays)
+
+        buffers = []
+        offset = 0
+        for array in arrays:
+            offset = self._align(offset)
+            buffers.append({"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+            offset += array.nbytes
+        data["buffers"] = buffers
+
+        header = json.dumps(data, default=to_json_value).encode()
+        chunks = [self.PREFIX.pack(self.MAGIC, self.VERSION, len(header)), header]
+        position = self.PREFIX.size + len(header)
+        data_start = self._align(position)
+        chunks.append(b"\0" * (data_start - position))
+
+        position = 0
+        for array, buffer in zip(arrays, buffers):
+            chunks.append(b"\0" * (buffer["offset"] - position))
+            chunks.append(memoryview(array.reshape(-1)).cast("B"))  # flat, as empty and 0-d views can't be cast
+            position = buffer["offset"] + array.nbytes
+        return b"".join(chunks)
+
+    def decode(self, data: Union[str, bytes]) -> Message:
+        if isinstance(data, str):
+            raise ValueError("Binary message expected, received text.")
+        magic, version, header_size = self.PREFIX.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"Not a binary message of version {self.VERSION}.")
+
+        header_end = self.PREFIX.size + header_size
+        header = json.loads(bytes(data[self.PREFIX.size:header_end]))
+        data_start = self._align(header_end)
+        arrays = [
+            np.frombuffer(
+                data, dtype=buffer["dtype"], count=int(np.prod(buffer["shape"])), offset=data_start + buffer["offset"]
+            ).reshape(buffer["shape"])
+            for buffer in header.pop("buffers")
+        ]
+        return Message.from_dict(self._restore_arrays(header, arrays))
+
+    def _align(self, position: int) -> int:
+        return -(-position // self.ALIGNMENT) * self.ALIGNMENT
+
+    def _extract_arrays(self, data: Any, arrays: List[np.ndarray]) -> Any:
+        if isinstance(data, np.ndarray) and data.dtype != object:
+            arrays.append(data if data.flags.c_contiguous else data.copy(order="C"))
+            return {self.BUFFER_KEY: len(arrays) - 1}
+        if isinstance(data, dict):
+            return {key: self._extract_arrays(value, arrays) for key, value in data.items()}
+        if isinstance(data, (list, tuple)):
+            return [self._extract_arrays(value, arrays) for value in data]
+        return data
+
+    def _restore_arrays(self, data: Any, arrays: List[np.ndarray]) -> Any:
+        if isinstance(data, dict):
+            if len(data) == 1 and self.BUFFER_KEY in data:
+                return arrays[data[self.BUFFER_KEY]]
+            return {key: self._restore_arrays(value, arrays) for key, value in data.items()}
+        if isinstance(data, list):
+            return [self._restore_arrays(value, arrays) for value in data]
+        return data
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Union, Optional
+from typing import Union, Optional, Dict, Tuple
 
 
 class ApplicationType(Enum):
@@ -9,39 +9,87 @@ class ApplicationType(Enum):
 
 
 class CommandIdentifier:
+    """
+    Immutable address of an application, function or command.
+    ---
+    Identifiers are interned: constructing or deserializing the same address returns the same instance,
+    so they are cheap to create on every hop, hash and compare by identity and are used as routing keys.
+    At most MAX_INTERNED identifiers are kept, the rest are created as equal but separate instances.
+    """
+    __slots__ = ("type", "application", "function", "command", "_key", "_hash", "_str")
+
     type: ApplicationType
     application: str  # unique application id, like UI or TelegramClientBot.
     function: Optional[str] # application unique id: like switchOnTheLight
     command: Optional[str] # function unique id: like onAllParamsResolved
 
     SEPARATOR = "."
+    MAX_INTERNED = 65536
+
+    _interned: Dict[tuple, 'CommandIdentifier'] = {}
+    _deserialized: Dict[str, 'CommandIdentifier'] = {}
 
-    def __init__(
-            self,
+    def __new__(
+            cls,
             type: Union[str, ApplicationType],
             application: str,
             function: Optional[str] = None,
             command: Optional[str] = None
     ):
-        if isinstance(type, str):
-            self.type = ApplicationType[type]
-        else:
-            self.type = type
+        identifier = cls._interned.get((type, application, function, command))
+        if identifier is not None:
+            return identifier
+
+        application_type = ApplicationType[type] if isinstance(type, str) else type
+        key = (application_type, application, function, command)
+        identifier = cls._interned.get(key)
+        if identifier is None:
+            identifier = super().__new__(cls)
+            for name, value in zip(("type", "application", "function", "command"), key):
+                object.__setattr__(identifier, name, value)
+            object.__setattr__(identifier, "_key", key)
+            object.__setattr__(identifier, "_hash", hash(key))
+            object.__setattr__(identifier, "_str", None)
+
+        if len(cls._interned) < cls.MAX_INTERNED:
+            cls._interned[key] = identifier
+            cls._interned[(type, application, function, command)] = identifier
+        return identifier
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
 
-        self.application = application
-        self.function = function
-        self.command = command
+    def __eq__(self, other):
+        return self is other or isinstance(other, CommandIdentifier) and self._key == other._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return CommandIdentifier, self._key
+
+    def __repr__(self):
+        return f"CommandIdentifier({str(self)})"
+
+    @property
+    def key(self) -> Tuple[ApplicationType, str, Optional[str], Optional[str]]:
+        return self._key
 
     def __str__(self):
-        parts = [self.type.name, self.application]
-        if self.function:
-            parts.append(self.function)
-            if self.command:
-                parts.append(self.command)
-        return self.SEPARATOR.join(parts)
+        if self._str is None:
+            parts = [self.type.name, self.application]
+            if self.function:
+                parts.append(self.function)
+                if self.command:
+                    parts.append(self.command)
+            object.__setattr__(self, "_str", self.SEPARATOR.join(parts))
+        return self._str
 
     @classmethod
     def deserialize(cls, data: str) -> 'CommandIdentifier':
-        parts = data.split(cls.SEPARATOR)
-
-        return cls(*parts)
+        identifier = cls._deserialized.get(data)
+        if identifier is None:
+            identifier = cls(*data.split(cls.SEPARATOR))
+            if len(cls._deserialized) < cls.MAX_INTERNED:
+                cls._deserialized[data] = identifier
+        return identifier
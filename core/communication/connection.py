@@ -1,27 +1,47 @@
 from abc import abstractmethod, ABCMeta
-from typing import Callable
+from typing import Callable, Union
 
+from core.communication.codec import MessageCodec, JsonCodec
 from core.communication.message import Message
 
 
 class Connection(metaclass=ABCMeta):
 
-    _on_message: Callable[[str], None] = None
+    main_thread: bool = False  # events have to be handled on the event loop thread, e.g. by GUI
+    codec: MessageCodec = JsonCodec()  # encoding of messages that leave the process
+    max_queue_size: int = 1024  # inbound queue limit, overflow is handled by the policy of the target function
+    _on_message: Callable[[Union[str, bytes]], None] = None
+    _on_local_message: Callable[[Message], None] = None
     _on_close: Callable[[], None] = None
 
+    @property
+    def in_process(self) -> bool:
+        """Connected application runs in this process, so messages are passed without serialization"""
+        return False
+
     def set_on_close(self, on_close: Callable[[], None]):
         self._on_close = on_close
 
-    def set_on_message(self, on_message: Callable[[str], None]):
+    def set_on_message(self, on_message: Callable[[Union[str, bytes]], None]):
         self._on_message = on_message
 
     @abstractmethod
     def dispatch(self, event: Message) -> None:  # from Ald to connected
         pass
 
-    def send_message(self, message: str) -> None:  # subscribe messages from connected service to Alt
+    def set_on_local_message(self, on_local_message: Callable[[Message], None]):
+        self._on_local_message = on_local_message
+
+    def send_message(self, message: Union[str, bytes]) -> None:  # subscribe messages from connected service to Alt
         self._on_message(message)
 
+    def send(self, message: Message) -> None:
+        """Sends message from the connected application, serialized only when it leaves the process"""
+        if self.in_process and self._on_local_message:
+            self._on_local_message(message)
+        else:
+            self.send_message(self.codec.encode(message))
+
     @abstractmethod
     def connect(self) -> None:
         pass
@@ -45,8 +65,9 @@ class SyncConnection(Connection):
 
     _on_event: Callable[[Message], None]
 
-    def __init__(self, on_event: Callable[[Message], None]):
+    def __init__(self, on_event: Callable[[Message], None], main_thread: bool = False):
         self._on_event = on_event
+        self.main_thread = main_thread
 
     def dispatch(self, event: Message) -> None:
         self._on_event(event)
@@ -57,6 +78,10 @@ class SyncConnection(Connection):
     def _close(self) -> None:
         return
 
+    @property
+    def in_process(self) -> bool:
+        return True
+
     @property
     def is_connected(self) -> bool:
         return True
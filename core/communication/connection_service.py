@@ -1,56 +1,105 @@
 import logging
-from typing import Dict, Callable
+from typing import Dict, Callable, Optional, Union, Tuple
 
-from core.communication.command_identifier import ApplicationType
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
 from core.communication.connection import Connection
+from core.communication.dispatcher import MessageDispatcher, QueuePolicy, DEFAULT_QUEUE_POLICY
 from core.communication.message import Message
 
 
 class ConnectionService:
+    """
+    Connections of all applications, routes messages to them.
+    ---
+    Targets are resolved to the mailbox key and connection once, routes of all commands are compiled at setup
+    (compile_routes) and routes of other targets are added on their first message, so dispatching a message
+    takes a single lookup. Routes of a connection are dropped when it is replaced or closed.
+    A route also keeps the queue policy of its command, targets unknown at setup use DEFAULT_QUEUE_POLICY.
+    """
     # TODO: add different connection integrations, like WebsocketServer
     _connections: Dict[ApplicationType, Dict[str, Connection]]
+    _routes: Dict[CommandIdentifier, Tuple[Tuple[ApplicationType, str], Connection, QueuePolicy]]
+    _policies: Dict[CommandIdentifier, QueuePolicy]
     _on_event: Callable[[Message], None]
+    _dispatcher: MessageDispatcher
 
-    def __init__(self, on_event: Callable[[Message], None]):
+    max_routes: int = 65536
+
+    def __init__(self, on_event: Callable[[Message], None], dispatcher: Optional[MessageDispatcher] = None):
         self._on_event = on_event
+        self._dispatcher = dispatcher or MessageDispatcher()
         self._connections = {
             ApplicationType.MODULE: {},
             ApplicationType.CORE: {},
             ApplicationType.SKILL: {}
         }
+        self._routes = {}
+        self._policies = {}
 
     def add_connection(self, application_type: ApplicationType, application: str, connection: Connection):
         # TODO: check this application type can be added, etc
         # TODO: add checks that connection available, valid, authenticated and not already exists.
         self._connections[application_type][application] = connection
+        self._drop_routes(application_type, application)
 
         connection.set_on_close(lambda: self.on_close_connection(application_type, application, connection))
         connection.set_on_message(lambda message: self.on_message(application_type, application, message))
+        connection.set_on_local_message(lambda event: self.on_local_message(application_type, application, event))
         logging.info(f"Connection {application_type}.{application} was added.")
 
     def on_close_connection(self, application_type: ApplicationType, application: str, connection: Connection):
         del self._connections[application_type][application]
+        self._drop_routes(application_type, application)
         logging.info(f"Connection {application_type}.{application} was closed.")
 
-    def on_message(self, application_type: ApplicationType, application: str, message: str):
+    def on_message(self, application_type: ApplicationType, application: str, message: Union[str, bytes]):
+        """Message encoded with the codec of the connection"""
         logging.info(f"Message from {application_type}.{application}")
-        event = Message.deserialize(message)
+        codec = self._connections[application_type][application].codec
+        self._accept(application_type, application, codec.decode(message))
+
+    def on_local_message(self, application_type: ApplicationType, application: str, event: Message):
+        """Message passed by reference from an in-process application"""
+        logging.info(f"Local message from {application_type}.{application}")
+        self._accept(application_type, application, event)
 
+    def _accept(self, application_type: ApplicationType, application: str, event: Message):
         if event.source.type != application_type or event.source.application != application:
             raise ConnectionAbortedError(f"Event with fake source: real {application_type}.{application},"
                                          f" received {event.source.type}.{event.source.application}")
 
         self._on_event(event)
 
+    def compile_routes(self, targets: Dict[CommandIdentifier, QueuePolicy]) -> None:
+        self._policies.update(targets)
+        for target in targets:
+            self._compile_route(target)
+
+    def _compile_route(
+            self, target: CommandIdentifier
+    ) -> Optional[Tuple[Tuple[ApplicationType, str], Connection, QueuePolicy]]:
+        connection = self._connections[target.type].get(target.application)
+        if connection is None:
+            return None
+
+        route = ((target.type, target.application), connection, self._policies.get(target, DEFAULT_QUEUE_POLICY))
+        if len(self._routes) < self.max_routes:
+            self._routes[target] = route
+        return route
+
+    def _drop_routes(self, application_type: ApplicationType, application: str):
+        self._routes = {
+            target: route for target, route in self._routes.items() if route[0] != (application_type, application)
+        }
+
     def dispatch(self, event: Message):
         logging.info(f"Send event from {event.source} to {event.target}")
+        event = event.freeze()  # receivers share the message by reference, none of them can change it
 
-        if event.target.application not in self._connections[event.target.type]:
+        route = self._routes.get(event.target) or self._compile_route(event.target)
+        if route is None:
             logging.error(f"No such topic {event.target} in the system")
             return
 
-        if not self._connections[event.target.type][event.target.application].is_connected:
-            logging.error(f"Connection is not connected.")
-            return
-
-        self._connections[event.target.type][event.target.application].dispatch(event)
+        # connection state is checked when the message is delivered
+        self._dispatcher.dispatch(route[0], route[1], event, route[2])
@@ -0,0 +1,267 @@
+import logging
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from core.communication.command_identifier import ApplicationType
+from core.communication.connection import Connection
+from core.communication.message import Message
+from core.controller.scheduler import Waker
+
+
+class OverflowPolicy(Enum):
+    """
+    What happens to a message sent to a full queue.
+    ---
+    BLOCK: the sender waits until the queue has room, messages are never lost.
+    DROP_OLDEST: the oldest queued message with a drop policy is dropped to make room.
+    COALESCE: a queued message with the same coalesce key is replaced by the new one, so only the latest
+    message per key waits in the queue, and the queue overflows like DROP_OLDEST.
+    """
+    BLOCK = "BLOCK"
+    DROP_OLDEST = "DROP_OLDEST"
+    COALESCE = "COALESCE"
+
+
+class QueuePolicy(NamedTuple):
+    overflow: OverflowPolicy = OverflowPolicy.BLOCK
+    coalesce_key: Optional[Callable[[Message], Optional[Hashable]]] = None  # None key: message is not coalesced
+
+
+DEFAULT_QUEUE_POLICY = QueuePolicy()
+
+
+@dataclass
+class QueueStats:
+    depth: int = 0
+    max_depth: int = 0
+    enqueued: int = 0
+    delivered: int = 0
+    dropped: int = 0  # by DROP_OLDEST and COALESCE overflow
+    coalesced: int = 0  # replaced by a newer message with the same key
+    blocked: int = 0  # senders that waited for room
+    overflowed: int = 0  # queued over max_queue_size, sender couldn't wait
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class _Entry:
+    __slots__ = ("event", "droppable", "key")
+
+    event: Message
+    droppable: bool
+    key: Optional[Hashable]
+
+    def __init__(self, event: Message, droppable: bool, key: Optional[Hashable]):
+        self.event = event
+        self.droppable = droppable
+        self.key = key
+
+
+class _Mailbox:
+    key: Tuple[ApplicationType, str]
+    connection: Connection
+    messages: Deque[_Entry]
+    coalesced: Dict[Hashable, _Entry]  # queued entries by coalesce key
+    scheduled: bool  # queued for draining or being drained, so it is never drained by two threads at once
+    draining_thread: Optional[threading.Thread]
+    stats: QueueStats
+
+    def __init__(self, key: Tuple[ApplicationType, str], connection: Connection):
+        self.key = key
+        self.connection = connection
+        self.messages = deque()
+        self.coalesced = {}
+        self.scheduled = False
+        self.draining_thread = None
+        self.stats = QueueStats()
+
+
+class MessageDispatcher:
+    """
+    Delivers messages to connections through per-target queues instead of direct calls.
+    ---
+    dispatch only enqueues the message, so a handler that sends a response returns before the response is handled
+    and message chains run with a flat stack. Messages of one target are handled one at a time in the order they
+    were dispatched, different targets are handled in parallel by a pool of worker threads.
+    Targets whose connection has main_thread set (GUI) and all targets when there are no workers are drained
+    on the event loop thread by drain_main_thread, which is woken by main_thread_waker.
+    A target handles at most max_batch messages in a row, then yields to other targets.
+    Queues hold at most connection.max_queue_size messages, a message to a full queue is handled by the
+    overflow policy of its target (QueuePolicy). A blocked sender waits at most block_timeout seconds; the event
+    loop thread and the thread draining the target never wait (they would wait for themselves), for them
+    and after the timeout the message is queued over the limit and counted as overflowed.
+    """
+    workers: int
+    max_batch: int = 64
+    block_timeout: float = 1.
+
+    main_thread_waker: Waker
+
+    _mailboxes: Dict[Tuple[ApplicationType, str], _Mailbox]
+    _lock: threading.Lock
+    _not_full: threading.Condition
+    _ready: "queue.SimpleQueue[Optional[_Mailbox]]"  # mailboxes to be drained by workers, None stops a worker
+    _main_thread_ready: Deque[_Mailbox]
+    _threads: List[threading.Thread]
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self.main_thread_waker = Waker()
+        self._mailboxes = {}
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._ready = queue.SimpleQueue()
+        self._main_thread_ready = deque()
+        self._threads = []
+
+    def start(self) -> None:
+        for _ in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._work, name=f"MessageDispatcherWorker{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self._ready.put(None)
+        self._threads = []
+
+    @property
+    def pending(self) -> Dict[str, int]:
+        """Number of queued messages per target"""
+        with self._lock:
+            return {f"{t.name}.{application}": len(m.messages) for (t, application), m in self._mailboxes.items()}
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth and drop counters per target"""
+        with self._lock:
+            stats = {}
+            for (t, application), mailbox in self._mailboxes.items():
+                mailbox.stats.depth = len(mailbox.messages)
+                stats[f"{t.name}.{application}"] = mailbox.stats.to_dict()
+            return stats
+
+    def dispatch(
+            self,
+            key: Tuple[ApplicationType, str],
+            connection: Connection,
+            event: Message,
+            policy: QueuePolicy = DEFAULT_QUEUE_POLICY
+    ) -> None:
+        coalesce_key = None
+        if policy.overflow is OverflowPolicy.COALESCE and policy.coalesce_key is not None:
+            coalesce_key = policy.coalesce_key(event)
+
+        with self._lock:
+            mailbox = self._mailboxes.get(key)
+            if mailbox is None:
+                mailbox = self._mailboxes[key] = _Mailbox(key, connection)
+            mailbox.connection = connection  # application could have reconnected
+
+            if coalesce_key is not None:
+                entry = mailbox.coalesced.get(coalesce_key)
+                if entry is not None:
+                    entry.event = event  # the queued message is outdated, the new one takes its place
+                    mailbox.stats.coalesced += 1
+                    return
+
+            if len(mailbox.messages) >= connection.max_queue_size and not self._make_room(mailbox, policy, event):
+                return
+
+            entry = _Entry(event, policy.overflow is not OverflowPolicy.BLOCK, coalesce_key)
+            mailbox.messages.append(entry)
+            if coalesce_key is not None:
+                mailbox.coalesced[coalesce_key] = entry
+            mailbox.stats.enqueued += 1
+            if len(mailbox.messages) > mailbox.stats.max_depth:
+                mailbox.stats.max_depth = len(mailbox.messages)
+
+            if mailbox.scheduled:
+                return
+            mailbox.scheduled = True
+        self._schedule(mailbox)
+
+    def _make_room(self, mailbox: _Mailbox, policy: QueuePolicy, event: Message) -> bool:
+        """Called with the lock held on a full queue, returns whether the message should be queued"""
+        if policy.overflow is not OverflowPolicy.BLOCK:
+            for i, entry in enumerate(mailbox.messages):
+                if entry.droppable:
+                    del mailbox.messages[i]
+                    if entry.key is not None and mailbox.coalesced.get(entry.key) is entry:
+                        del mailbox.coalesced[entry.key]
+                    mailbox.stats.dropped += 1
+                    logging.warning(f"Queue of {event.target} is full, event to {entry.event.target} dropped.")
+                    return True
+            # all queued messages must be delivered, the new one is the oldest that can be dropped
+            mailbox.stats.dropped += 1
+            logging.warning(f"Queue of {event.target} is full, event dropped.")
+            return False
+
+        thread = threading.current_thread()
+        if thread is not threading.main_thread() and thread is not mailbox.draining_thread:
+            mailbox.stats.blocked += 1
+            if self._not_full.wait_for(
+                    lambda: len(mailbox.messages) < mailbox.connection.max_queue_size, timeout=self.block_timeout
+            ):
+                return True
+        mailbox.stats.overflowed += 1
+        logging.warning(f"Queue of {event.target} is full, event queued over the limit.")
+        return True
+
+    def drain_main_thread(self) -> None:
+        # at most max_batch mailbox turns per cycle, so other cycle handlers get their turn
+        for _ in range(self.max_batch):
+            try:
+                mailbox = self._main_thread_ready.popleft()
+            except IndexError:
+                return
+            self._drain(mailbox)
+
+    def _schedule(self, mailbox: _Mailbox) -> None:
+        if mailbox.connection.main_thread or not self.workers:
+            self._main_thread_ready.append(mailbox)
+            self.main_thread_waker.wake()
+        else:
+            self._ready.put(mailbox)
+
+    def _work(self) -> None:
+        while True:
+            mailbox = self._ready.get()
+            if mailbox is None:
+                return
+            self._drain(mailbox)
+
+    def _drain(self, mailbox: _Mailbox) -> None:
+        mailbox.draining_thread = threading.current_thread()
+        try:
+            for _ in range(self.max_batch):
+                with self._lock:
+                    if not mailbox.messages:
+                        mailbox.scheduled = False
+                        return
+                    entry = mailbox.messages.popleft()
+                    if entry.key is not None and mailbox.coalesced.get(entry.key) is entry:
+                        del mailbox.coalesced[entry.key]
+                    mailbox.stats.delivered += 1
+                    self._not_full.notify_all()
+                self._deliver(mailbox.connection, entry.event)
+        finally:
+            mailbox.draining_thread = None
+        self._schedule(mailbox)
+
+    @staticmethod
+    def _deliver(connection: Connection, event: Message) -> None:
+        if not connection.is_connected:
+            logging.error(f"Connection is not connected, event to {event.target} dropped.")
+            return
+        try:
+            connection.dispatch(event)
+        except Exception:
+            logging.exception(f"Event from {event.source} to {event.target} failed.")
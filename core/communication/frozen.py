@@ -0,0 +1,55 @@
+from typing import Any
+
+import numpy as np
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is immutable, copy it to change.")
+
+
+class FrozenDict(dict):
+    """dict that can't be changed, so a payload passed by reference can be shared by the sender and receivers"""
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+class FrozenList(list):
+    """list that can't be changed, still serialized by json as a list"""
+    __setitem__ = __delitem__ = append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+    __iadd__ = __imul__ = _immutable
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+_IMMUTABLE = (str, int, float, type(None), FrozenDict, FrozenList)
+
+
+def freeze(data: Any) -> Any:
+    """
+    Deep immutable version of the message data: dicts and lists are copied to frozen ones, writable numpy arrays
+    are copied to read-only ones, so the sender can't change the data receivers hold. Read-only arrays
+    (received buffers, read-only memory maps, already frozen arrays) are passed without copying.
+    Tuples and NamedTuples are re-created only when some of their items have to be frozen.
+    Already frozen containers are returned as they are.
+    """
+    if isinstance(data, _IMMUTABLE):
+        return data
+    if isinstance(data, dict):
+        return FrozenDict({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return FrozenList([freeze(value) for value in data])
+    if isinstance(data, tuple):
+        items = [freeze(value) for value in data]
+        if all(item is value for item, value in zip(items, data)):
+            return data
+        return type(data)(*items) if hasattr(data, "_fields") else tuple(items)
+    if isinstance(data, np.ndarray):
+        if not data.flags.writeable:
+            return data
+        copy = np.array(data)
+        copy.flags.writeable = False
+        return copy
+    return data
@@ -1,10 +1,22 @@
 import json
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
+
+import numpy as np
 
 from core.communication.callback import Callback
 from core.communication.command_identifier import CommandIdentifier
 from core.communication.context_scope import ContextScope
+from core.communication.frozen import freeze, FrozenDict
+
+
+def to_json_value(data: Any):
+    """json default for numpy values, arrays are passed as they are in-process"""
+    if isinstance(data, np.ndarray):
+        return data.tolist()
+    if isinstance(data, np.generic):
+        return data.item()
+    raise TypeError(f"Object of type {type(data).__name__} is not JSON serializable")
 
 
 @dataclass
@@ -15,23 +27,28 @@ class Message:
     context: Dict[ContextScope, dict]  # the data which will be persistent during the session in long message chain
     callback: Optional[Callback] = None  # triggered if successfully processed.
 
-    def serialize(self):
+    def freeze(self) -> 'Message':
+        """Message with deeply immutable payload and context, which can be passed by reference in-process"""
+        if isinstance(self.payload, FrozenDict) and isinstance(self.context, FrozenDict):
+            return self
+        return Message(freeze(self.payload), self.target, self.source, freeze(self.context), self.callback)
+
+    def to_dict(self) -> dict:
+        """Message with identifiers as strings, payload and context are not copied"""
         source = None
         if self.source:
             source = str(self.source)
 
-        return json.dumps({
+        return {
             "payload": self.payload,
             "source": source,
             "target": str(self.target),
             "context": {".".join(c): v for c, v in self.context.items()},
             "callback": self.callback.to_dict() if self.callback else None
-        })
+        }
 
     @classmethod
-    def deserialize(cls, message: str) -> 'Message':
-        # TODO: add validations
-        data = json.loads(message)
+    def from_dict(cls, data: dict) -> 'Message':
         return cls(
             payload=data['payload'],
             source=CommandIdentifier.deserialize(data['source']) if data.get('source') else None,
@@ -39,3 +56,11 @@ class Message:
             context={ContextScope(*source.split(".")): payload for source, payload in data['context'].items()},
             callback=Callback.from_dict(data['callback']) if data.get('callback') else None
         )
+
+    def serialize(self) -> str:
+        return json.dumps(self.to_dict(), default=to_json_value)
+
+    @classmethod
+    def deserialize(cls, message: str) -> 'Message':
+        # TODO: add validations
+        return cls.from_dict(json.loads(message))
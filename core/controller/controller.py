@@ -1,10 +1,14 @@
 import logging
-from typing import Dict, List, Callable
+from time import perf_counter
+from typing import Dict, Union
 
 from core.application.application import Application
+from core.application.execution import shutdown_executors
 from core.communication.command_identifier import ApplicationType, CommandIdentifier
 from core.communication.connection_service import ConnectionService
+from core.communication.dispatcher import MessageDispatcher
 from core.communication.message import Message
+from core.controller.scheduler import Scheduler
 from core.module.module import Module
 
 
@@ -12,14 +16,20 @@ class Controller:
     _modules: Dict[str, Module]
     _applications: Dict[str, Application]
     _connection_service: ConnectionService
+    _dispatcher: MessageDispatcher
 
-    _cycle_handlers: List[Callable[[], None]]
+    _scheduler: Scheduler
 
-    def __init__(self, modules: Dict[str, Module], applications: Dict[str, Application]):
+    def __init__(self, modules: Dict[str, Module], applications: Dict[str, Application], workers: int = 0):
+        """workers: threads handling messages of modules and applications, with 0 all run on the event loop thread"""
         self._modules = modules
-        self._connection_service = ConnectionService(self.on_event)
+        self._dispatcher = MessageDispatcher(workers)
+        self._connection_service = ConnectionService(self.on_event, self._dispatcher)
         self._applications = applications
-        self._cycle_handlers = []
+        self._scheduler = Scheduler()
+        self._scheduler.register(
+            self._dispatcher.drain_main_thread, waker=self._dispatcher.main_thread_waker, name="mainThreadMessages"
+        )
 
     def on_event(self, event: Message):
         """check access permissions, translate event to target or handler"""
@@ -29,27 +39,51 @@ class Controller:
     def _setup_modules(self):
         logging.info("=== Init modules start ===")
         for module_name, module in self._modules.items():
+            started = perf_counter()
             module.setup(self._connection_service)
-            module.register_cycle_handlers(lambda handler: self._cycle_handlers.append(handler))
-            logging.info(f"Module {module_name} inited.")
+            module.register_cycle_handlers(self._scheduler.register)
+            logging.info(f"Module {module_name} inited in {perf_counter() - started:.3f}s.")
         logging.info("=== Init modules end ===")
 
     def _setup_applications(self):
         logging.info("=== Init applications start ===")
         for application_name, application in self._applications.items():
+            started = perf_counter()
             application.setup(self._connection_service)
-            logging.info(f"Application {application_name} inited.")
+            logging.info(f"Application {application_name} inited in {perf_counter() - started:.3f}s.")
         logging.info("=== Init applications end ===")
 
+    def _compile_routes(self):
+        started = perf_counter()
+        targets = {}
+        for application in [*self._modules.values(), *self._applications.values()]:
+            targets.update(application.compile_routes())
+        self._connection_service.compile_routes(targets)
+        logging.info(f"Routing table of {len(targets)} commands compiled in {perf_counter() - started:.3f}s.")
+
+    @property
+    def cycle_handlers_stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        return self._scheduler.stats
+
+    @property
+    def queue_stats(self) -> Dict[str, Dict[str, int]]:
+        """Depth and drop counters of the inbound queue of each application"""
+        return self._dispatcher.stats
+
     def _start_event_loop(self):
-        while True:
-            for handle in self._cycle_handlers:
-                handle()
+        self._scheduler.run()
 
-    def setup(self) -> None:
+    def stop(self) -> None:
+        self._scheduler.stop()
+        self._dispatcher.stop()
+        shutdown_executors()
 
+    def setup(self) -> None:
+        started = perf_counter()
+        self._dispatcher.start()
         self._setup_modules()
         self._setup_applications()
+        self._compile_routes()
 
         self._connection_service.dispatch(Message(
             payload={},
@@ -60,4 +94,5 @@ class Controller:
             context={}
         ))
 
+        logging.info(f"Setup done in {perf_counter() - started:.3f}s, starting event loop.")
         self._start_event_loop()
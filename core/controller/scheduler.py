@@ -0,0 +1,183 @@
+import logging
+import selectors
+import socket
+from dataclasses import dataclass
+from time import monotonic, perf_counter
+from typing import Callable, Dict, List, Optional, Union, Any
+
+RegisterCycleHandler = Callable[..., None]  # (handler, *, interval=None, fd=None, waker=None, name=None)
+
+
+class Waker:
+    """
+    Wake-up source for cycle handlers that wait for work from other threads (or for queued messages).
+    ---
+    A self-pipe: wake() writes a byte to a socket pair the scheduler selects on, so it can be called from
+    any thread. Wake-ups that come before the handler runs are coalesced into one call.
+    """
+    _reader: socket.socket
+    _writer: socket.socket
+
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+        self._writer.setblocking(False)
+
+    def fileno(self) -> int:
+        return self._reader.fileno()
+
+    def wake(self) -> None:
+        try:
+            self._writer.send(b"\0")
+        except (BlockingIOError, OSError):  # buffer is full, so a wake-up is pending anyway, or waker is closed
+            pass
+
+    def consume(self) -> None:
+        try:
+            while self._reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        self._reader.close()
+        self._writer.close()
+
+
+@dataclass
+class HandlerStats:
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.
+    max_time: float = 0.
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "max_time": self.max_time,
+            "mean_time": self.total_time / self.calls if self.calls else 0.
+        }
+
+
+class _CycleHandler:
+    handler: Callable[[], None]
+    name: str
+    interval: Optional[float]
+    waker: Optional[Waker]
+    next_run: float
+    stats: HandlerStats
+
+    def __init__(self, handler: Callable[[], None], name: str, interval: Optional[float], waker: Optional[Waker]):
+        self.handler = handler
+        self.name = name
+        self.interval = interval
+        self.waker = waker
+        self.next_run = monotonic()
+        self.stats = HandlerStats()
+
+
+class Scheduler:
+    """
+    Event loop that runs cycle handlers only when they have work.
+    ---
+    Each handler declares its wake-up source: an interval in seconds (timer), a file descriptor or an object
+    with fileno() that becomes readable, or a Waker that other threads or queues wake.
+    Handlers that declare nothing run every default_interval seconds.
+    The loop blocks in select until a source is ready or the nearest timer is due, so an idle loop takes no CPU.
+    Handler exceptions are logged and counted, they don't stop the loop.
+    """
+    default_interval: float = 0.01
+    slow_handler_time: float = 0.1  # handler runs longer than this are logged
+
+    _handlers: List[_CycleHandler]
+    _selector: selectors.BaseSelector
+    _stop_waker: Waker
+    _running: bool
+
+    def __init__(self):
+        self._handlers = []
+        self._selector = selectors.DefaultSelector()
+        self._stop_waker = Waker()
+        self._selector.register(self._stop_waker, selectors.EVENT_READ, None)
+        self._running = False
+
+    def register(
+            self,
+            handler: Callable[[], None],
+            *,
+            interval: Optional[float] = None,
+            fd: Optional[Any] = None,
+            waker: Optional[Waker] = None,
+            name: Optional[str] = None
+    ) -> None:
+        if interval is None and fd is None and waker is None:
+            interval = self.default_interval
+
+        name = name or getattr(handler, "__qualname__", repr(handler))
+        cycle_handler = _CycleHandler(handler, name, interval, waker)
+        self._handlers.append(cycle_handler)
+
+        for source in [fd, waker]:
+            if source is not None:
+                self._selector.register(source, selectors.EVENT_READ, cycle_handler)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        return {h.name: h.stats.to_dict() for h in self._handlers}
+
+    def run(self) -> None:
+        self._running = True
+        while self._running:
+            self.run_once()
+
+    def run_once(self, timeout: Optional[float] = None) -> None:
+        """Waits for the first ready source or due timer (at most timeout seconds) and runs ready handlers"""
+        now = monotonic()
+        timers = [h.next_run for h in self._handlers if h.interval is not None]
+        wait = max(min(timers) - now, 0.) if timers else None
+        if timeout is not None:
+            wait = timeout if wait is None else min(wait, timeout)
+
+        ready = []
+        for key, _ in self._selector.select(wait):
+            if key.data is None:  # stop waker
+                self._stop_waker.consume()
+                continue
+            if key.data.waker is not None and key.fileobj is key.data.waker:
+                key.data.waker.consume()
+            if key.data not in ready:
+                ready.append(key.data)
+
+        now = monotonic()
+        for cycle_handler in self._handlers:
+            if cycle_handler.interval is not None and cycle_handler.next_run <= now and cycle_handler not in ready:
+                ready.append(cycle_handler)
+
+        for cycle_handler in ready:
+            self._run_handler(cycle_handler)
+
+    def stop(self) -> None:
+        """Can be called from any thread, the loop exits after the current cycle"""
+        self._running = False
+        self._stop_waker.wake()
+
+    def _run_handler(self, cycle_handler: _CycleHandler) -> None:
+        stats = cycle_handler.stats
+        started = perf_counter()
+        try:
+            cycle_handler.handler()
+        except Exception:
+            stats.errors += 1
+            logging.exception(f"Cycle handler {cycle_handler.name} failed.")
+
+        elapsed = perf_counter() - started
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        if elapsed > self.slow_handler_time:
+            logging.warning(f"Cycle handler {cycle_handler.name} took {elapsed:.3f}s.")
+
+        if cycle_handler.interval is not None:
+            cycle_handler.next_run = monotonic() + cycle_handler.interval
@@ -1,11 +1,16 @@
-from typing import Dict, Callable, Optional
+from typing import Dict, Callable, Optional, Hashable
 
 from core.application.function import Function, CommandResponse
 from core.communication.callback import Callback
+from core.communication.dispatcher import OverflowPolicy
+from core.communication.message import Message
 from core.module.impl.gui.connection import UiCommunicationSignal, CommandMessage
 
 
 class CoreFunction(Function):
+    # only the latest variants are shown to the user
+    command_overflow_policies = {"askUserSelectCommandFromVariants": OverflowPolicy.COALESCE}
+
     _signal: UiCommunicationSignal
 
     def __init__(self, signal: UiCommunicationSignal):
@@ -19,6 +24,11 @@ class CoreFunction(Function):
             "askUserSelectCommandFromVariants": self.ask_user_select_command_from_variants
         }
 
+    def get_coalesce_key(self, message: Message) -> Optional[Hashable]:
+        if message.target.command != "askUserSelectCommandFromVariants":
+            return None
+        return message.target.command
+
     def wake_up(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
         self._signal.ui_input.emit(
             CommandMessage(topic="add_card", payload={
@@ -9,6 +9,7 @@ from core.communication.command_identifier import ApplicationType, CommandIdenti
 from core.communication.connection import SyncConnection
 from core.communication.connection_service import ConnectionService
 from core.communication.message import Message
+from core.controller.scheduler import RegisterCycleHandler
 from core.module.impl.gui.connection import UiCommunicationSignal
 from core.module.impl.gui.functions import CoreFunction
 from core.module.impl.gui.main_window import MainWindow
@@ -22,6 +23,8 @@ class UIModule(Module):
 
     _events_handler: Dict[str, Callable[[dict], None]]
 
+    process_events_interval: float = 0.01
+
     def __init__(self, id: str):
         self._signal = UiCommunicationSignal()
         super().__init__(id)
@@ -33,12 +36,12 @@ class UIModule(Module):
         }
 
     def _user_query_entered(self, payload: dict):
-        self._connection.send_message(Message(
+        self._connection.send(Message(
             payload=payload,
             target=CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "main"),
             source=CommandIdentifier(self.application_type, self.id),
             context={}
-        ).serialize())
+        ))
 
     def _init_functions(self) -> Dict[str, Function]:
         return {
@@ -49,12 +52,14 @@ class UIModule(Module):
         data = json.loads(message)
         self._events_handler[data['topic']](data['payload'])
 
-    def register_cycle_handlers(self, register_cycle_handler: Callable[[Callable[[], None]], None]):
-        register_cycle_handler(lambda: self._app.processEvents())
+    def register_cycle_handlers(self, register_cycle_handler: RegisterCycleHandler):
+        # Qt has no portable fd to select on, its events are polled often enough to keep the UI responsive
+        register_cycle_handler(lambda: self._app.processEvents(), interval=self.process_events_interval,
+                               name=f"{self.id}.processEvents")
 
     def setup(self, connection_service: ConnectionService):
         self._app = QApplication(sys.argv)
         self._main_window = MainWindow(self._signal)
-        self._connection = SyncConnection(self._on_event)
+        self._connection = SyncConnection(self._on_event, main_thread=True)  # Qt widgets live on the main thread
 
         connection_service.add_connection(ApplicationType.MODULE, self.id, self._connection)
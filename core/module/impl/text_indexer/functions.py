@@ -1,55 +1,113 @@
+import threading
 from dataclasses import asdict
-from typing import Dict, Callable, Optional
+from typing import Dict, Callable, Optional, List
 
+import numpy as np
+
+from core.application.execution import ExecutionPolicy
 from core.application.function import Function, CommandResponse
 from core.skill.index import IndexData, ExactWeightedUnit, EmbeddingWeightedUnit
 from text_to_command.indexer import Indexer
+from text_to_command.projection import Projection
 
 
 class QueryIndexationFunction(Function):
+    """
+    Query embeddings are projected with projection, the same one TextToCommand projects the index with.
+    The model is called under model_lock, which is shared with the config indexation of the same model.
+    """
+    execution_policy = ExecutionPolicy.THREAD  # embedding doesn't depend on other messages
     _get_indexer: Callable[[], Indexer]
+    _projection: Optional[Projection]
+    _model_lock: threading.Lock
 
-    def __init__(self, get_indexer: Callable[[], Indexer]):
+    def __init__(
+            self, get_indexer: Callable[[], Indexer], projection: Optional[Projection] = None,
+            model_lock: Optional[threading.Lock] = None
+    ):
         super().__init__()
         self._get_indexer = get_indexer
+        self._projection = projection
+        self._model_lock = model_lock or threading.Lock()
+
+    def _get_query_embedding(self, embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Embedding is sent as an array, it is converted to a list only if the message leaves the process"""
+        if embedding is None or self._projection is None:
+            return embedding
+        return self._projection.transform(embedding)
 
     def _init_commands(self) -> Dict[str, Callable[[dict, dict], Optional[CommandResponse]]]:
         return {
-            "main": self._get_indexed_query
+            "main": self._get_indexed_query,
+            "mainBatch": self._get_indexed_queries
         }
 
     def _get_indexed_query(self, payload: dict, context: dict, callback: Optional[CommandResponse]):
         print(f"_get_indexed_query({payload.get('user_query')})")
         indexer = self._get_indexer()
         c_text = indexer.clear_string(payload['user_query'])
-        embedding = indexer.get_embedding(c_text)
+        with self._model_lock:
+            embedding = indexer.get_embedding(c_text)
 
         return CommandResponse(
             payload={
                 "query": {
                     "raw": payload['user_query'],
                     "cleared": c_text,
-                    "embedding": embedding.tolist() if embedding is not None else None
+                    "embedding": self._get_query_embedding(embedding)
                 }
             },
             context={},
             target=callback.target
         )
 
+    def _get_indexed_queries(self, payload: dict, context: dict, callback: Optional[CommandResponse]):
+        """
+        payload: {
+            user_queries: List[str]
+        }
+        """
+        indexer = self._get_indexer()
+        c_texts = [indexer.clear_string(q) for q in payload['user_queries']]
+        with self._model_lock:
+            embeddings = indexer.get_embeddings(c_texts)
+
+        return CommandResponse(
+            payload={
+                "queries": [{
+                    "raw": raw,
+                    "cleared": c_text,
+                    "embedding": self._get_query_embedding(embedding)
+                } for raw, c_text, embedding in zip(payload['user_queries'], c_texts, embeddings)]
+            },
+            context={},
+            target=callback.target
+        )
+
 
 class ConfigIndexationFunction(Function):
+    execution_policy = ExecutionPolicy.THREAD  # whole config is embedded, queries shouldn't wait for it
     _get_indexer: Callable[[], Indexer]
+    _model_lock: threading.Lock
 
-    def __init__(self, get_indexer: Callable[[], Indexer]):
+    def __init__(self, get_indexer: Callable[[], Indexer], model_lock: Optional[threading.Lock] = None):
         super().__init__()
         self._get_indexer = get_indexer
+        self._model_lock = model_lock or threading.Lock()
 
     def _init_commands(self) -> Dict[str, Callable[[dict, dict], Optional[CommandResponse]]]:
         return {
             "main": self._get_indexed_data
         }
 
-    def __get_skill_index_data(self, payload: dict) -> IndexData:
+    @staticmethod
+    def __get_embedded_texts(indexer: Indexer, params: dict) -> List[str]:
+        texts = [indexer.clear_string(params['description'])]
+        if params['type'] == 'SKILL_FUNCTION':
+            texts.extend(indexer.clear_string(e) for e in params['call_examples'])
+        return texts
+
+    def __get_skill_index_data(self, payload: dict, embeddings: Dict[str, Optional[np.ndarray]]) -> IndexData:
         indexer = self._get_indexer()
         exact = [
             ExactWeightedUnit(
@@ -67,7 +125,7 @@ class ConfigIndexationFunction(Function):
         embeddings = [
             EmbeddingWeightedUnit(
                 weight=0.2,
-                embedding=indexer.get_embedding(indexer.clear_string(payload['description'])).tolist()
+                embedding=embeddings[indexer.clear_string(payload['description'])].tolist()
             )
         ]
 
@@ -76,7 +134,9 @@ class ConfigIndexationFunction(Function):
             embeddings=embeddings
         )
 
-    def __get_skill_function_index_data(self, payload: dict) -> IndexData:
+    def __get_skill_function_index_data(
+            self, payload: dict, embeddings: Dict[str, Optional[np.ndarray]]
+    ) -> IndexData:
         indexer = self._get_indexer()
         exact = [
             ExactWeightedUnit(
@@ -87,21 +147,20 @@ class ConfigIndexationFunction(Function):
             ),
         ]
 
+        call_example_embeddings = list(filter(lambda x: x is not None, [
+            embeddings[indexer.clear_string(e)] for e in payload['call_examples']
+        ]))
+
         embeddings = [
             EmbeddingWeightedUnit(
                 weight=0.2,
-                embedding=indexer.get_embedding(indexer.clear_string(payload['description'])).tolist()
+                embedding=embeddings[indexer.clear_string(payload['description'])].tolist()
             )
         ]
 
-        call_example_embeddings = list(filter(lambda x: x is not None, [
-            indexer.get_embedding(indexer.clear_string(e)) for e in payload['call_examples']
-        ]))
-
         if call_example_embeddings:
-            final_call_example_embedding = call_example_embeddings[0]
-            for e in call_example_embeddings[1:]:
-                final_call_example_embedding += e
+            # summed into a new array, embeddings returned by the indexer may be cached and read-only
+            final_call_example_embedding = np.sum(call_example_embeddings, axis=0)
 
             embeddings.append(
                 EmbeddingWeightedUnit(
@@ -135,12 +194,20 @@ class ConfigIndexationFunction(Function):
             ...
         }
         """
+        # texts of all entities are embedded in one pass through the model, each distinct text once
+        indexer = self._get_indexer()
+        texts = list(dict.fromkeys(
+            text for params in payload.values() for text in self.__get_embedded_texts(indexer, params)
+        ))
+        with self._model_lock:
+            embeddings = dict(zip(texts, indexer.get_embeddings(texts)))
+
         result = {}
         for unit_id, params in payload.items():
             if params['type'] == 'SKILL':
-                result[unit_id] = asdict(self.__get_skill_index_data(params))
+                result[unit_id] = asdict(self.__get_skill_index_data(params, embeddings))
             else:
-                result[unit_id] = asdict(self.__get_skill_function_index_data(params))
+                result[unit_id] = asdict(self.__get_skill_function_index_data(params, embeddings))
 
         return CommandResponse(
             payload=result,
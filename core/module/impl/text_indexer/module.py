@@ -1,30 +1,142 @@
-from typing import Dict, Callable
-
-import spacy
+import logging
+import threading
+from collections import deque
+from enum import Enum
+from time import perf_counter
+from typing import Dict, Optional, Deque
 
 from core.application.function import Function
 from core.communication.connection import SyncConnection
 from core.communication.connection_service import ConnectionService
+from core.communication.message import Message
+from core.controller.scheduler import RegisterCycleHandler, Waker
 from core.module.impl.text_indexer.functions import ConfigIndexationFunction, QueryIndexationFunction
 from core.module.module import Module
+from text_to_command.embedding_cache import EmbeddingCache
 from text_to_command.indexer import Indexer
+from text_to_command.projection import Projection, load_projection
+from text_to_command.vectors_store import MmapWordVectors
+
+
+class ReadinessState(Enum):
+    NOT_STARTED = "NOT_STARTED"
+    LOADING = "LOADING"
+    READY = "READY"
+    FAILED = "FAILED"
 
 
 class TextIndexerModule(Module):
+    """
+    Embeds config entities and user queries.
+    ---
+    The model is loaded on a background thread, so setup returns immediately. Messages that come before the model
+    is ready are queued and are handled in order from the event loop once it is.
+    With vectors_file the memory-mapped word vectors store (see text_to_command.vectors_store) is used
+    instead of the spaCy model.
+    """
+    model_name: str = "en_core_web_md"
+    vectors_file: Optional[str]
 
     _indexer: Indexer
+    _cache: EmbeddingCache
+    _projection: Optional[Projection]  # applied to query embeddings, config embeddings are stored unprojected
+    _state: ReadinessState
+    _pending: Deque[Message]  # messages received before the model was ready
+    _pending_waker: Waker  # wakes the event loop to drain pending messages
+    _handling_lock: threading.Lock  # guards the pending queue, messages come from dispatcher workers and the event loop
+    _model_lock: threading.Lock  # functions run on their thread pools, the model is called by one of them at a time
+    _setup_started: float
+
+    batch_size: int
+    n_process: int
+
+    def __init__(
+            self, id: str, cache_file: Optional[str] = None, cache_size: int = 10000, batch_size: int = 256,
+            n_process: int = 1, vectors_file: Optional[str] = None, projection_file: Optional[str] = None
+    ):
+        self.vectors_file = vectors_file
+        self._projection = load_projection(projection_file)
+        self._cache = EmbeddingCache(cache_file, max_size=cache_size)
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._state = ReadinessState.NOT_STARTED
+        self._pending = deque()
+        self._pending_waker = Waker()
+        self._handling_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        super().__init__(id)
+
+    @property
+    def state(self) -> ReadinessState:
+        return self._state
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats
 
     def _init_functions(self) -> Dict[str, Function]:
         return {
-            "configIndexationFunction": ConfigIndexationFunction(lambda: self._indexer),
-            "queryIndexation": QueryIndexationFunction(lambda: self._indexer)
+            "configIndexationFunction": ConfigIndexationFunction(lambda: self._indexer, self._model_lock),
+            "queryIndexation": QueryIndexationFunction(lambda: self._indexer, self._projection, self._model_lock)
         }
 
-    def register_cycle_handlers(self, register_cycle_handler: Callable[[Callable[[], None]], None]):
-        pass
+    def register_cycle_handlers(self, register_cycle_handler: RegisterCycleHandler):
+        register_cycle_handler(self._drain_pending, waker=self._pending_waker, name=f"{self.id}.drainPending")
+
+    def _get_model(self):
+        if self.vectors_file:
+            return MmapWordVectors(self.vectors_file)
+
+        import spacy  # not imported at all when the vectors store is used
+        return spacy.load(self.model_name)
+
+    def _load_model(self):
+        model_name = self.vectors_file or self.model_name
+        try:
+            self._indexer = Indexer(
+                self._get_model(), self._cache, batch_size=self.batch_size, n_process=self.n_process
+            )
+        except Exception:
+            logging.exception(f"Model {model_name} failed to load.")
+            self._state = ReadinessState.FAILED
+        else:
+            self._state = ReadinessState.READY
+            logging.info(f"Model {model_name} loaded in {perf_counter() - self._setup_started:.2f}s.")
+        self._pending_waker.wake()
+
+    def _on_message(self, event: Message):
+        with self._handling_lock:
+            # once something is queued, later messages wait too, so the order is kept
+            if self._state != ReadinessState.READY or self._pending:
+                self._pending.append(event)
+                self._pending_waker.wake()
+                return
+            self._on_event(event)
+
+    def _drain_pending(self):
+        with self._handling_lock:
+            self.__drain_pending()
+
+    def __drain_pending(self):
+        if not self._pending or self._state == ReadinessState.LOADING:
+            return
+
+        if self._state == ReadinessState.FAILED:
+            logging.error(f"{len(self._pending)} messages to {self.id} dropped, model is not loaded.")
+            self._pending.clear()
+            return
+
+        logging.info(
+            f"Model ready {perf_counter() - self._setup_started:.2f}s after setup, "
+            f"handling {len(self._pending)} queued messages."
+        )
+        while self._pending:
+            self._on_event(self._pending.popleft())
 
     def setup(self, connection_service: ConnectionService):
-        self._indexer = Indexer(spacy.load("en_core_web_md"))
+        self._setup_started = perf_counter()
+        self._state = ReadinessState.LOADING
+        threading.Thread(target=self._load_model, name=f"{self.id}ModelLoader", daemon=True).start()
 
-        self._connection = SyncConnection(self._on_event)
+        self._connection = SyncConnection(self._on_message)
         connection_service.add_connection(self.application_type, self.id, self._connection)
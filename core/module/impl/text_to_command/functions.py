@@ -1,41 +1,73 @@
-from typing import Dict, Callable, Optional, List
-
-import numpy as np
-import pandas as pd
-from Levenshtein import distance
+import logging
+from typing import Dict, Callable, Optional
 
+from core.application.execution import ExecutionPolicy
 from core.application.function import Function, CommandResponse
 from core.communication.callback import Callback
+from core.module.impl.text_to_command.storage import IndexStorage
+from core.skill.index import IndexData
 
 
-class GetSkillsRatingByQueryFunction(Function):
+class IndexStorageFunction(Function):
+    _storage: IndexStorage
+
+    def __init__(self, storage: IndexStorage):
+        super().__init__()
+        self._storage = storage
 
     def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
         return {
-            "main": self._get_rating
+            "load": self._load,
+            "update": self._update
+        }
+
+    @staticmethod
+    def _get_entities(payload: dict) -> Dict[str, IndexData]:
+        return {
+            entity_id: IndexData.from_dict(indexed_data) for entity_id, indexed_data in payload['entities'].items()
+        }
+
+    def _load(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
+        """Replaces the whole stored index
+        payload: {
+            version: int,
+            entities: {
+                (id: str): IndexData as dict,
+                ...
+            }
         }
+        """
+        self._storage.load(payload['version'], self._get_entities(payload))
 
-    def __get_exact_df(self, config: dict) -> pd.DataFrame:
-        exact_data = []
+    def _update(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
+        """Adds or replaces the listed entities, payload has the same format as for load"""
+        self._storage.update(payload['version'], self._get_entities(payload))
 
-        for config_id in config.keys():
-            exact_data.extend([
-                dict(zip(("id", "weight", "variants"), (config_id, *weighed_pair)))
-                for weighed_pair in config[config_id]['exact']
-            ])
 
-        return pd.DataFrame(exact_data)
+class GetSkillsRatingByQueryFunction(Function):
+    # rating index (with its copy of the nearest neighbour index) is replaced as a whole by updates, never changed
+    execution_policy = ExecutionPolicy.THREAD
+    _storage: IndexStorage
 
-    def __get_embedding_df(self, config: dict) -> pd.DataFrame:
-        embedding_data = []
+    def __init__(self, storage: IndexStorage):
+        super().__init__()
+        self._storage = storage
 
-        for config_id in config.keys():
-            embedding_data.extend([
-                dict(zip(("id", "weight", "embedding"), (config_id, *weighed_pair)))
-                for weighed_pair in config[config_id]['embeddings']
-            ])
+    def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
+        return {
+            "main": self._get_rating,
+            "mainBatch": self._get_ratings
+        }
+
+    def _check_index_version(self, payload: dict, version: Optional[int]) -> bool:
+        if version is None:
+            logging.error("Skills index is not loaded yet.")
+            return False
 
-        return pd.DataFrame(embedding_data)
+        if payload.get('index_version') != version:
+            logging.warning(f"Query issued for index version {payload.get('index_version')}, "
+                            f"rated with version {version}.")
+        return True
 
     def _get_rating(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
         """Main
@@ -43,76 +75,52 @@ class GetSkillsRatingByQueryFunction(Function):
             query: {
                 raw: str,
                 cleared: str,
-                embedding: list
+                embedding: list or float32 array
             },
-            config: {
-                (id: str): {
-                    exact: [
-                        (weight: float, variants: list),
-                        ...
-                    ],
-                    embedding: [
-                        (weight: float, embedding: list),
-                        ...
-                    ]
-                }
-            }
+            index_version: int
         }
+        Result: {rating: {entity id: score, ...}, index_version: int}, index_version is the version rated with
         """
-        skill_score_weight = 0.2
-
-        query_cleared = payload['query']['cleared']
-        query_embedding = payload['query']['embedding']
-
-        exact_df = self.__get_exact_df(payload['config'])
-        exact_df['similarity'] = exact_df['variants'].map(calculate_exact_similarity(query_cleared))
-
-        embedding_df = self.__get_embedding_df(payload['config'])
-        embedding_df['similarity'] = embedding_df['embedding'].map(calculate_embedding_similarity(query_embedding))
-
-        common_columns = ['id', 'weight', 'similarity']
-        common_df = pd.concat([
-            exact_df[common_columns],
-            embedding_df[common_columns]
-        ], ignore_index=True)
-
-        common_df['weighted_similarity'] = common_df['weight'] * common_df['similarity']
-        grouped = common_df.groupby("id")['weighted_similarity'].sum()
-
-        calculated_dict = grouped.to_dict()
-
-        # correct weights to take skill for function score calculation
-        for key, similarity in calculated_dict.items():
-            if "." in key:
-                skill_id, function_id = key.split(".")
-                calculated_dict[key] = skill_score_weight * calculated_dict[skill_id] + (1 - skill_score_weight
-                                                                                         ) * calculated_dict[key]
+        version, rating_index = self._storage.current
+        if not self._check_index_version(payload, version):
+            return
 
         return CommandResponse(
-            payload=dict(sorted(calculated_dict.items(), key=lambda x: x[1], reverse=True)[:5]),
+            payload={
+                "rating": rating_index.get_rating(payload['query']['cleared'], payload['query']['embedding']),
+                "index_version": version
+            },
             context={},
             target=callback.target
         )
 
+    def _get_ratings(self, payload: dict, context: dict, callback: Optional[Callback]) -> Optional[CommandResponse]:
+        """
+        payload: {
+            queries: [
+                {
+                    raw: str,
+                    cleared: str,
+                    embedding: list or float32 array
+                },
+                ...
+            ],
+            index_version: int
+        }
+        Result: {ratings: [{entity id: score, ...}, ...], index_version: int}
+        """
+        version, rating_index = self._storage.current
+        if not self._check_index_version(payload, version):
+            return
 
-def calculate_exact_similarity(query: str):
-    def internal(variants: List[str]):
-        similarity_score = 0
-        for variant in variants:
-            candidate_score = 1 - distance(query, variant) / max(len(query), len(variant))
-            if candidate_score > similarity_score:
-                similarity_score = candidate_score
-        return similarity_score
-
-    return internal
-
+        queries = payload['queries']
+        ratings = rating_index.get_ratings([q['cleared'] for q in queries], [q['embedding'] for q in queries])
 
-def calculate_embedding_similarity(query_embedding: np.array):
-    def internal(embedding: list):
-        np_embedding = np.array(embedding)
-        return max(
-            0,
-            np.dot(query_embedding, np_embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(np_embedding))
+        return CommandResponse(
+            payload={
+                "ratings": ratings,
+                "index_version": version
+            },
+            context={},
+            target=callback.target
         )
-
-    return internal
@@ -1,24 +1,41 @@
-from typing import Dict, Callable
+from typing import Dict, Optional
 
 from core.application.function import Function
 from core.communication.connection import Connection, SyncConnection
 from core.communication.connection_service import ConnectionService
-from core.module.impl.text_to_command.functions import GetSkillsRatingByQueryFunction
+from core.controller.scheduler import RegisterCycleHandler
+from core.module.impl.text_to_command.functions import GetSkillsRatingByQueryFunction, IndexStorageFunction
+from core.module.impl.text_to_command.storage import IndexStorage
 from core.module.module import Module
+from text_to_command.projection import load_projection
 
 
 class TextToCommandModule(Module):
 
     _connection: Connection
+    _storage: IndexStorage
+
+    def __init__(
+            self,
+            id: str,
+            ann_file: Optional[str] = None,
+            embeddings_dtype: str = "float32",
+            projection_file: Optional[str] = None
+    ):
+        self._storage = IndexStorage(
+            ann_file=ann_file, embeddings_dtype=embeddings_dtype, projection=load_projection(projection_file)
+        )
+        super().__init__(id)
 
     def _init_functions(self) -> Dict[str, Function]:
         return {
-            "getSkillsRatingByQuery": GetSkillsRatingByQueryFunction()
+            "indexStorage": IndexStorageFunction(self._storage),
+            "getSkillsRatingByQuery": GetSkillsRatingByQueryFunction(self._storage)
         }
 
     def setup(self, connection_service: ConnectionService):
         self._connection = SyncConnection(self._on_event)
         connection_service.add_connection(self.application_type, self.id, self._connection)
 
-    def register_cycle_handlers(self, register_cycle_handler: Callable[[Callable[[], None]], None]):
+    def register_cycle_handlers(self, register_cycle_handler: RegisterCycleHandler):
         pass
@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.skill.index import IndexData
+from text_to_command.ann import NearestNeighbourIndex
+from text_to_command.edit_distance import VariantsDistance
+from text_to_command.quantization import QuantizedMatrix, spill_to_memmap
+from text_to_command.trigram_index import TrigramIndex
+
+
+def get_unit_key(entity_id: str, unit_number: int) -> str:
+    """Key of an entity EmbeddingWeightedUnit in nearest neighbour indexes"""
+    return f"{entity_id}#{unit_number}"
+
+
+class RatingIndex:
+    """
+    Scoring engine over the indexed skills config.
+    ---
+    All EmbeddingWeightedUnits are kept in one pre-normalized float32 matrix together with weight and owner vectors,
+    so a query is scored with one matrix-vector product and a segment sum per entity.
+    With a nearest neighbour index only the ann_candidates most similar units are scored,
+    the similarity of the rest counts as zero.
+    All variants of ExactWeightedUnits are compared with the query in one batch, similarities below
+    exact_similarity_floor count as zero. Catalogs with more than exact_shortlist_limit variants compare the query
+    only with variants of entities shortlisted by trigram index, the similarity of the rest counts as zero.
+    With float16 or int8 embeddings_dtype units are scored on the quantized matrix, then embedding scores of
+    rerank_candidates best entities (and their skills) are recalculated with full precision rows,
+    which are spilled to a memory-mapped temp file.
+    """
+    skill_score_weight: float = 0.2
+    rerank_candidates: int = 32
+    ann_candidates: int = 64
+    exact_similarity_floor: float = 0.
+    exact_shortlist_limit: int = 2048
+    shortlist_min_overlap: float = 0.2
+
+    ids: List[str]
+
+    _embeddings: np.ndarray  # (n_units, dim), L2-normalized rows
+    _embedding_weights: np.ndarray  # (n_units,)
+    _embedding_owners: np.ndarray  # (n_units,), position of the owner in ids
+    _segment_starts: np.ndarray  # first unit of each owner, units of an owner are contiguous
+    _segment_owners: np.ndarray  # owner of each segment
+    _owner_unit_starts: np.ndarray  # (n_entities,), first unit of each entity
+    _owner_unit_counts: np.ndarray  # (n_entities,)
+    _quantized: Optional[QuantizedMatrix]  # coarse copy of _embeddings, None for float32 embeddings
+
+    _variants: VariantsDistance  # variants of all exact units, variants of a unit are contiguous
+    _exact_weights: np.ndarray  # (n_exact_units,)
+    _exact_owners: np.ndarray  # (n_exact_units,), position of the owner in ids
+    _exact_starts: np.ndarray  # first variant of each exact unit that has variants
+    _exact_scored_units: np.ndarray  # exact units that have variants
+    _trigram_index: Optional[TrigramIndex]
+    _variant_owners: np.ndarray  # (n_variants,), position of the owner in ids
+    _owner_variant_starts: np.ndarray  # (n_entities,), first variant of each entity, variants of an entity are contiguous
+    _owner_variant_counts: np.ndarray  # (n_entities,)
+
+    _functions: np.ndarray  # positions of skill functions in ids
+    _function_skills: np.ndarray  # positions of their skills in ids
+    _entity_skills: np.ndarray  # (n_entities,), position of the skill of each function, -1 for the rest
+
+    _ann: Optional[NearestNeighbourIndex]
+    _unit_rows: Dict[str, int]  # unit key to its row in _embeddings
+
+    def __init__(
+            self,
+            config: Dict[str, IndexData],
+            ann: Optional[NearestNeighbourIndex] = None,
+            embeddings_dtype: str = "float32"
+    ):
+        self.ids = list(config.keys())
+        positions = {entity_id: i for i, entity_id in enumerate(self.ids)}
+
+        vectors, weights, owners = [], [], []
+        variants, variants_counts, exact_weights, exact_owners = [], [], [], []
+        self._unit_rows = {}
+        for i, (entity_id, indexed_data) in enumerate(config.items()):
+            for unit in indexed_data.exact:
+                variants.extend(unit.variants)
+                variants_counts.append(len(unit.variants))
+                exact_weights.append(unit.weight)
+                exact_owners.append(i)
+            for unit_number, unit in enumerate(indexed_data.embeddings):
+                self._unit_rows[get_unit_key(entity_id, unit_number)] = len(vectors)
+                vectors.append(unit.embedding)
+                weights.append(unit.weight)
+                owners.append(i)
+        self._ann = ann
+
+        self._variants = VariantsDistance(variants)
+        self._trigram_index = TrigramIndex(variants) if len(variants) > self.exact_shortlist_limit else None
+        self._exact_weights = np.asarray(exact_weights, dtype=np.float64)
+        self._exact_owners = np.asarray(exact_owners, dtype=np.intp)
+        variants_counts = np.asarray(variants_counts, dtype=np.intp)
+        self._exact_scored_units = np.flatnonzero(variants_counts)
+        self._exact_starts = (np.cumsum(variants_counts) - variants_counts)[self._exact_scored_units]
+
+        self._variant_owners = np.repeat(self._exact_owners, variants_counts)
+        self._owner_variant_counts = np.bincount(self._variant_owners, minlength=len(self.ids))
+        self._owner_variant_starts = np.cumsum(self._owner_variant_counts) - self._owner_variant_counts
+
+        embeddings = normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        self._quantized = None
+        if embeddings_dtype != "float32" and len(embeddings):
+            self._quantized = QuantizedMatrix(embeddings, embeddings_dtype)
+            embeddings = spill_to_memmap(embeddings)
+        self._embeddings = embeddings
+        self._embedding_weights = np.asarray(weights, dtype=np.float32)
+        self._embedding_owners = np.asarray(owners, dtype=np.intp)
+        self._segment_starts = np.flatnonzero(np.diff(self._embedding_owners, prepend=-1))
+        self._segment_owners = self._embedding_owners[self._segment_starts]
+        self._owner_unit_counts = np.bincount(self._embedding_owners, minlength=len(self.ids))
+        self._owner_unit_starts = np.cumsum(self._owner_unit_counts) - self._owner_unit_counts
+
+        functions, function_skills = [], []
+        for i, entity_id in enumerate(self.ids):
+            if "." in entity_id:
+                skill_id, _ = entity_id.split(".")
+                if skill_id in positions:
+                    functions.append(i)
+                    function_skills.append(positions[skill_id])
+        self._functions = np.asarray(functions, dtype=np.intp)
+        self._function_skills = np.asarray(function_skills, dtype=np.intp)
+        self._entity_skills = np.full(len(self.ids), -1, dtype=np.intp)
+        self._entity_skills[self._functions] = self._function_skills
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _get_embedding_scores(self, query_embedding: Optional[list]) -> np.ndarray:
+        if query_embedding is None or not len(self._embedding_owners):
+            return np.zeros(len(self.ids))
+
+        if self._ann is not None:
+            return self._get_ann_embedding_scores(query_embedding)
+
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        if self._quantized is not None:
+            similarity = np.maximum(self._quantized.dot(query), 0)
+        else:
+            similarity = np.maximum(self._embeddings @ query, 0)
+        return np.bincount(
+            self._embedding_owners, weights=similarity * self._embedding_weights, minlength=len(self.ids)
+        )
+
+    def _get_ann_embedding_scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        candidates = self._ann.search(np.asarray(query_embedding, dtype=np.float32), self.ann_candidates)
+        rows = np.asarray([self._unit_rows[key] for key, _ in candidates if key in self._unit_rows], dtype=np.intp)
+        similarity = np.maximum([s for key, s in candidates if key in self._unit_rows], 0)
+        return np.bincount(
+            self._embedding_owners[rows], weights=similarity * self._embedding_weights[rows], minlength=len(self.ids)
+        )
+
+    def _get_embedding_scores_batch(self, query_embeddings: List[Optional[list]]) -> np.ndarray:
+        scores = np.zeros((len(query_embeddings), len(self.ids)))
+        if not len(self._embedding_owners):
+            return scores
+
+        queries = np.zeros((len(query_embeddings), self._embeddings.shape[1]), dtype=np.float32)
+        for i, query_embedding in enumerate(query_embeddings):
+            if query_embedding is not None:
+                queries[i] = query_embedding
+
+        if self._ann is not None:
+            for i, query in enumerate(queries):
+                scores[i] = self._get_ann_embedding_scores(query)
+            return scores
+
+        if self._quantized is not None:
+            similarity = self._quantized.dot(normalize_rows(queries)).T
+        else:
+            similarity = normalize_rows(queries) @ self._embeddings.T
+        weighted = np.maximum(similarity, 0) * self._embedding_weights
+        scores[:, self._segment_owners] = np.add.reduceat(weighted, self._segment_starts, axis=1)
+        return scores
+
+    def _get_exact_scores(self, query_cleared: str) -> np.ndarray:
+        if not len(self._exact_scored_units):
+            return np.zeros(len(self.ids))
+
+        if self._trigram_index is not None:
+            rows = self._get_shortlisted_variants(query_cleared)
+            similarities = np.zeros(len(self._variants))
+            similarities[rows] = self._variants.get_similarities(query_cleared, self.exact_similarity_floor, rows)
+        else:
+            similarities = self._variants.get_similarities(query_cleared, self.exact_similarity_floor)
+        units = self._exact_scored_units
+        units_similarity = np.maximum.reduceat(similarities, self._exact_starts)
+        return np.bincount(
+            self._exact_owners[units], weights=self._exact_weights[units] * units_similarity, minlength=len(self.ids)
+        )
+
+    def _get_shortlisted_variants(self, query_cleared: str) -> np.ndarray:
+        """All variants of entities having at least one variant shortlisted by trigrams"""
+        owners = np.unique(self._variant_owners[
+            self._trigram_index.shortlist(query_cleared, self.shortlist_min_overlap)
+        ])
+        return get_owned_rows(owners, self._owner_variant_starts, self._owner_variant_counts)
+
+    def _rerank(self, exact_scores: np.ndarray, embedding_scores: np.ndarray, query_embedding: list) -> np.ndarray:
+        """Embedding scores with full precision ones for the best entities by coarse scores and their skills"""
+        scores = self._combine_with_skills(exact_scores + embedding_scores)
+        k = min(self.rerank_candidates, len(self.ids))
+        if k <= 0:
+            return embedding_scores
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        skills = self._entity_skills[candidates]
+        candidates = np.unique(np.concatenate([candidates, skills[skills >= 0]]))
+
+        rows = get_owned_rows(candidates, self._owner_unit_starts, self._owner_unit_counts)
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        similarity = np.maximum(self._embeddings[rows] @ query, 0)
+        exact_embedding_scores = np.bincount(
+            self._embedding_owners[rows], weights=similarity * self._embedding_weights[rows], minlength=len(self.ids)
+        )
+        embedding_scores = embedding_scores.copy()
+        embedding_scores[candidates] = exact_embedding_scores[candidates]
+        return embedding_scores
+
+    def _is_reranked(self, query_embedding: Optional[list]) -> bool:
+        return self._quantized is not None and self._ann is None and query_embedding is not None
+
+    def _combine_with_skills(self, scores: np.ndarray) -> np.ndarray:
+        """Corrects function scores to take their skill score into account."""
+        scores = scores.copy()
+        scores[..., self._functions] = (
+                self.skill_score_weight * scores[..., self._function_skills] +
+                (1 - self.skill_score_weight) * scores[..., self._functions]
+        )
+        return scores
+
+    def get_scores(self, query_cleared: str, query_embedding: Optional[list]) -> np.ndarray:
+        """Returns scores of all entities, aligned with ids, a query without embedding gets exact scores only."""
+        exact_scores = self._get_exact_scores(query_cleared)
+        embedding_scores = self._get_embedding_scores(query_embedding)
+        if self._is_reranked(query_embedding):
+            embedding_scores = self._rerank(exact_scores, embedding_scores, query_embedding)
+        return self._combine_with_skills(exact_scores + embedding_scores)
+
+    def get_rating(self, query_cleared: str, query_embedding: Optional[list], limit: int = 5) -> Dict[str, float]:
+        scores = self.get_scores(query_cleared, query_embedding)
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return {self.ids[i]: float(scores[i]) for i in top}
+
+    def get_ratings(
+            self, queries_cleared: List[str], query_embeddings: List[Optional[list]], limit: int = 5
+    ) -> List[Dict[str, float]]:
+        """Rates a batch of queries with one matrix-matrix product, queries without embedding get exact scores only"""
+        exact_scores = np.asarray([self._get_exact_scores(q) for q in queries_cleared]).reshape(-1, len(self.ids))
+        embedding_scores = self._get_embedding_scores_batch(query_embeddings)
+        for i, query_embedding in enumerate(query_embeddings):
+            if self._is_reranked(query_embedding):
+                embedding_scores[i] = self._rerank(exact_scores[i], embedding_scores[i], query_embedding)
+        scores = self._combine_with_skills(exact_scores + embedding_scores)
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :limit]
+        return [{self.ids[i]: float(row_scores[i]) for i in row_top} for row_scores, row_top in zip(scores, top)]
+
+
+def get_owned_rows(owners: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Rows of all given owners, where rows of an owner are contiguous: counts of them starting from its start"""
+    counts = counts[owners]
+    offsets = np.repeat(starts[owners] - (np.cumsum(counts) - counts), counts)
+    return offsets + np.arange(counts.sum())
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row, rows with zero norm stay zero."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
@@ -0,0 +1,187 @@
+import logging
+import os
+from typing import Dict, Optional, Iterable, NamedTuple
+
+import numpy as np
+
+from core.module.impl.text_to_command.rating import RatingIndex, get_unit_key
+from core.skill.index import IndexData, EmbeddingWeightedUnit
+from text_to_command.ann import IVFIndex, normalize
+from text_to_command.projection import Projection
+from text_to_command.quantization import spill_to_memmap
+
+
+class VersionedRatingIndex(NamedTuple):
+    """Rating index with the version it was built for, replaced together so raters never mix them up"""
+    version: Optional[int]
+    rating_index: RatingIndex
+
+
+class IndexStorage:
+    """
+    Versioned copy of the skills index, held by the TextToCommand module.
+    ---
+    Loaded once from UserQueryProcessing and updated with the entities it re-indexes, so queries only need to carry
+    the index version they were issued against.
+    Catalogs with more than exact_search_limit embeddings are searched through an IVF index, which is updated
+    incrementally and persisted to ann_file, so it is not re-trained on every start. Each rating index gets
+    a copy of it, so ratings computed on other threads never see the index change under them.
+    embeddings_dtype (float32, float16 or int8) is the precision the rating index keeps embeddings in.
+    With projection, embeddings are stored reduced, queries have to be projected with the same projection.
+    Received embeddings (float lists) are not kept: embeddings of each load or update are stored as rows of one
+    float32 matrix, which is spilled to a memory-mapped temp file when the rating index scores quantized copies,
+    so only the quantized matrix stays resident.
+    """
+    _entities: Dict[str, IndexData]
+    _current: VersionedRatingIndex
+
+    ann_file: Optional[str]
+    exact_search_limit: int
+    n_probe: int
+    embeddings_dtype: str
+    projection: Optional[Projection]
+    _ann: Optional[IVFIndex]
+    _ann_trained_size: int
+
+    def __init__(
+            self,
+            ann_file: Optional[str] = None,
+            exact_search_limit: int = 2048,
+            n_probe: int = 8,
+            embeddings_dtype: str = "float32",
+            projection: Optional[Projection] = None
+    ):
+        self._entities = {}
+        self._current = VersionedRatingIndex(None, RatingIndex({}))
+
+        self.ann_file = ann_file
+        self.exact_search_limit = exact_search_limit
+        self.n_probe = n_probe
+        self.embeddings_dtype = embeddings_dtype
+        self.projection = projection
+        self._ann = None
+        self._ann_trained_size = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._current.version
+
+    @property
+    def rating_index(self) -> RatingIndex:
+        return self._current.rating_index
+
+    @property
+    def current(self) -> VersionedRatingIndex:
+        """Rating index and its version at once, reading them one by one can mix two versions under updates"""
+        return self._current
+
+    def _compact(self, entities: Dict[str, IndexData]) -> Dict[str, IndexData]:
+        """Copies of entities with embeddings as rows of one (projected) matrix, received IndexData isn't changed"""
+        vectors = [unit.embedding for indexed_data in entities.values() for unit in indexed_data.embeddings]
+        if not vectors:
+            return dict(entities)
+
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        if self.projection is not None:
+            matrix = self.projection.transform(matrix)
+        if self.embeddings_dtype != "float32":
+            matrix = spill_to_memmap(matrix)
+
+        compacted = {}
+        row = 0
+        for entity_id, indexed_data in entities.items():
+            embeddings = []
+            for unit in indexed_data.embeddings:
+                embeddings.append(EmbeddingWeightedUnit(unit.weight, matrix[row]))
+                row += 1
+            compacted[entity_id] = IndexData(indexed_data.exact, embeddings)
+        return compacted
+
+    def load(self, version: int, entities: Dict[str, IndexData]):
+        self._entities = self._compact(entities)
+        self._ann = None
+        self._rebuild(version, self._entities.keys())
+
+    def update(self, version: int, entities: Dict[str, IndexData]):
+        if self.version is not None and version <= self.version:
+            logging.warning(f"Index update {version} is not newer than the stored index {self.version}.")
+        if self._ann is not None:
+            self._ann.remove(self._get_unit_keys(entities.keys()))
+        self._entities = {**self._entities, **self._compact(entities)}
+        self._rebuild(version, entities.keys())
+
+    def _get_unit_keys(self, entity_ids: Iterable[str]):
+        return [
+            get_unit_key(entity_id, i)
+            for entity_id in entity_ids if entity_id in self._entities
+            for i in range(len(self._entities[entity_id].embeddings))
+        ]
+
+    def _get_units(self, entity_ids: Iterable[str]) -> Dict[str, list]:
+        return {
+            get_unit_key(entity_id, i): unit.embedding
+            for entity_id in entity_ids
+            for i, unit in enumerate(self._entities[entity_id].embeddings)
+        }
+
+    def _rebuild(self, version: int, changed_ids: Iterable[str]):
+        # rating index is replaced as a whole, readers never see a partially built one
+        self._current = VersionedRatingIndex(
+            version, RatingIndex(self._entities, self._get_ann(changed_ids), self.embeddings_dtype)
+        )
+        logging.info(f"Index version {version} stored: {len(self._entities)} entities.")
+
+    def _get_ann(self, changed_ids: Iterable[str]) -> Optional[IVFIndex]:
+        units_count = sum(len(indexed_data.embeddings) for indexed_data in self._entities.values())
+        if units_count <= self.exact_search_limit:
+            self._ann = None
+            return None
+
+        if self._ann is None:
+            self._ann = self._load_ann()
+            changed_ids = self._entities.keys()
+
+        units = self._get_units(changed_ids)
+        units = {key: vector for key, vector in units.items() if key not in self._ann}
+        if units:
+            self._ann.add(list(units.keys()), np.asarray(list(units.values()), dtype=np.float32))
+
+        if len(self._ann) > 2 * self._ann_trained_size:
+            self._train_ann()
+
+        if self.ann_file:
+            self._ann.save(self.ann_file)
+        return self._ann.copy()
+
+    def _train_ann(self):
+        self._ann.n_lists = max(1, int(np.sqrt(len(self._ann))))
+        self._ann.train()
+        self._ann_trained_size = len(self._ann)
+        logging.info(f"Nearest neighbour index trained on {len(self._ann)} embeddings.")
+
+    def _load_ann(self) -> IVFIndex:
+        """Returns persisted index without units that don't match the received index or a freshly trained one."""
+        units = self._get_units(self._entities.keys())
+        vectors = np.asarray(list(units.values()), dtype=np.float32)
+
+        ann = IVFIndex.load(self.ann_file) if self.ann_file and os.path.exists(self.ann_file) else None
+        # index persisted for other dimensions (e.g. before projection was changed) can't be reused
+        if ann is not None and ann.centroids.shape[1] == vectors.shape[1]:
+            ann.n_probe = self.n_probe
+            stale = [key for key in ann.keys() if key not in units]
+            stale.extend(
+                key for key, vector in zip(units.keys(), normalize(vectors))
+                if key in ann and not np.allclose(ann.get_vector(key), vector, atol=1e-5)
+            )
+            ann.remove(stale)
+            self._ann_trained_size = len(ann)
+            return ann
+
+        ann = IVFIndex(vectors.shape[1], n_lists=max(1, int(np.sqrt(len(vectors)))), n_probe=self.n_probe)
+        ann.train(vectors)
+        self._ann_trained_size = len(vectors)
+        return ann
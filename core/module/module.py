@@ -1,8 +1,8 @@
 from abc import abstractmethod, ABCMeta
-from typing import Callable
 
 from core.application.application import Application
 from core.communication.command_identifier import ApplicationType
+from core.controller.scheduler import RegisterCycleHandler
 
 
 class Module(Application, metaclass=ABCMeta):
@@ -11,6 +11,10 @@ class Module(Application, metaclass=ABCMeta):
         super().__init__(id, ApplicationType.MODULE)
 
     @abstractmethod
-    def register_cycle_handlers(self, register_cycle_handler: Callable[[Callable[[], None]], None]):
-        """Adds all function that should be executed on each cycle of event loop"""
+    def register_cycle_handlers(self, register_cycle_handler: RegisterCycleHandler):
+        """
+        Adds functions that should be executed by the event loop, each with its wake-up source:
+        register_cycle_handler(handler, interval=seconds) or (handler, fd=readable fd) or (handler, waker=Waker()).
+        Handlers without a source are polled every Scheduler.default_interval seconds.
+        """
         pass
@@ -1,6 +1,8 @@
 import json
-from dataclasses import dataclass, asdict
-from typing import Dict, List, Tuple, NamedTuple
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, NamedTuple, Union
+
+import numpy as np
 
 
 class ExactWeightedUnit(NamedTuple):
@@ -10,7 +12,7 @@ class ExactWeightedUnit(NamedTuple):
 
 class EmbeddingWeightedUnit(NamedTuple):
     weight: float
-    embedding: list
+    embedding: Union[list, np.ndarray]  # rows of memory-mapped embeddings storage are kept as arrays
 
 
 @dataclass
@@ -39,10 +41,15 @@ class IndexData:
         return target_value - eps <= weights_sum <= target_value + eps
 
     def serialize(self) -> str:
-        return json.dumps(asdict(self))
+        return json.dumps(self.to_dict())
 
     def to_dict(self):
-        return asdict(self)
+        return dict(
+            exact=[ExactWeightedUnit(unit.weight, list(unit.variants)) for unit in self.exact],
+            embeddings=[
+                EmbeddingWeightedUnit(unit.weight, np.asarray(unit.embedding).tolist()) for unit in self.embeddings
+            ]
+        )
 
     @classmethod
     def from_dict(cls, data: dict) -> 'IndexData':
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+from slugify import slugify
+
+from core.skill.function_configuration import FunctionConfiguration
+from core.skill.index import IndexData, ExactWeightedUnit, EmbeddingWeightedUnit
+from core.skill.skill_configuration import SkillConfiguration
+
+
+class SkillsConfigStorage:
+    """
+    Skills config on disk: JSON metadata of skills and functions plus a float32 .npy sidecar with all embeddings.
+    ---
+    JSON references embeddings by row of the sidecar, which is memory-mapped on load, so only rows that are
+    actually read become resident. Legacy configs with embeddings inlined into JSON are still loaded
+    and are rewritten in the split format.
+    Each snapshot is published atomically: the sidecar of a new generation and the JSON are written to temp files
+    and renamed, so a crash leaves either the previous or the new snapshot. Entities re-indexed between snapshots
+    are appended to a JSON-lines journal, which is replayed on load and dropped by the next snapshot.
+    """
+    FORMAT_VERSION = 2
+
+    config_file: str
+    generation: int  # snapshot generation, journal entries of other generations are ignored
+    journal_entries: int  # entries of the current generation in the journal
+
+    _embeddings_file: Optional[str]
+
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self.generation = 0
+        self.journal_entries = 0
+        self._embeddings_file = None
+
+    @property
+    def journal_file(self) -> str:
+        return os.path.splitext(self.config_file)[0] + ".journal.jsonl"
+
+    def _get_embeddings_file(self, generation: int) -> str:
+        return os.path.splitext(self.config_file)[0] + f".embeddings.{generation}.npy"
+
+    def load(self) -> List[SkillConfiguration]:
+        with open(self.config_file) as f:
+            data = json.load(f)
+
+        if isinstance(data, list):
+            logging.info(f"Config {self.config_file} has legacy format, migrating it.")
+            config = self._deserialize(data, None)
+            self.save(config)
+            return config
+
+        self.generation = data.get('generation', 0)
+        self._embeddings_file = os.path.join(os.path.dirname(self.config_file), data['embeddings_file'])
+        config = self._deserialize(data['skills'], np.load(self._embeddings_file, mmap_mode='r'))
+        self._replay_journal(config)
+        return config
+
+    def save(self, config: List[SkillConfiguration]):
+        """Writes a full snapshot of the config, journal is emptied."""
+        embeddings = []
+        skills = []
+        for skill in config:
+            skills.append(dict(
+                id=skill.id,
+                name=skill.name,
+                description=skill.description,
+                tags=skill.tags,
+                functions=[dict(
+                    id=slugify(function.name),
+                    name=function.name,
+                    description=function.description,
+                    call_examples=function.call_examples,
+                    indexed_data=self._serialize_index(function.indexed_data, embeddings)
+                ) for function in skill.functions.values()],
+                indexed_data=self._serialize_index(skill.indexed_data, embeddings)
+            ))
+
+        generation = self.generation + 1
+        embeddings_file = self._get_embeddings_file(generation)
+        with self._open_replacing(embeddings_file, 'wb') as f:
+            if embeddings:
+                np.save(f, np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+            else:  # nothing is indexed yet
+                np.save(f, np.zeros((0, 0), dtype=np.float32))
+        with self._open_replacing(self.config_file, 'w') as f:
+            json.dump({
+                "format": self.FORMAT_VERSION,
+                "generation": generation,
+                "embeddings_file": os.path.basename(embeddings_file),
+                "skills": skills
+            }, f)
+
+        # journal entries of the previous generation are ignored from now on, so it is safe to drop them
+        with open(self.journal_file, 'w'):
+            pass
+        # already mapped rows of the previous sidecar stay valid after it is unlinked
+        if self._embeddings_file and os.path.exists(self._embeddings_file) and self._embeddings_file != embeddings_file:
+            os.remove(self._embeddings_file)
+
+        self.generation = generation
+        self.journal_entries = 0
+        self._embeddings_file = embeddings_file
+
+    def append(self, entities: Dict[str, IndexData]):
+        """Appends indexed data of re-indexed entities to the journal of the current snapshot."""
+        with open(self.journal_file, 'a') as f:
+            for entity_id, indexed_data in entities.items():
+                f.write(json.dumps({
+                    "generation": self.generation,
+                    "id": entity_id,
+                    "indexed_data": indexed_data.to_dict()
+                }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_entries += len(entities)
+
+    def _replay_journal(self, config: List[SkillConfiguration]):
+        if not os.path.exists(self.journal_file):
+            return
+
+        skills = {skill.id: skill for skill in config}
+        with open(self.journal_file) as f:
+            lines = f.readlines()
+
+        for line_number, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # only the last entry can be torn by a crash in the middle of append
+                logging.warning(f"Skipping corrupted entry {line_number} of {self.journal_file}.")
+                continue
+            if entry['generation'] != self.generation:
+                continue
+
+            skill_id, _, function_id = entry['id'].partition(".")
+            skill = skills.get(skill_id)
+            if skill is None or (function_id and function_id not in skill.functions):
+                logging.warning(f"Journal entry for unknown entity {entry['id']} is skipped.")
+                continue
+            indexed_data = IndexData.from_dict(entry['indexed_data'])
+            if function_id:
+                skill.functions[function_id].indexed_data = indexed_data
+            else:
+                skill.indexed_data = indexed_data
+            self.journal_entries += 1
+
+        if self.journal_entries:
+            logging.info(f"{self.journal_entries} journal entries replayed onto {self.config_file}.")
+
+    @staticmethod
+    @contextmanager
+    def _open_replacing(path: str, mode: str):
+        """Writes to a temp file, which replaces path only when it is completely written."""
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, mode) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _serialize_index(indexed_data: Optional[IndexData], embeddings: list) -> Optional[dict]:
+        if not indexed_data:
+            return None
+
+        units = []
+        for unit in indexed_data.embeddings:
+            units.append((unit.weight, len(embeddings)))
+            embeddings.append(unit.embedding)
+
+        return dict(
+            exact=[tuple(unit) for unit in indexed_data.exact],
+            embeddings=units
+        )
+
+    @staticmethod
+    def _deserialize_index(data: Optional[dict], embeddings: Optional[np.ndarray]) -> Optional[IndexData]:
+        if not data:
+            return None
+        if embeddings is None:
+            return IndexData.from_dict(data)
+
+        return IndexData(
+            exact=[ExactWeightedUnit(*unit) for unit in data['exact']],
+            embeddings=[EmbeddingWeightedUnit(weight, embeddings[row]) for weight, row in data['embeddings']]
+        )
+
+    def _deserialize(self, data: List[dict], embeddings: Optional[np.ndarray]) -> List[SkillConfiguration]:
+        result = []
+        for config_data in data:
+            functions = [FunctionConfiguration(
+                name=f['name'],
+                description=f['description'],
+                call_examples=f['call_examples'],
+                indexed_data=self._deserialize_index(f['indexed_data'], embeddings)
+            ) for f in config_data['functions']]
+
+            result.append(SkillConfiguration(
+                name=config_data['name'],
+                description=config_data['description'],
+                tags=config_data['tags'],
+                functions=functions,
+                indexed_data=self._deserialize_index(config_data['indexed_data'], embeddings)
+            ))
+
+        return result
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from core.skill.index import IndexData
+from core.skill.skill_configuration import SkillConfiguration
+from core.skill.storage import SkillsConfigStorage
+
+
+class SkillsConfigWriter:
+    """
+    Write-behind persistence of the skills config.
+    ---
+    Changes are only recorded by the caller, a background thread writes them once no new changes
+    came for coalesce_delay seconds, so a burst of re-indexed entities results in one write.
+    Re-indexed entities are appended to the storage journal, a full snapshot is written when the journal
+    grows beyond compact_after entries or when the whole config was replaced.
+    """
+    coalesce_delay: float
+    compact_after: int
+
+    _storage: SkillsConfigStorage
+    _condition: threading.Condition
+    _thread: Optional[threading.Thread]
+    _config: List[SkillConfiguration]  # the latest config, written by snapshots
+    _pending: Dict[str, IndexData]  # entities changed since the last write
+    _snapshot_pending: bool
+    _snapshot_required: bool  # the last write failed, so the journal may miss entities
+    _changes: int  # number of scheduled changes, tells whether new ones came while coalescing
+    _flushing: int  # number of threads waiting in flush
+    _writing: bool
+    _closed: bool
+
+    def __init__(self, storage: SkillsConfigStorage, coalesce_delay: float = 0.5, compact_after: int = 256):
+        self.coalesce_delay = coalesce_delay
+        self.compact_after = compact_after
+
+        self._storage = storage
+        self._condition = threading.Condition()
+        self._thread = None
+        self._config = []
+        self._pending = {}
+        self._snapshot_pending = False
+        self._snapshot_required = False
+        self._changes = 0
+        self._flushing = 0
+        self._writing = False
+        self._closed = False
+        atexit.register(self.close)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending) or self._snapshot_pending
+
+    def schedule(self, config: List[SkillConfiguration], changed: Optional[Dict[str, IndexData]] = None):
+        """Records config to be written, only changed entities are journaled, without them a snapshot is written."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Config writer is closed.")
+            self._config = list(config)
+            if changed is None:
+                self._snapshot_pending = True
+            else:
+                self._pending.update(changed)
+            self._changes += 1
+            self._condition.notify_all()
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="SkillsConfigWriter", daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until all scheduled changes are written, returns False on timeout."""
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self.has_pending and not self._writing, timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self.has_pending or self._closed)
+                if not self.has_pending:
+                    return
+
+                # coalesces changes until none came for coalesce_delay, the writer is flushed or closed
+                while not self._closed and not self._flushing:
+                    changes = self._changes
+                    self._condition.wait(self.coalesce_delay)
+                    if self._changes == changes:
+                        break
+
+                config, changed, snapshot = self._config, self._pending, self._snapshot_pending
+                self._pending, self._snapshot_pending = {}, False
+                self._writing = True
+
+            try:
+                self._write(config, changed, snapshot)
+            except Exception:
+                logging.exception("Skills config write failed, the next write will be a full snapshot.")
+                self._snapshot_required = True
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _write(self, config: List[SkillConfiguration], changed: Dict[str, IndexData], snapshot: bool):
+        if snapshot or self._snapshot_required or self._storage.journal_entries + len(changed) > self.compact_after:
+            self._storage.save(config)
+            self._snapshot_required = False
+            logging.info(f"Skills config snapshot {self._storage.generation} written.")
+        else:
+            self._storage.append(changed)
+            logging.info(f"{len(changed)} re-indexed entities journaled.")
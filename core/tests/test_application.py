@@ -0,0 +1,63 @@
+from typing import Callable, Dict, Optional
+
+from core.application.application import Application
+from core.application.function import CommandResponse, Function
+from core.communication.callback import Callback
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.connection_service import ConnectionService
+from core.communication.message import Message
+
+UI = CommandIdentifier(ApplicationType.MODULE, "UI", "core", "userQuery")
+
+
+def get_target(function: str, command: str) -> CommandIdentifier:
+    return CommandIdentifier(ApplicationType.CORE, "Echo", function, command)
+
+
+class EchoFunction(Function):
+    def __init__(self):
+        super().__init__()
+        self.received = []
+
+    def _init_commands(self) -> Dict[str, Callable[[dict, dict, Optional[Callback]], Optional[CommandResponse]]]:
+        return {
+            "main": lambda payload, context, callback: self.received.append(payload["text"])
+        }
+
+
+class EchoApplication(Application):
+    def __init__(self):
+        super().__init__("Echo", ApplicationType.CORE)
+
+    def _init_functions(self) -> Dict[str, Function]:
+        return {"echo": EchoFunction()}
+
+    def setup(self, connection_service: ConnectionService):
+        pass
+
+
+class TestRoutes:
+    def test_route_is_compiled_on_first_message(self):
+        application = EchoApplication()
+        assert application._routes == {}
+
+        application._on_event(Message({"text": "hi"}, get_target("echo", "main"), UI, {}))
+        route = application._routes[get_target("echo", "main")]
+        assert route.function is application._functions["echo"]
+        assert route.executor is None  # inline by default
+
+        application._on_event(Message({"text": "again"}, get_target("echo", "main"), UI, {}))
+        assert application._routes[get_target("echo", "main")] is route
+        assert application._functions["echo"].received == ["hi", "again"]
+
+    def test_unknown_targets_are_not_routed(self):
+        application = EchoApplication()
+        application._on_event(Message({"text": "hi"}, get_target("echo", "unknown"), UI, {}))
+        application._on_event(Message({"text": "hi"}, get_target("unknown", "main"), UI, {}))
+        assert application._routes == {}
+        assert application._functions["echo"].received == []
+
+    def test_compile_routes_resolves_all_commands(self):
+        application = EchoApplication()
+        policies = application.compile_routes()
+        assert list(policies) == [get_target("echo", "main")] == list(application._routes)
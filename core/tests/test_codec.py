@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from core.communication.codec import BinaryCodec
+from core.communication.command_identifier import CommandIdentifier
+from core.communication.message import Message
+
+
+def round_trip(payload: dict) -> dict:
+    codec = BinaryCodec()
+    message = Message(payload, CommandIdentifier("MODULE", "TextToCommand", "rating", "get"), None, {})
+    return codec.decode(codec.encode(message)).payload
+
+
+class TestBinaryCodec:
+    @pytest.mark.parametrize("array", [
+        np.array(3.5),
+        np.zeros(0, dtype=np.float32),
+        np.zeros((2, 0)),
+        np.zeros((0, 3), dtype=np.int8),
+        np.arange(12.).reshape(3, 4)[:, ::2],
+        np.arange(12, dtype=np.float32).reshape(3, 4).T,
+    ], ids=["0-d", "empty", "empty-2d", "empty-rows", "strided", "transposed"])
+    def test_array_round_trip(self, array):
+        decoded = round_trip({"before": np.ones(3), "array": array, "after": np.arange(2)})["array"]
+
+        assert decoded.dtype == array.dtype and decoded.shape == array.shape
+        assert np.array_equal(decoded, array)
+        assert not decoded.flags.writeable
+
+    def test_nested_containers(self):
+        payload = {
+            "query": "send mail",
+            "units": [[0.4, np.full(4, 2., dtype=np.float32)], (0.6, [np.zeros((2, 0)), {"ids": np.arange(3)}])],
+            "labels": np.array(["a", None], dtype=object),
+        }
+        decoded = round_trip(payload)
+
+        assert decoded["query"] == "send mail"
+        assert decoded["units"][0][0] == 0.4 and np.array_equal(decoded["units"][0][1], payload["units"][0][1])
+        assert decoded["units"][1][1][0].shape == (2, 0)
+        assert np.array_equal(decoded["units"][1][1][1]["ids"], np.arange(3))
+        assert decoded["labels"] == ["a", None]
@@ -0,0 +1,33 @@
+import pickle
+
+import pytest
+
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+
+
+class TestInterning:
+    def test_same_address_is_same_instance(self):
+        identifier = CommandIdentifier(ApplicationType.MODULE, "UI", "core", "userQuery")
+        assert CommandIdentifier("MODULE", "UI", "core", "userQuery") is identifier
+        assert CommandIdentifier.deserialize("MODULE.UI.core.userQuery") is identifier
+        assert pickle.loads(pickle.dumps(identifier)) is identifier
+        assert CommandIdentifier(ApplicationType.MODULE, "UI", "core") is not identifier
+
+    def test_identifiers_are_immutable(self):
+        identifier = CommandIdentifier(ApplicationType.MODULE, "UI", "core", "userQuery")
+        with pytest.raises(AttributeError):
+            identifier.command = "wakeUp"
+        assert str(identifier) == "MODULE.UI.core.userQuery"
+
+    def test_identifiers_over_limit_are_equal_but_not_interned(self, monkeypatch):
+        monkeypatch.setattr(CommandIdentifier, "_interned", {})
+        monkeypatch.setattr(CommandIdentifier, "_deserialized", {})
+        monkeypatch.setattr(CommandIdentifier, "MAX_INTERNED", 1)
+
+        first = CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "on")
+        assert CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "on") is first
+        other = CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "off")
+        assert CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "off") is not other
+        assert CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "off") == other
+        assert hash(CommandIdentifier(ApplicationType.SKILL, "Lamp", "switch", "off")) == hash(other)
+        assert {other: 1}[CommandIdentifier.deserialize("SKILL.Lamp.switch.off")] == 1
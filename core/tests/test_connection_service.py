@@ -0,0 +1,61 @@
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.connection import SyncConnection
+from core.communication.connection_service import ConnectionService
+from core.communication.dispatcher import MessageDispatcher, OverflowPolicy, QueuePolicy
+from core.communication.message import Message
+
+TARGET = CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "main")
+SOURCE = CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "main")
+
+
+class Recipient:
+    def __init__(self):
+        self.received = []
+        self.connection = SyncConnection(self.received.append)
+
+
+def send(service: ConnectionService, dispatcher: MessageDispatcher, i: int):
+    service.dispatch(Message({"i": i}, TARGET, SOURCE, {}))
+    dispatcher.drain_main_thread()
+
+
+class TestRoutes:
+    def test_route_is_dropped_when_connection_is_replaced(self):
+        dispatcher = MessageDispatcher(workers=0)
+        service = ConnectionService(lambda event: None, dispatcher)
+        first, second = Recipient(), Recipient()
+
+        service.add_connection(ApplicationType.MODULE, "TextToCommand", first.connection)
+        send(service, dispatcher, 0)
+        assert TARGET in service._routes
+
+        service.add_connection(ApplicationType.MODULE, "TextToCommand", second.connection)
+        assert TARGET not in service._routes
+        send(service, dispatcher, 1)
+        assert [e.payload["i"] for e in first.received] == [0]
+        assert [e.payload["i"] for e in second.received] == [1]
+
+    def test_route_is_dropped_when_connection_is_closed(self):
+        dispatcher = MessageDispatcher(workers=0)
+        service = ConnectionService(lambda event: None, dispatcher)
+        recipient = Recipient()
+        service.add_connection(ApplicationType.MODULE, "TextToCommand", recipient.connection)
+        send(service, dispatcher, 0)
+
+        recipient.connection.close()
+        assert TARGET not in service._routes
+        send(service, dispatcher, 1)
+        assert [e.payload["i"] for e in recipient.received] == [0]
+
+    def test_compiled_route_keeps_queue_policy_after_reconnect(self):
+        dispatcher = MessageDispatcher(workers=0)
+        service = ConnectionService(lambda event: None, dispatcher)
+        policy = QueuePolicy(OverflowPolicy.DROP_OLDEST)
+        first, second = Recipient(), Recipient()
+        service.add_connection(ApplicationType.MODULE, "TextToCommand", first.connection)
+        service.compile_routes({TARGET: policy})
+        assert service._routes[TARGET][1:] == (first.connection, policy)
+
+        service.add_connection(ApplicationType.MODULE, "TextToCommand", second.connection)
+        send(service, dispatcher, 0)
+        assert service._routes[TARGET][1:] == (second.connection, policy)
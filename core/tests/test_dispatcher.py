@@ -0,0 +1,206 @@
+import threading
+
+import pytest
+
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.connection import SyncConnection
+from core.communication.dispatcher import MessageDispatcher, OverflowPolicy, QueuePolicy
+from core.communication.message import Message
+
+KEY = (ApplicationType.MODULE, "TextToCommand")
+TARGET = CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "rating", "get")
+DROP_OLDEST = QueuePolicy(OverflowPolicy.DROP_OLDEST)
+COALESCE = QueuePolicy(OverflowPolicy.COALESCE, lambda message: message.payload.get("key"))
+
+
+def get_message(i: int, key: str = None) -> Message:
+    return Message({"i": i, "key": key}, TARGET, None, {})
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def connection(received):
+    connection = SyncConnection(lambda event: received.append(event.payload["i"]))
+    connection.max_queue_size = 3
+    return connection
+
+
+@pytest.fixture
+def dispatcher():
+    return MessageDispatcher(workers=0)
+
+
+def send(dispatcher: MessageDispatcher, connection: SyncConnection, count: int) -> threading.Thread:
+    """Sends count blocking messages from another thread than the main one"""
+    def run():
+        for i in range(count):
+            dispatcher.dispatch(KEY, connection, get_message(i))
+
+    sender = threading.Thread(target=run)
+    sender.start()
+    return sender
+
+
+def get_stats(dispatcher: MessageDispatcher) -> dict:
+    return dispatcher.stats["MODULE.TextToCommand"]
+
+
+class TestBlockOverflow:
+    def test_main_thread_queues_over_limit(self, dispatcher, connection, received):
+        for i in range(5):
+            dispatcher.dispatch(KEY, connection, get_message(i))
+        dispatcher.drain_main_thread()
+
+        assert received == [0, 1, 2, 3, 4]
+        stats = get_stats(dispatcher)
+        assert (stats["overflowed"], stats["blocked"], stats["dropped"], stats["max_depth"]) == (2, 0, 0, 5)
+
+    def test_sender_waits_for_room(self, connection, received):
+        dispatcher = MessageDispatcher(workers=1)
+        release = threading.Event()
+        connection._on_event = lambda event: (release.wait(5), received.append(event.payload["i"]))
+        dispatcher.start()
+
+        sender = send(dispatcher, connection, 8)
+        sender.join(0.2)
+        assert sender.is_alive()  # first message is being handled, 3 are queued, the sender waits with the 5th
+
+        release.set()
+        sender.join(5)
+        for _ in range(100):
+            if len(received) == 8:
+                break
+            threading.Event().wait(0.05)
+        dispatcher.stop()
+
+        assert received == list(range(8))
+        stats = get_stats(dispatcher)
+        assert stats["blocked"] >= 1 and stats["overflowed"] == 0 and stats["max_depth"] == 3
+
+    def test_sender_stops_waiting_after_timeout(self, dispatcher, connection, received):
+        dispatcher.block_timeout = 0.01
+        send(dispatcher, connection, 4).join(5)
+        dispatcher.drain_main_thread()
+
+        assert received == [0, 1, 2, 3]
+        assert (get_stats(dispatcher)["blocked"], get_stats(dispatcher)["overflowed"]) == (1, 1)
+
+
+class TestDropOldestOverflow:
+    def test_oldest_message_is_dropped(self, dispatcher, connection, received):
+        for i in range(5):
+            dispatcher.dispatch(KEY, connection, get_message(i), DROP_OLDEST)
+        dispatcher.drain_main_thread()
+
+        assert received == [2, 3, 4]
+        assert get_stats(dispatcher)["dropped"] == 2
+
+    def test_blocking_messages_are_not_dropped(self, dispatcher, connection, received):
+        dispatcher.dispatch(KEY, connection, get_message(0))
+        dispatcher.dispatch(KEY, connection, get_message(1), DROP_OLDEST)
+        dispatcher.dispatch(KEY, connection, get_message(2))
+        dispatcher.dispatch(KEY, connection, get_message(3), DROP_OLDEST)  # drops 1
+        dispatcher.dispatch(KEY, connection, get_message(4), DROP_OLDEST)  # drops 3
+        dispatcher.drain_main_thread()
+
+        assert received == [0, 2, 4]
+        assert get_stats(dispatcher)["dropped"] == 2
+
+    def test_new_message_is_dropped_when_nothing_else_can_be(self, dispatcher, connection, received):
+        for i in range(3):
+            dispatcher.dispatch(KEY, connection, get_message(i))
+        dispatcher.dispatch(KEY, connection, get_message(3), DROP_OLDEST)
+        dispatcher.drain_main_thread()
+
+        assert received == [0, 1, 2]
+        stats = get_stats(dispatcher)
+        assert (stats["dropped"], stats["overflowed"], stats["enqueued"]) == (1, 0, 3)
+
+
+class TestCoalesceOverflow:
+    def test_queued_message_is_replaced_in_place(self, dispatcher, connection, received):
+        for i, key in enumerate(["a", "b", "a", None, "b", "a"]):
+            dispatcher.dispatch(KEY, connection, get_message(i, key), COALESCE)
+        dispatcher.drain_main_thread()
+
+        # latest message of each key takes the queue position of the first one, so keys keep their order
+        assert received == [5, 4, 3]
+        stats = get_stats(dispatcher)
+        assert (stats["coalesced"], stats["enqueued"], stats["dropped"]) == (3, 3, 0)
+
+    def test_overflow_drops_oldest_and_keeps_order(self, dispatcher, connection, received):
+        for i, key in enumerate(["a", "b", "c", "d", "b", "e", "c"]):
+            dispatcher.dispatch(KEY, connection, get_message(i, key), COALESCE)
+        dispatcher.drain_main_thread()
+
+        # d drops a, b is coalesced, e drops b, c is coalesced
+        assert received == [6, 3, 5]
+        stats = get_stats(dispatcher)
+        assert (stats["dropped"], stats["coalesced"]) == (2, 2)
+
+        received.clear()
+        for i, key in enumerate(["a", "b"]):
+            dispatcher.dispatch(KEY, connection, get_message(i, key), COALESCE)
+        dispatcher.drain_main_thread()
+        assert received == [0, 1]  # delivered keys are not coalesced any more
+
+
+class TestWorkerPool:
+    def test_targets_are_handled_in_parallel_each_in_order(self):
+        targets, count = 4, 50
+        dispatcher = MessageDispatcher(workers=targets)
+        dispatcher.max_batch = 3  # targets yield to each other and are rescheduled
+        barrier = threading.Barrier(targets, timeout=5)
+        lock = threading.Lock()
+        received = {target: [] for target in range(targets)}
+        threads = {target: set() for target in range(targets)}
+        active = {target: 0 for target in range(targets)}
+        overlaps = []
+        done = threading.Semaphore(0)
+
+        def get_connection(target: int) -> SyncConnection:
+            def on_event(event: Message):
+                with lock:
+                    active[target] += 1
+                    if active[target] > 1:  # one message of a target at a time
+                        overlaps.append(target)
+                if event.payload["i"] == 0:
+                    barrier.wait()  # passes only when the first messages of all targets are handled at once
+                with lock:
+                    active[target] -= 1
+                    received[target].append(event.payload["i"])
+                    threads[target].add(threading.current_thread())
+                done.release()
+            return SyncConnection(on_event)
+
+        connections = [get_connection(target) for target in range(targets)]
+        dispatcher.start()
+        for i in range(count):
+            for target, connection in enumerate(connections):
+                dispatcher.dispatch((ApplicationType.MODULE, f"Target{target}"), connection, get_message(i))
+        for _ in range(targets * count):
+            assert done.acquire(timeout=5)
+        dispatcher.stop()
+
+        assert all(messages == list(range(count)) for messages in received.values())
+        assert overlaps == []
+        assert threading.main_thread() not in set.union(*threads.values())
+        assert len(set.union(*threads.values())) == targets
+
+    def test_main_thread_connections_are_drained_by_event_loop(self):
+        dispatcher = MessageDispatcher(workers=2)
+        received = []
+        gui = SyncConnection(lambda event: received.append((event.payload["i"], threading.current_thread())), True)
+        dispatcher.start()
+        for i in range(5):
+            dispatcher.dispatch((ApplicationType.MODULE, "GUI"), gui, get_message(i))
+        threading.Event().wait(0.05)
+        assert received == []  # workers never take it
+
+        dispatcher.drain_main_thread()
+        dispatcher.stop()
+        assert received == [(i, threading.main_thread()) for i in range(5)]
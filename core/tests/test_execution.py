@@ -0,0 +1,28 @@
+import threading
+
+from core.application import execution
+from core.application.execution import ExecutionPolicy, get_executor, shutdown_executors, submit
+
+
+class TestShutdownExecutors:
+    def test_pending_commands_are_cancelled(self):
+        started, release = threading.Semaphore(0), threading.Event()
+
+        def command():
+            started.release()
+            return release.wait(5)
+
+        executor = get_executor(ExecutionPolicy.THREAD, None)
+        running = [submit(executor, command) for _ in range(execution.thread_pool_size)]
+        for _ in running:
+            assert started.acquire(timeout=5)
+        pending = submit(executor, command)
+
+        shutdown_executors()
+        release.set()
+
+        assert pending.cancelled()
+        assert all(future.result(timeout=5) for future in running)
+        assert not execution._pending
+        assert get_executor(ExecutionPolicy.THREAD, None) is not executor
+        shutdown_executors()
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from core.communication.frozen import freeze, FrozenDict, FrozenList
+from core.skill.index import ExactWeightedUnit, EmbeddingWeightedUnit
+
+
+class TestFreeze:
+    def test_containers_are_frozen(self):
+        frozen = freeze({"a": [1, {"b": [2]}], "c": (3, [4])})
+        assert isinstance(frozen, FrozenDict) and isinstance(frozen["a"][1]["b"], FrozenList)
+        assert isinstance(frozen["c"], tuple) and isinstance(frozen["c"][1], FrozenList)
+        with pytest.raises(TypeError):
+            frozen["a"].append(5)
+        assert freeze(frozen) is frozen
+
+    def test_writable_array_is_copied(self):
+        array = np.arange(4.)
+        frozen = freeze({"array": array})["array"]
+        array[0] = 10.  # sender changes its array after dispatch
+
+        assert array.flags.writeable
+        assert not frozen.flags.writeable and not np.shares_memory(frozen, array)
+        assert list(frozen) == [0., 1., 2., 3.]
+        with pytest.raises(ValueError):
+            frozen[0] = 1.
+        assert freeze(frozen) is frozen
+
+    def test_read_only_array_is_not_copied(self):
+        array = np.frombuffer(np.arange(4.).tobytes())
+        assert freeze(array) is array
+
+    def test_named_tuple_fields_are_frozen(self):
+        variants = ["send mail"]
+        unit = freeze(ExactWeightedUnit(0.6, variants))
+
+        assert isinstance(unit, ExactWeightedUnit) and unit == (0.6, ["send mail"])
+        assert isinstance(unit.variants, FrozenList) and unit.variants is not variants
+        with pytest.raises(TypeError):
+            unit.variants.append("write mail")
+
+        embedding = freeze(EmbeddingWeightedUnit(0.4, np.ones(2)))
+        assert isinstance(embedding, EmbeddingWeightedUnit) and not embedding.embedding.flags.writeable
+
+    def test_immutable_tuple_is_not_copied(self):
+        data = ("a", (1, 2.))
+        assert freeze(data) is data
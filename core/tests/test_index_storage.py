@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from core.communication.callback import Callback
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.module.impl.text_to_command.functions import GetSkillsRatingByQueryFunction
+from core.module.impl.text_to_command.storage import IndexStorage
+from core.skill.index import IndexData
+
+
+def get_entities(rng: np.random.Generator, count: int) -> dict:
+    return {
+        f"skill-{i // 4}.function-{i}": IndexData.from_dict({
+            "exact": [[0.4, [f"function {i}"]]],
+            "embeddings": [[0.3, rng.normal(size=32).tolist()], [0.3, rng.normal(size=32).tolist()]]
+        }) for i in range(count)
+    }
+
+
+class TestIndexStorage:
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_received_embeddings_are_not_kept(self, dtype):
+        entities = get_entities(np.random.default_rng(0), 40)
+        received = {entity_id: list(data.embeddings[0].embedding) for entity_id, data in entities.items()}
+
+        storage = IndexStorage(embeddings_dtype=dtype)
+        storage.load(1, entities)
+
+        stored = storage._entities["skill-0.function-0"].embeddings[0].embedding
+        assert isinstance(stored, np.ndarray) and stored.dtype == np.float32
+        assert isinstance(stored, np.memmap) == (dtype != "float32")
+        assert np.allclose(stored, received["skill-0.function-0"])
+        # received IndexData is shared with the message and stays as it was
+        assert entities["skill-0.function-0"].embeddings[0].embedding == received["skill-0.function-0"]
+
+    def test_quantized_ratings_match_full_precision(self):
+        rng = np.random.default_rng(1)
+        entities = get_entities(rng, 40)
+        update = get_entities(rng, 4)
+        query = rng.normal(size=32).astype(np.float32)
+
+        ratings = []
+        for dtype in ["float32", "int8"]:
+            storage = IndexStorage(embeddings_dtype=dtype)
+            storage.load(1, entities)
+            storage.update(2, update)
+            ratings.append(storage.rating_index.get_rating("function 3", query))
+
+        assert list(ratings[0]) == list(ratings[1])
+        assert np.allclose(list(ratings[0].values()), list(ratings[1].values()), atol=1e-6)
+
+
+class TestGetSkillsRatingByQueryFunction:
+    def test_rating_has_version_rated_with(self):
+        rng = np.random.default_rng(2)
+        storage = IndexStorage()
+        storage.load(1, get_entities(rng, 8))
+        storage.update(2, get_entities(rng, 2))
+        query = {"raw": "function 1", "cleared": "function 1", "embedding": rng.normal(size=32).astype(np.float32)}
+        callback = Callback(CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "query", "onRating"))
+
+        rate = GetSkillsRatingByQueryFunction(storage).get_command("main")
+        response = rate({"query": query, "index_version": 1}, {}, callback)
+
+        assert response.payload["index_version"] == 2  # query was issued for version 1
+        assert response.payload["rating"] == storage.rating_index.get_rating(query["cleared"], query["embedding"])
+        assert response.target == callback.target
@@ -0,0 +1,199 @@
+from typing import Optional
+
+import numpy as np
+import pytest
+from Levenshtein import distance
+
+from core.module.impl.text_to_command.rating import RatingIndex
+from core.skill.index import IndexData, ExactWeightedUnit, EmbeddingWeightedUnit
+from text_to_command.trigram_index import get_trigrams
+
+WORDS = ["send", "mail", "read", "new", "start", "timer", "stop", "alarm", "note", "write", "list", "unread"]
+
+
+def get_phrase(rng: np.random.Generator) -> str:
+    return " ".join(rng.choice(WORDS, size=rng.integers(1, 4)))
+
+
+def get_config(seed: int = 0, dim: int = 16) -> dict:
+    """Skills and functions with both kinds of units, only exact units and only embedding units"""
+    rng = np.random.default_rng(seed)
+
+    def get_index_data(exact_units: int, embedding_units: int) -> IndexData:
+        weight = 1 / (exact_units + embedding_units)
+        return IndexData(
+            [
+                ExactWeightedUnit(weight, [get_phrase(rng) for _ in range(rng.integers(1, 4))])
+                for _ in range(exact_units)
+            ],
+            [EmbeddingWeightedUnit(weight, rng.normal(size=dim).tolist()) for _ in range(embedding_units)]
+        )
+
+    return {
+        "mail": get_index_data(1, 2),
+        "mail.send": get_index_data(2, 1),
+        "mail.read": get_index_data(1, 0),
+        "timer": get_index_data(0, 2),
+        "timer.start": get_index_data(1, 1),
+        "timer.stop": get_index_data(0, 1),
+        "notes": get_index_data(2, 0),
+        "notes.write": get_index_data(1, 2),
+    }
+
+
+def get_reference_scores(
+        config: dict, query_cleared: str, query_embedding: Optional[list], skill_score_weight=0.2,
+        exact_entities: Optional[set] = None
+) -> dict:
+    """
+    Per unit scoring the rating index replaced: best Levenshtein similarity of variants, cosine clipped at 0.
+    Exact units of entities not in exact_entities (if given) count as zero.
+    """
+    scores = {}
+    for entity_id, indexed_data in config.items():
+        score = 0.
+        for unit in indexed_data.exact if exact_entities is None or entity_id in exact_entities else []:
+            score += unit.weight * max(
+                [1 - distance(query_cleared, v) / max(len(query_cleared), len(v)) for v in unit.variants] + [0]
+            )
+        for unit in indexed_data.embeddings if query_embedding is not None else []:
+            embedding = np.asarray(unit.embedding)
+            cosine = np.dot(query_embedding, embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(embedding))
+            score += unit.weight * max(0, cosine)
+        scores[entity_id] = score
+
+    for entity_id in list(scores):
+        if "." in entity_id:
+            skill_id, _ = entity_id.split(".")
+            scores[entity_id] = skill_score_weight * scores[skill_id] + (1 - skill_score_weight) * scores[entity_id]
+    return scores
+
+
+def get_dice(query: str, variant: str) -> float:
+    query_trigrams, variant_trigrams = get_trigrams(query), get_trigrams(variant)
+    return 2 * len(query_trigrams & variant_trigrams) / (len(query_trigrams) + len(variant_trigrams))
+
+
+def get_queries(count: int, dim: int = 16, seed: int = 1) -> list:
+    rng = np.random.default_rng(seed)
+    return [(get_phrase(rng), rng.normal(size=dim).tolist()) for _ in range(count)]
+
+
+class TestRatingIndex:
+    @pytest.mark.parametrize("query_cleared,query_embedding", get_queries(5))
+    def test_scores_match_per_unit_scoring(self, query_cleared, query_embedding):
+        config = get_config()
+        index = RatingIndex(config)
+
+        expected = get_reference_scores(config, query_cleared, query_embedding)
+        scores = index.get_scores(query_cleared, query_embedding)
+        assert index.ids == list(config)
+        assert np.allclose(scores, [expected[entity_id] for entity_id in index.ids], atol=1e-6)
+
+    def test_entities_with_one_kind_of_units(self):
+        config = get_config()
+        index = RatingIndex(config)
+        query_cleared, query_embedding = get_queries(1)[0]
+
+        expected = get_reference_scores(config, query_cleared, query_embedding)
+        scores = dict(zip(index.ids, index.get_scores(query_cleared, query_embedding)))
+        for entity_id in ["mail.read", "notes", "timer", "timer.stop"]:
+            assert scores[entity_id] == pytest.approx(expected[entity_id], abs=1e-6)
+
+        # scores of entities with one kind of units depend only on the matching part of the query
+        other_embedding = index.get_scores(query_cleared, (-np.asarray(query_embedding)).tolist())
+        assert other_embedding[index.ids.index("notes")] == pytest.approx(scores["notes"], abs=1e-6)
+        other_text = index.get_scores("alarm list unread", query_embedding)
+        assert other_text[index.ids.index("timer")] == pytest.approx(scores["timer"], abs=1e-6)
+
+    def test_skill_score_weight(self):
+        config = get_config()
+        index = RatingIndex(config)
+        index.skill_score_weight = 0.5
+        query_cleared, query_embedding = get_queries(1)[0]
+
+        expected = get_reference_scores(config, query_cleared, query_embedding, skill_score_weight=0.5)
+        assert np.allclose(
+            index.get_scores(query_cleared, query_embedding), [expected[entity_id] for entity_id in index.ids]
+        )
+
+    @pytest.mark.parametrize("limit", [1, 3, 8, 20])
+    def test_limit(self, limit):
+        config = get_config()
+        query_cleared, query_embedding = get_queries(1)[0]
+
+        rating = RatingIndex(config).get_rating(query_cleared, query_embedding, limit=limit)
+        expected = sorted(get_reference_scores(config, query_cleared, query_embedding).items(), key=lambda x: -x[1])
+        assert list(rating) == [entity_id for entity_id, _ in expected[:limit]]
+        assert np.allclose(list(rating.values()), [score for _, score in expected[:limit]], atol=1e-6)
+
+
+class TestBatchRating:
+    @pytest.mark.parametrize("embeddings_dtype", ["float32", "float16", "int8"])
+    def test_batch_matches_single_queries(self, embeddings_dtype):
+        config = get_config()  # entities without embedding units leave empty segments
+        index = RatingIndex(config, embeddings_dtype=embeddings_dtype)
+        queries = get_queries(6)
+        queries[1] = (queries[1][0], None)
+        queries[4] = (queries[4][0], None)
+
+        ratings = index.get_ratings([q for q, _ in queries], [e for _, e in queries], limit=len(config))
+        for (query_cleared, query_embedding), rating in zip(queries, ratings):
+            expected = index.get_rating(query_cleared, query_embedding, limit=len(config))
+            assert list(rating) == list(expected)
+            assert np.allclose(list(rating.values()), list(expected.values()), atol=1e-6)
+
+    def test_query_without_embedding_gets_exact_scores_only(self):
+        config = get_config()
+        index = RatingIndex(config)
+        query_cleared, _ = get_queries(1)[0]
+
+        expected = get_reference_scores(config, query_cleared, None)
+        rating = index.get_rating(query_cleared, None, limit=len(config))
+        assert rating == pytest.approx({entity_id: expected[entity_id] for entity_id in rating}, abs=1e-6)
+        assert index.get_ratings([query_cleared], [None], limit=len(config)) == [rating]
+
+
+class ShortlistedRatingIndex(RatingIndex):
+    exact_shortlist_limit = 4
+    shortlist_min_overlap = 0.4
+
+
+class TestShortlistedRating:
+    @pytest.mark.parametrize("query_cleared,query_embedding", get_queries(5))
+    def test_shortlisted_entities_match_full_scoring(self, query_cleared, query_embedding):
+        config = get_config()
+        index = ShortlistedRatingIndex(config)
+        assert index._trigram_index is not None
+
+        shortlisted = {
+            entity_id for entity_id, indexed_data in config.items()
+            if any(
+                get_dice(query_cleared, variant) >= index.shortlist_min_overlap
+                for unit in indexed_data.exact for variant in unit.variants
+            )
+        }
+
+        expected = get_reference_scores(config, query_cleared, query_embedding, exact_entities=shortlisted)
+        assert np.allclose(
+            index.get_scores(query_cleared, query_embedding), [expected[entity_id] for entity_id in index.ids],
+            atol=1e-6
+        )
+
+    def test_shortlist_skips_entities(self):
+        config = get_config()
+        index = ShortlistedRatingIndex(config)
+        queries = [query_cleared for query_cleared, _ in get_queries(5)]
+        shortlisted = [index._variant_owners[index._get_shortlisted_variants(q)] for q in queries]
+        assert all(len(owners) for owners in shortlisted)
+        assert any(len(owners) < len(index._variant_owners) for owners in shortlisted)
+
+    def test_query_of_unknown_trigrams_gets_embedding_scores_only(self):
+        config = get_config()
+        _, query_embedding = get_queries(1)[0]
+
+        expected = get_reference_scores(config, "xyz", query_embedding, exact_entities=set())
+        assert np.allclose(
+            ShortlistedRatingIndex(config).get_scores("xyz", query_embedding),
+            [expected[entity_id] for entity_id in config], atol=1e-6
+        )
@@ -0,0 +1,109 @@
+import socket
+import threading
+from time import monotonic
+
+import pytest
+
+from core.controller.scheduler import Scheduler, Waker
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler()
+
+
+class TestTimers:
+    def test_due_handlers_run_in_registration_order(self, scheduler):
+        calls = []
+        scheduler.register(lambda: calls.append("slow"), interval=0.05, name="slow")
+        scheduler.register(lambda: calls.append("fast"), interval=0.01, name="fast")
+
+        scheduler.run_once(timeout=0)  # timers are due right after registration
+        assert calls == ["slow", "fast"]
+
+        calls.clear()
+        scheduler.run_once(timeout=1)  # waits for the nearest timer only
+        assert calls == ["fast"]
+
+    def test_handler_runs_interval_after_previous_run(self, scheduler):
+        calls = []
+        scheduler.register(lambda: calls.append(monotonic()), interval=0.02)
+        deadline = monotonic() + 1
+        while len(calls) < 4 and monotonic() < deadline:
+            scheduler.run_once(timeout=0.1)
+
+        assert len(calls) == 4
+        assert all(b - a >= 0.02 for a, b in zip(calls, calls[1:]))
+
+    def test_handler_without_source_is_polled(self, scheduler):
+        calls = []
+        scheduler.register(lambda: calls.append(1))
+        scheduler.run_once(timeout=0)
+        scheduler.run_once(timeout=1)
+        assert len(calls) == 2
+
+
+class TestSources:
+    def test_readable_fd_runs_its_handler_only(self, scheduler):
+        reader, writer = socket.socketpair()
+        calls = []
+        scheduler.register(lambda: calls.append(reader.recv(16)), fd=reader, name="reader")
+        scheduler.register(lambda: calls.append("waker"), waker=Waker(), name="waker")
+
+        scheduler.run_once(timeout=0.01)
+        assert calls == []  # nothing is ready, nothing runs
+
+        writer.send(b"data")
+        scheduler.run_once(timeout=1)
+        assert calls == [b"data"]
+        reader.close()
+        writer.close()
+
+    def test_wake_ups_before_handler_runs_are_coalesced(self, scheduler):
+        waker = Waker()
+        calls = []
+        scheduler.register(lambda: calls.append(1), waker=waker)
+        for _ in range(3):
+            waker.wake()
+
+        scheduler.run_once(timeout=1)
+        scheduler.run_once(timeout=0.01)
+        assert calls == [1]
+
+    def test_waker_interrupts_blocking_select(self, scheduler):
+        waker = Waker()
+        calls = []
+        scheduler.register(lambda: calls.append(threading.current_thread()), waker=waker)
+        threading.Timer(0.05, waker.wake).start()
+
+        started = monotonic()
+        scheduler.run_once(timeout=5)
+        assert calls == [threading.current_thread()]
+        assert monotonic() - started < 1
+
+
+class TestRun:
+    def test_handler_exceptions_are_counted(self, scheduler):
+        def fail():
+            raise RuntimeError("handler failed")
+
+        calls = []
+        scheduler.register(fail, interval=0., name="fail")
+        scheduler.register(lambda: calls.append(1), interval=0., name="ok")
+        for _ in range(3):
+            scheduler.run_once(timeout=0)
+
+        assert (scheduler.stats["fail"]["calls"], scheduler.stats["fail"]["errors"]) == (3, 3)
+        assert (scheduler.stats["ok"]["calls"], scheduler.stats["ok"]["errors"]) == (3, 0)
+        assert calls == [1, 1, 1]  # the loop goes on
+
+    def test_stop_from_another_thread(self, scheduler):
+        scheduler.register(lambda: None, waker=Waker())  # an idle loop blocks in select without a timeout
+        loop = threading.Thread(target=scheduler.run)
+        loop.start()
+        threading.Event().wait(0.05)
+        assert loop.is_alive()
+
+        scheduler.stop()
+        loop.join(1)
+        assert not loop.is_alive()
@@ -0,0 +1,157 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from core.skill.function_configuration import FunctionConfiguration
+from core.skill.index import IndexData, ExactWeightedUnit, EmbeddingWeightedUnit
+from core.skill.skill_configuration import SkillConfiguration
+from core.skill.storage import SkillsConfigStorage
+from core.skill.writer import SkillsConfigWriter
+
+
+def get_index(value: float) -> IndexData:
+    return IndexData(
+        exact=[ExactWeightedUnit(0.6, ["send mail"])],
+        embeddings=[EmbeddingWeightedUnit(0.4, [value] * 4)]
+    )
+
+
+def get_config(indexed: bool = True) -> list:
+    return [SkillConfiguration(
+        name="EMail",
+        description="Email integration.",
+        tags=["Mail"],
+        functions=[FunctionConfiguration(
+            name="Send mail",
+            description="Sends mail.",
+            call_examples=["Send mail"],
+            indexed_data=get_index(1.) if indexed else None
+        )],
+        indexed_data=get_index(2.) if indexed else None
+    )]
+
+
+def get_embedding(skill: SkillConfiguration, function_id: str = None) -> list:
+    indexed_data = skill.functions[function_id].indexed_data if function_id else skill.indexed_data
+    return np.asarray(indexed_data.embeddings[0].embedding).tolist()
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    return str(tmp_path / "skills_config.json")
+
+
+class TestSkillsConfigStorage:
+    def test_round_trip(self, config_file):
+        SkillsConfigStorage(config_file).save(get_config())
+
+        storage = SkillsConfigStorage(config_file)
+        [skill] = storage.load()
+        assert storage.generation == 1
+        assert get_embedding(skill) == [2.] * 4
+        assert get_embedding(skill, "send-mail") == [1.] * 4
+        assert skill.functions["send-mail"].indexed_data.exact[0].variants == ["send mail"]
+
+    def test_nothing_indexed(self, config_file):
+        SkillsConfigStorage(config_file).save(get_config(indexed=False))
+
+        [skill] = SkillsConfigStorage(config_file).load()
+        assert skill.indexed_data is None
+        assert sorted(os.listdir(os.path.dirname(config_file))) == [
+            "skills_config.embeddings.1.npy", "skills_config.journal.jsonl", "skills_config.json"
+        ]
+
+    @pytest.mark.parametrize("indexed", [True, False])
+    def test_legacy_migration(self, config_file, indexed):
+        with open(config_file, 'w') as f:
+            json.dump([skill.to_dict() for skill in get_config(indexed)], f)
+
+        [skill] = SkillsConfigStorage(config_file).load()
+        assert (skill.indexed_data is not None) == indexed
+        with open(config_file) as f:
+            assert json.load(f)["format"] == SkillsConfigStorage.FORMAT_VERSION
+
+        [skill] = SkillsConfigStorage(config_file).load()
+        if indexed:
+            assert get_embedding(skill, "send-mail") == [1.] * 4
+
+    def test_failed_write_leaves_no_temp_file(self, config_file, monkeypatch):
+        def fail(*args, **kwargs):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(np, "save", fail)
+        with pytest.raises(OSError):
+            SkillsConfigStorage(config_file).save(get_config())
+        assert os.listdir(os.path.dirname(config_file)) == []
+
+    def test_journal_replay(self, config_file):
+        storage = SkillsConfigStorage(config_file)
+        storage.save(get_config())
+        storage.append({"email.send-mail": get_index(3.)})
+        with open(storage.journal_file, 'a') as f:
+            f.write('{"generation": 1, "id": "email')  # torn by a crash
+
+        storage = SkillsConfigStorage(config_file)
+        [skill] = storage.load()
+        assert storage.journal_entries == 1
+        assert get_embedding(skill, "send-mail") == [3.] * 4
+
+    def test_snapshot_drops_journal(self, config_file):
+        storage = SkillsConfigStorage(config_file)
+        config = get_config()
+        storage.save(config)
+        storage.append({"email": get_index(3.)})
+        storage.save(config)  # entries of the previous generation are never replayed
+
+        storage = SkillsConfigStorage(config_file)
+        [skill] = storage.load()
+        assert storage.generation == 2 and storage.journal_entries == 0
+        assert get_embedding(skill) == [2.] * 4
+
+
+class TestSkillsConfigWriter:
+    def test_changes_are_journaled(self, config_file):
+        storage = SkillsConfigStorage(config_file)
+        config = get_config()
+        storage.save(config)
+
+        writer = SkillsConfigWriter(storage, coalesce_delay=0.01)
+        config[0].functions["send-mail"].indexed_data = get_index(3.)
+        writer.schedule(config, {"email.send-mail": get_index(3.)})
+        assert writer.flush(timeout=5)
+        writer.close()
+
+        assert storage.generation == 1 and storage.journal_entries == 1
+        loaded = SkillsConfigStorage(config_file)
+        assert get_embedding(loaded.load()[0], "send-mail") == [3.] * 4
+
+    def test_compacts_into_snapshot(self, config_file):
+        storage = SkillsConfigStorage(config_file)
+        config = get_config()
+        storage.save(config)
+
+        writer = SkillsConfigWriter(storage, coalesce_delay=0.01, compact_after=1)
+        for value in [3., 4.]:
+            config[0].indexed_data = get_index(value)
+            writer.schedule(config, {"email": get_index(value)})
+            assert writer.flush(timeout=5)
+        writer.close()
+
+        assert storage.generation == 2 and storage.journal_entries == 0
+        assert get_embedding(SkillsConfigStorage(config_file).load()[0]) == [4.] * 4
+
+    def test_whole_config_is_snapshotted(self, config_file):
+        storage = SkillsConfigStorage(config_file)
+        writer = SkillsConfigWriter(storage, coalesce_delay=0.01)
+        writer.schedule(get_config(indexed=False))
+        writer.schedule(get_config())
+        assert writer.flush(timeout=5)
+        writer.close()
+
+        assert storage.generation == 1
+        assert get_embedding(SkillsConfigStorage(config_file).load()[0]) == [2.] * 4
+
+        with pytest.raises(RuntimeError):
+            writer.schedule(get_config())
@@ -0,0 +1,157 @@
+import threading
+
+import numpy as np
+import pytest
+
+from core.communication.callback import Callback
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.connection_service import ConnectionService
+from core.communication.dispatcher import MessageDispatcher
+from core.communication.message import Message
+from core.controller.scheduler import Scheduler
+from core.module.impl.text_indexer.module import ReadinessState, TextIndexerModule
+from text_to_command.indexer import Indexer
+from text_to_command.vectors_store import export_vectors, MmapWordVectors
+
+QUERY = CommandIdentifier(ApplicationType.MODULE, "TextIndexer", "queryIndexation", "main")
+CALLBACK = Callback(CommandIdentifier(
+    ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "onQueryIndexed"
+))
+
+
+class ManualTextIndexer(TextIndexerModule):
+    """Model is loaded only when the test releases it, handled messages are recorded instead of embedded"""
+
+    def __init__(self, vectors_file: str, fail: bool = False):
+        super().__init__("TextIndexer", vectors_file=vectors_file)
+        self.fail = fail
+        self.release = threading.Event()
+        self.loaded = threading.Event()
+        self.handled = []
+
+    def _get_model(self):
+        assert self.release.wait(5)
+        if self.fail:
+            raise OSError("no model")
+        return super()._get_model()
+
+    def _load_model(self):
+        super()._load_model()
+        self.loaded.set()
+
+    def _on_event(self, event: Message):
+        self.handled.append(event.payload["user_query"])
+
+    def query(self, text: str):
+        self._on_message(Message({"user_query": text}, QUERY, None, {}, CALLBACK))
+
+    def load(self):
+        self.release.set()
+        assert self.loaded.wait(5)
+
+
+class OverlapIndexer(Indexer):
+    """Counts calls of the model that overlap with another one"""
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.overlaps = 0
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.overlaps += self.active > 1
+        threading.Event().wait(0.005)
+        with self.lock:
+            self.active -= 1
+
+    def get_embedding(self, s: str):
+        self._enter()
+        return super().get_embedding(s)
+
+    def get_embeddings(self, strings, batch_size=None, n_process=None):
+        self._enter()
+        return super().get_embeddings(strings, batch_size, n_process)
+
+
+@pytest.fixture
+def vectors_file(tmp_path):
+    export_vectors(["send", "mail"], np.eye(2, dtype=np.float32), str(tmp_path / "vectors"))
+    return str(tmp_path / "vectors")
+
+
+def get_module(vectors_file: str, fail: bool = False):
+    module = ManualTextIndexer(vectors_file, fail)
+    scheduler = Scheduler()
+    module.register_cycle_handlers(scheduler.register)
+    module.setup(ConnectionService(lambda event: None, MessageDispatcher(workers=0)))
+    return module, scheduler
+
+
+class TestReadiness:
+    def test_messages_wait_for_model(self, vectors_file):
+        module, scheduler = get_module(vectors_file)
+        module.query("send mail")
+        module.query("read mail")
+
+        scheduler.run_once(timeout=0.05)  # woken, but the model is still loading
+        assert module.state == ReadinessState.LOADING
+        assert module.handled == []
+
+        module.load()
+        assert module.state == ReadinessState.READY
+        assert module.handled == []  # queued messages are handled on the event loop only
+        scheduler.run_once(timeout=1)
+        assert module.handled == ["send mail", "read mail"]
+
+        module.query("stop timer")
+        assert module.handled == ["send mail", "read mail", "stop timer"]
+
+    def test_messages_after_ready_wait_for_queued_ones(self, vectors_file):
+        module, scheduler = get_module(vectors_file)
+        module.query("send mail")
+        module.load()
+
+        module.query("read mail")  # ready, but must not overtake the queued message
+        assert module.handled == []
+        scheduler.run_once(timeout=1)
+        assert module.handled == ["send mail", "read mail"]
+        assert scheduler.stats["TextIndexer.drainPending"]["calls"] == 1
+
+    def test_messages_are_dropped_when_model_fails(self, vectors_file):
+        module, scheduler = get_module(vectors_file, fail=True)
+        module.query("send mail")
+        module.load()
+        assert module.state == ReadinessState.FAILED
+
+        scheduler.run_once(timeout=1)
+        module.query("read mail")
+        scheduler.run_once(timeout=1)
+        assert module.handled == []
+        assert not module._pending
+        assert scheduler.stats["TextIndexer.drainPending"]["errors"] == 0
+
+
+class TestModelAccess:
+    def test_functions_call_model_one_at_a_time(self, vectors_file):
+        module = TextIndexerModule("TextIndexer", vectors_file=vectors_file)
+        module._indexer = indexer = OverlapIndexer(MmapWordVectors(vectors_file))
+        config = {"mail": {"type": "SKILL", "name": "Mail", "description": "send mail", "tags": ["mail"]}}
+        callback = Callback(CommandIdentifier(ApplicationType.CORE, "SkillsManager", "core", "onIndexed"))
+
+        def index_config():
+            for _ in range(20):
+                module._functions["configIndexationFunction"]._get_indexed_data(config, {}, callback)
+
+        def index_queries():
+            for _ in range(20):
+                module._functions["queryIndexation"]._get_indexed_query({"user_query": "send mail"}, {}, CALLBACK)
+
+        threads = [threading.Thread(target=index_config), threading.Thread(target=index_queries)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert indexer.overlaps == 0
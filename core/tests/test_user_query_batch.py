@@ -0,0 +1,80 @@
+from core.application.impl.user_query_processing import UserQueryProcessing
+from core.communication.callback import Callback
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.message import Message
+from core.skill.function_configuration import FunctionConfiguration
+from core.skill.index import IndexData, ExactWeightedUnit
+from core.skill.skill_configuration import SkillConfiguration
+
+UI = CommandIdentifier(ApplicationType.MODULE, "UI", "core", "userQuery")
+BATCH = CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "mainBatch")
+RESULTS = CommandIdentifier(ApplicationType.MODULE, "Benchmark", "core", "onResults")
+TEXT_INDEXER = CommandIdentifier(ApplicationType.MODULE, "TextIndexer", "queryIndexation", "mainBatch")
+TEXT_TO_COMMAND = CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "mainBatch")
+
+
+def get_config() -> dict:
+    skill = SkillConfiguration(
+        name="EMail",
+        description="Email integration.",
+        tags=["Mail"],
+        functions=[FunctionConfiguration(
+            name="Send mail",
+            description="Sends mail.",
+            call_examples=["Send mail"],
+            indexed_data=IndexData([ExactWeightedUnit(1., ["send mail"])], [])
+        )],
+        indexed_data=IndexData([ExactWeightedUnit(1., ["mail"])], [])
+    )
+    return {skill.id: skill}
+
+
+class BatchChain:
+    """UserQueryProcessing with the messages it sends recorded, TextIndexer and TextToCommand are played by the test"""
+
+    def __init__(self):
+        self.application = UserQueryProcessing("UserQueryProcessing")
+        self.application.skills_config = get_config()
+        self.application.index_version = 1
+        self.sent = []
+        self.application._dispatch_event = self._record
+
+    def _record(self, function_id, command_id, payload, context, target, callback):
+        self.sent.append(Message(
+            payload, target, CommandIdentifier(ApplicationType.CORE, self.application.id, function_id, command_id),
+            context, callback
+        ))
+
+    def answer(self, request: Message, source: CommandIdentifier, payload: dict) -> Message:
+        """Answers the request to the callback, returns the message sent on by UserQueryProcessing"""
+        self.application._on_event(Message(payload, request.callback.target, source, request.context))
+        return self.sent[-1]
+
+
+class TestBatchQueries:
+    def test_batch_is_indexed_rated_and_sent_to_callback(self):
+        chain = BatchChain()
+        chain.application._on_event(Message({"user_queries": ["send mail", "mail"]}, BATCH, UI, {}, Callback(RESULTS)))
+        indexation = chain.sent[-1]
+        assert str(indexation.target) == str(TEXT_INDEXER)
+        assert indexation.payload["user_queries"] == ["send mail", "mail"]
+        assert indexation.callback.target.command == "onBatchQueryIndexed"
+
+        queries = [{"raw": raw, "cleared": raw, "embedding": None} for raw in indexation.payload["user_queries"]]
+        rating = chain.answer(indexation, TEXT_INDEXER, {"queries": queries})
+        assert str(rating.target) == str(TEXT_TO_COMMAND)
+        assert rating.payload["queries"] == queries and rating.payload["index_version"] == 1
+        assert rating.callback.target.command == "onBatchCommandsRating"
+
+        ratings = [{"email.send-mail": 0.9, "email": 0.5}, {"email": 0.4}]
+        results = chain.answer(rating, TEXT_TO_COMMAND, {"ratings": ratings})
+        assert str(results.target) == str(RESULTS)
+        assert [[variant["id"] for variant in result["variants"]] for result in results.payload["results"]] == [
+            ["email.send-mail", "email"], ["email"]
+        ]
+        assert chain.application._functions["processUserQueryFunction"].superseded == 0  # batches are never superseded
+
+    def test_batch_without_callback_is_dropped(self):
+        chain = BatchChain()
+        chain.application._on_event(Message({"user_queries": ["send mail"]}, BATCH, UI, {}))
+        assert chain.sent == []
@@ -0,0 +1,238 @@
+import pytest
+
+from core.application.impl.user_query_processing import UserQueryProcessing
+from core.communication.command_identifier import ApplicationType, CommandIdentifier
+from core.communication.connection import SyncConnection
+from core.communication.dispatcher import MessageDispatcher, OverflowPolicy, QueuePolicy
+from core.communication.message import Message
+from core.skill.function_configuration import FunctionConfiguration
+from core.skill.index import IndexData, ExactWeightedUnit
+from core.skill.skill_configuration import SkillConfiguration
+from core.skill.storage import SkillsConfigStorage
+from core.skill.writer import SkillsConfigWriter
+
+UI = CommandIdentifier(ApplicationType.MODULE, "UI", "core", "userQuery")
+TEXT_INDEXER = CommandIdentifier(ApplicationType.MODULE, "TextIndexer", "queryIndexation", "main")
+TEXT_TO_COMMAND = CommandIdentifier(ApplicationType.MODULE, "TextToCommand", "getSkillsRatingByQuery", "main")
+RATING = {"email.send-mail": 0.9, "email": 0.5}
+
+
+def get_config() -> dict:
+    skill = SkillConfiguration(
+        name="EMail",
+        description="Email integration.",
+        tags=["Mail"],
+        functions=[FunctionConfiguration(
+            name="Send mail",
+            description="Sends mail.",
+            call_examples=["Send mail"],
+            indexed_data=IndexData([ExactWeightedUnit(1., ["send mail"])], [])
+        )],
+        indexed_data=IndexData([ExactWeightedUnit(1., ["mail"])], [])
+    )
+    return {skill.id: skill}
+
+
+class Chain:
+    """UserQueryProcessing with its messages recorded, the modules it talks to are played by the test"""
+
+    def __init__(self, tmp_path):
+        self.application = UserQueryProcessing("UserQueryProcessing")
+        self.application.skills_config = get_config()
+        self.application.index_version = 1
+        self.application._writer = SkillsConfigWriter(SkillsConfigStorage(str(tmp_path / "skills_config.json")))
+        self.sent = []
+        self.application._connection = SyncConnection(self.application._on_event)
+        self.application._connection.set_on_local_message(self.sent.append)
+
+    @property
+    def function(self):
+        return self.application._functions["processUserQueryFunction"]
+
+    def query(self, text: str, source: CommandIdentifier = UI) -> Message:
+        """Sends the user query, returns the message sent on by UserQueryProcessing"""
+        self.application._on_event(Message(
+            {"user_query": text},
+            CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "main"),
+            source,
+            {}
+        ))
+        return self.sent[-1]
+
+    def index(self, request: Message):
+        """Answers the query indexation request like TextIndexer"""
+        raw = request.payload["user_query"]
+        self.application._on_event(Message(
+            {"query": {"raw": raw, "cleared": raw.lower(), "embedding": [1., 0.]}},
+            request.callback.target, TEXT_INDEXER, request.context
+        ))
+
+    def rate(self, request: Message, index_version: int):
+        """Answers the rating request like TextToCommand, rated with index_version"""
+        self.application._on_event(Message(
+            {"rating": RATING, "index_version": index_version},
+            request.callback.target, TEXT_TO_COMMAND, request.context
+        ))
+
+    def close(self):
+        self.application._writer.close()
+
+
+@pytest.fixture
+def chain(tmp_path):
+    chain = Chain(tmp_path)
+    yield chain
+    chain.close()
+
+
+def get_variants(message: Message) -> list:
+    assert message.target.function == "core" and message.target.command == "askUserSelectCommandFromVariants"
+    return [variant["id"] for variant in message.payload["variants"]]
+
+
+class TestSupersededQueries:
+    def test_superseded_query_indexed_after_new_query(self, chain):
+        first = chain.query("send mail")
+        second = chain.query("send a letter")
+
+        chain.index(first)
+        assert chain.sent[-1] is second  # nothing sent for the superseded query
+        assert chain.function.superseded == 1
+
+        chain.index(second)
+        assert chain.sent[-1].target == TEXT_TO_COMMAND
+
+    def test_superseded_query_rated_after_new_query(self, chain):
+        first = chain.query("send mail")
+        chain.index(first)
+        first_rating = chain.sent[-1]
+        second = chain.query("send a letter")
+
+        chain.rate(first_rating, 1)
+        assert chain.sent[-1] is second  # stale variants are never shown
+        assert chain.function.superseded == 1
+        assert chain.application.rating_cache.stats["size"] == 0
+
+        chain.index(second)
+        chain.rate(chain.sent[-1], 1)
+        assert get_variants(chain.sent[-1]) == list(RATING)
+        assert chain.function.superseded == 1
+
+    def test_queries_of_other_senders_are_not_superseded(self, chain):
+        other = CommandIdentifier(ApplicationType.MODULE, "TelegramBot", "core", "userQuery")
+        first = chain.query("send mail")
+        second = chain.query("read mail", other)
+        assert first.context != second.context
+
+        chain.index(first)
+        chain.rate(chain.sent[-1], 1)
+        assert get_variants(chain.sent[-1]) == list(RATING)
+
+        chain.index(second)
+        assert chain.sent[-1].target == TEXT_TO_COMMAND
+        assert chain.function.superseded == 0
+
+        third = chain.query("send a letter", other)
+        chain.rate(chain.sent[-2], 1)  # rating of the second query arrives after the third one
+        assert chain.sent[-1] is third
+        assert chain.function.superseded == 1
+
+
+class TestQueuePolicies:
+    def test_user_queries_are_coalesced_by_sender(self, chain):
+        policies = chain.application.compile_routes()
+        main = CommandIdentifier(ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "main")
+        indexed = CommandIdentifier(
+            ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", "onQueryIndexed"
+        )
+        assert policies[main].overflow is OverflowPolicy.COALESCE
+        assert policies[main].coalesce_key(Message({}, main, UI, {})) is UI
+        assert policies[indexed] == QueuePolicy(OverflowPolicy.BLOCK, None)
+
+        dispatcher = MessageDispatcher(workers=0)
+        key = (ApplicationType.CORE, "UserQueryProcessing")
+        connection = chain.application._connection
+        other = CommandIdentifier(ApplicationType.MODULE, "TelegramBot", "core", "userQuery")
+        for text, source in [("send", UI), ("send mail", UI), ("read mail", other), ("send mail now", UI)]:
+            dispatcher.dispatch(key, connection, Message({"user_query": text}, main, source, {}), policies[main])
+        dispatcher.drain_main_thread()
+
+        # latest query of each sender is handled, in the order the senders started typing
+        assert [message.payload["user_query"] for message in chain.sent] == ["send mail now", "read mail"]
+        assert dispatcher.stats["CORE.UserQueryProcessing"]["coalesced"] == 2
+
+    def test_chain_and_batch_hops_survive_overflow(self, chain):
+        policies = chain.application.compile_routes()
+        received = []
+        connection = SyncConnection(lambda event: received.append(event.payload["i"]))
+        connection.max_queue_size = 2
+        dispatcher = MessageDispatcher(workers=0)
+
+        commands = ["main", "mainBatch", "main", "onCommandsRating", "onBatchQueryIndexed", "main",
+                    "onQueryIndexed", "onBatchCommandsRating", "main"]
+        for i, command in enumerate(commands):
+            target = CommandIdentifier(
+                ApplicationType.CORE, "UserQueryProcessing", "processUserQueryFunction", command
+            )
+            source = CommandIdentifier(ApplicationType.MODULE, f"UI{i}")  # queries of different senders
+            dispatcher.dispatch(
+                (ApplicationType.CORE, "UserQueryProcessing"), connection, Message({"i": i}, target, source, {}),
+                policies[target]
+            )
+        dispatcher.drain_main_thread()
+
+        # queries make room for the hops and for each other, hops are queued over the limit instead
+        assert [commands[i] for i in received] == [
+            "mainBatch", "onCommandsRating", "onBatchQueryIndexed", "onQueryIndexed", "onBatchCommandsRating", "main"
+        ]
+        stats = dispatcher.stats["CORE.UserQueryProcessing"]
+        assert (stats["dropped"], stats["overflowed"]) == (3, 4)
+
+
+class TestRatingCache:
+    def test_repeated_query_is_answered_from_cache(self, chain):
+        request = chain.query("Send mail")
+        chain.index(request)
+        chain.rate(chain.sent[-1], 1)
+        sent = len(chain.sent)
+
+        chain.query("send mail!")
+        assert len(chain.sent) == sent + 1  # cleared query is the same, nothing is sent to TextIndexer
+        assert get_variants(chain.sent[-1]) == list(RATING)
+        assert chain.application.rating_cache.stats["hits"] == 1
+
+    def test_cached_under_version_rated_with(self, chain):
+        request = chain.query("send mail")
+        chain.index(request)
+        rating_request = chain.sent[-1]
+        assert rating_request.payload["index_version"] == 1
+
+        chain.application.index_version = 2  # TextToCommand was updated after the query was issued
+        chain.rate(rating_request, 2)
+        assert chain.application.rating_cache.get("send mail", 2) == RATING
+        assert chain.application.rating_cache.get("send mail", 1) is None
+
+        chain.query("send mail")
+        assert get_variants(chain.sent[-1]) == list(RATING)
+
+    def test_outdated_rating_is_not_cached(self, chain):
+        request = chain.query("send mail")
+        chain.index(request)
+        chain.application.index_version = 2
+        chain.rate(chain.sent[-1], 1)
+
+        assert get_variants(chain.sent[-1]) == list(RATING)  # still shown, the query is the latest one
+        assert chain.application.rating_cache.stats["size"] == 0
+
+    def test_update_config_invalidates_cache(self, chain):
+        request = chain.query("send mail")
+        chain.index(request)
+        chain.rate(chain.sent[-1], 1)
+
+        chain.application.update_config(chain.application.skills_config)
+        assert chain.application.index_version == 2
+        assert chain.application.rating_cache.stats["invalidations"] == 1
+
+        request = chain.query("send mail")
+        assert request.target == TEXT_INDEXER  # rated again with the updated index
+        assert chain.application.rating_cache.stats["hits"] == 0
@@ -11,10 +11,17 @@ from core.module.module import Module
 
 logging.basicConfig(level=logging.INFO)
 
+# optional PCA projection of embeddings (python -m benchmarks.projection fit), index and queries are reduced with it
+projection_file = "skills_config.projection.npz"
+
 modules: Dict[str, Module] = {
     "UI": UIModule("UI"),
-    "TextIndexer": TextIndexerModule("TextIndexer"),  # Used to index config data + each query
-    "TextToCommand": TextToCommandModule("TextToCommand"),  # Recommend top N commands to execute according to query.
+    # Used to index config data + each query, embeddings of seen strings are cached between runs
+    "TextIndexer": TextIndexerModule("TextIndexer", cache_file="embeddings_cache", projection_file=projection_file),
+    # Recommend top N commands to execute according to query.
+    "TextToCommand": TextToCommandModule(
+        "TextToCommand", ann_file="skills_config.ann.npz", projection_file=projection_file
+    ),
 }
 
 applications: Dict[str, Application] = {
@@ -24,7 +31,11 @@ applications: Dict[str, Application] = {
 if __name__ == "__main__":
     controller = Controller(
         modules=modules,
-        applications=applications
+        applications=applications,
+        workers=2  # embedding and rating run off the UI thread
     )
 
-    controller.setup()
+    try:
+        controller.setup()  # runs the event loop until the controller is stopped
+    finally:
+        controller.stop()  # pending commands are cancelled, pool processes exit
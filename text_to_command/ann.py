@@ -0,0 +1,307 @@
+from abc import ABCMeta, abstractmethod
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class NearestNeighbourIndex(metaclass=ABCMeta):
+    """Cosine similarity search over vectors identified by string keys."""
+
+    @abstractmethod
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, keys: Sequence[str]) -> None:
+        pass
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Returns up to k (key, similarity) pairs, the most similar first."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        pass
+
+
+class _VectorTable:
+    """Rows of normalized vectors with tombstones, so inserts and deletes don't rebuild the whole table."""
+    vectors: np.ndarray
+    keys: List[Optional[str]]
+    rows: Dict[str, int]
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.keys = []
+        self.rows = {}
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> np.ndarray:
+        self.remove([key for key in keys if key in self.rows])
+        start = len(self.keys)
+        self.vectors = np.concatenate([self.vectors, normalize(vectors).reshape(len(keys), -1)])
+        for i, key in enumerate(keys, start=start):
+            self.keys.append(key)
+            self.rows[key] = i
+        return np.arange(start, len(self.keys))
+
+    def remove(self, keys: Sequence[str]) -> np.ndarray:
+        rows = np.asarray([self.rows.pop(key) for key in keys if key in self.rows], dtype=np.intp)
+        for row in rows:
+            self.keys[row] = None
+        return rows
+
+    @property
+    def tombstones(self) -> int:
+        return len(self.keys) - len(self.rows)
+
+    def compact(self) -> np.ndarray:
+        """Drops deleted rows, returns the old row of each kept row."""
+        alive = np.asarray([i for i, key in enumerate(self.keys) if key is not None], dtype=np.intp)
+        self.vectors = self.vectors[alive]
+        self.keys = [self.keys[i] for i in alive]
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        return alive
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, keys: List[Optional[str]], k: int) -> List[Tuple[str, float]]:
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return [(keys[rows[i]], float(scores[i])) for i in order]
+
+
+class ExactIndex(NearestNeighbourIndex):
+    """Brute-force search, used for small catalogs and as the reference for recall."""
+    _table: _VectorTable
+
+    def __init__(self, dim: int):
+        self._table = _VectorTable(dim)
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        self._table.add(keys, vectors)
+
+    def remove(self, keys: Sequence[str]) -> None:
+        self._table.remove(keys)
+        if self._table.tombstones > len(self._table.rows):
+            self._table.compact()
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if not len(self._table.rows):
+            return []
+        if self._table.tombstones:
+            self._table.compact()
+        rows = np.arange(len(self._table.keys))
+        return _top_k(rows, self._table.vectors @ normalize(query), self._table.keys, k)
+
+    def __len__(self) -> int:
+        return len(self._table.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._table.rows
+
+
+class IVFIndex(NearestNeighbourIndex):
+    """
+    Inverted file index: vectors are assigned to the closest of n_lists k-means centroids
+    and a query is compared only with the vectors of its n_probe closest lists.
+    ---
+    n_probe is the recall/latency knob: n_probe == n_lists is an exact search.
+    New vectors are assigned to the trained centroids, call train again when the catalog drifts away from them.
+    """
+    n_lists: int
+    n_probe: int
+    centroids: Optional[np.ndarray]
+
+    _table: _VectorTable
+    _lists: List[np.ndarray]  # rows of the table per centroid
+    _assignments: np.ndarray  # centroid per table row, -1 for deleted rows
+
+    def __init__(self, dim: int, n_lists: int, n_probe: int = 8):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids = None
+        self._table = _VectorTable(dim)
+        self._lists = []
+        self._assignments = np.zeros(0, dtype=np.intp)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: Optional[np.ndarray] = None, iterations: int = 20, seed: int = 0) -> None:
+        """Fits centroids with spherical k-means (on the stored vectors by default) and re-assigns stored vectors."""
+        if vectors is None:
+            self._compact()
+            vectors = self._table.vectors
+        self.centroids = spherical_kmeans(normalize(vectors), self.n_lists, iterations, seed)
+        self._compact()
+        self._assignments = self._assign(self._table.vectors)
+        self._rebuild_lists()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if not len(vectors):
+            return np.zeros(0, dtype=np.intp)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def _rebuild_lists(self):
+        alive = self._assignments >= 0
+        rows = np.flatnonzero(alive)
+        order = np.argsort(self._assignments[rows], kind="stable")
+        bounds = np.searchsorted(self._assignments[rows][order], np.arange(len(self.centroids) + 1))
+        self._lists = [rows[order][bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def _compact(self):
+        if not self._table.tombstones:
+            return
+        alive = self._table.compact()
+        if self.is_trained:
+            self._assignments = self._assignments[alive]
+            self._rebuild_lists()
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        if not self.is_trained:
+            raise ValueError("Index should be trained before adding vectors.")
+        self.remove(keys)
+        rows = self._table.add(keys, vectors)
+        assignments = self._assign(self._table.vectors[rows])
+        self._assignments = np.concatenate([self._assignments, assignments])
+        for list_id in np.unique(assignments):
+            self._lists[list_id] = np.concatenate([self._lists[list_id], rows[assignments == list_id]])
+
+    def remove(self, keys: Sequence[str]) -> None:
+        rows = self._table.remove(keys)
+        if not len(rows):
+            return
+        for list_id in np.unique(self._assignments[rows]):
+            self._lists[list_id] = np.setdiff1d(self._lists[list_id], rows, assume_unique=True)
+        self._assignments[rows] = -1
+        if self._table.tombstones > len(self._table.rows):
+            self._compact()
+
+    def search(self, query: np.ndarray, k: int, n_probe: Optional[int] = None) -> List[Tuple[str, float]]:
+        if not self.is_trained or not len(self._table.rows):
+            return []
+        query = normalize(query)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        rows = np.concatenate([self._lists[i] for i in probe])
+        if not len(rows):
+            return []
+        return _top_k(rows, self._table.vectors[rows] @ query, self._table.keys, k)
+
+    def __len__(self) -> int:
+        return len(self._table.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._table.rows
+
+    def get_vector(self, key: str) -> np.ndarray:
+        return self._table.vectors[self._table.rows[key]]
+
+    def copy(self) -> 'IVFIndex':
+        """
+        Copy that isn't affected by later changes of this index, so it can be searched while this one is updated.
+        Arrays that are only replaced, never changed in place (vectors, centroids, lists), are shared.
+        """
+        index = IVFIndex(self._table.vectors.shape[1], self.n_lists, self.n_probe)
+        index.centroids = self.centroids
+        index._table.vectors = self._table.vectors
+        index._table.keys = list(self._table.keys)
+        index._table.rows = dict(self._table.rows)
+        index._lists = list(self._lists)
+        index._assignments = self._assignments.copy()
+        return index
+
+    def keys(self) -> List[str]:
+        return list(self._table.rows.keys())
+
+    def save(self, path: str) -> None:
+        self._compact()
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                vectors=self._table.vectors,
+                keys=np.asarray(self._table.keys, dtype=str),
+                assignments=self._assignments,
+                centroids=self.centroids,
+                n_probe=self.n_probe
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'IVFIndex':
+        with np.load(path) as data:
+            centroids = data['centroids']
+            index = cls(centroids.shape[1], len(centroids), int(data['n_probe']))
+            index.centroids = centroids
+            index._table.vectors = data['vectors']
+            index._table.keys = data['keys'].tolist()
+            index._table.rows = {key: i for i, key in enumerate(index._table.keys)}
+            index._assignments = data['assignments']
+        index._rebuild_lists()
+        return index
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means on the unit sphere, initialized with k-means++."""
+    if len(vectors) < n_clusters:
+        raise ValueError(f"Can't fit {n_clusters} centroids on {len(vectors)} vectors.")
+
+    rng = np.random.default_rng(seed)
+    centroids = [vectors[rng.integers(len(vectors))]]
+    distances = 1 - vectors @ centroids[0]
+    for _ in range(1, n_clusters):
+        probabilities = np.maximum(distances, 0)
+        total = probabilities.sum()
+        choice = rng.choice(len(vectors), p=probabilities / total) if total > 0 else rng.integers(len(vectors))
+        centroids.append(vectors[choice])
+        distances = np.minimum(distances, 1 - vectors @ vectors[choice])
+    centroids = np.asarray(centroids)
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]  # keep centroids of empty clusters in place
+        updated = normalize(sums)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+    return centroids
+
+
+def get_recall_report(
+        index: NearestNeighbourIndex, reference: NearestNeighbourIndex, queries: np.ndarray, k: int = 10
+) -> dict:
+    """Compares index against (usually exact) reference search: recall@k and mean latency per query."""
+    found, latency, reference_latency = 0, 0., 0.
+    for query in queries:
+        start = perf_counter()
+        result = index.search(query, k)
+        latency += perf_counter() - start
+
+        start = perf_counter()
+        expected = reference.search(query, k)
+        reference_latency += perf_counter() - start
+
+        found += len({key for key, _ in result} & {key for key, _ in expected})
+
+    return {
+        "recall": found / max(1, k * len(queries)),
+        "latency": latency / max(1, len(queries)),
+        "reference_latency": reference_latency / max(1, len(queries))
+    }
@@ -0,0 +1,120 @@
+from typing import Dict, List
+
+import numpy as np
+from Levenshtein import distance
+
+WORD_SIZE = 64
+
+
+class VariantsDistance:
+    """
+    Levenshtein distance from one query to a whole list of variants at once.
+    ---
+    Uses bit-parallel Myers/Hyyro algorithm vectorized over variants: each variant up to 64 chars long is one uint64
+    bit-vector and the query is consumed char by char, updating all variants with a few NumPy operations.
+    Longer variants fall back to one by one distance calculation.
+    """
+    variants: List[str]
+    lengths: np.ndarray  # (n_variants,)
+
+    _rows: np.ndarray  # variants processed bit-parallel
+    _positions: np.ndarray  # position of each variant in _rows, -1 if it isn't processed bit-parallel
+    _long_rows: np.ndarray  # variants longer than the machine word
+    _peq: Dict[str, np.ndarray]  # char -> bit-mask of its positions in each of _rows variants
+    _high_bits: np.ndarray  # bit of the last char of each of _rows variants
+
+    def __init__(self, variants: List[str]):
+        self.variants = list(variants)
+        self.lengths = np.asarray([len(v) for v in self.variants], dtype=np.int64)
+
+        self._rows = np.flatnonzero((self.lengths > 0) & (self.lengths <= WORD_SIZE))
+        self._long_rows = np.flatnonzero(self.lengths > WORD_SIZE)
+        self._positions = np.full(len(self.variants), -1, dtype=np.intp)
+        self._positions[self._rows] = np.arange(len(self._rows))
+
+        peq = {}
+        for i, row in enumerate(self._rows):
+            for position, char in enumerate(self.variants[row]):
+                if char not in peq:
+                    peq[char] = np.zeros(len(self._rows), dtype=np.uint64)
+                peq[char][i] |= np.uint64(1 << position)
+        self._peq = peq
+        self._high_bits = np.left_shift(np.uint64(1), (self.lengths[self._rows] - 1).astype(np.uint64))
+
+    def __len__(self):
+        return len(self.variants)
+
+    def get_distances(self, query: str, max_distances: np.ndarray = None, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Returns Levenshtein distances to all variants or to the variants listed in rows.
+        Variants with max_distances are abandoned as soon as they can't get within it, their distance is max + 1.
+        """
+        if rows is None:
+            rows = np.arange(len(self.variants))
+        lengths = self.lengths[rows]
+        result = np.where(lengths == 0, len(query), 0).astype(np.int64)
+        if max_distances is None:
+            max_distances = np.full(len(rows), np.iinfo(np.int64).max // 2, dtype=np.int64)
+
+        positions = self._positions[rows]
+        parallel = np.flatnonzero(positions >= 0)
+        result[parallel] = self._get_parallel_distances(query, positions[parallel], max_distances[parallel])
+        for i in np.flatnonzero(lengths > WORD_SIZE):
+            result[i] = distance(query, self.variants[rows[i]])
+        return result
+
+    def _get_parallel_distances(self, query: str, positions: np.ndarray, max_distances: np.ndarray) -> np.ndarray:
+        """Distances to variants at positions of _rows"""
+        is_subset = len(positions) != len(self._rows)
+        n = len(positions)
+        result = np.asarray(max_distances + 1, dtype=np.int64)
+        active = np.arange(n)
+
+        high = self._high_bits[positions] if is_subset else self._high_bits
+        limits = max_distances
+        pv = ~np.zeros(n, dtype=np.uint64)
+        mv = np.zeros(n, dtype=np.uint64)
+        score = self.lengths[self._rows[positions]]
+        one = np.uint64(1)
+        empty = np.zeros(len(self._rows), dtype=np.uint64)
+
+        for j, char in enumerate(query):
+            eq = self._peq.get(char, empty)
+            if is_subset or len(active) != n:
+                eq = eq[positions[active]]
+
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            score += (ph & high) != 0
+            score -= (mh & high) != 0
+            ph = (ph << one) | one
+            mh = mh << one
+            pv = mh | ~(xv | ph)
+            mv = ph & xv
+
+            # each of the remaining chars can decrease the distance by one at most,
+            # rows that can't get within their limit are dropped once there are enough of them
+            alive = score - (len(query) - j - 1) <= limits
+            if np.count_nonzero(alive) < 0.75 * len(active):
+                active, high, limits, pv, mv, score = (
+                    active[alive], high[alive], limits[alive], pv[alive], mv[alive], score[alive]
+                )
+
+        result[active] = np.minimum(score, limits + 1)
+        return result
+
+    def get_similarities(self, query: str, floor: float = 0., rows: np.ndarray = None) -> np.ndarray:
+        """1 - distance / max length for all variants (or the ones in rows), similarities below floor are 0"""
+        lengths = self.lengths if rows is None else self.lengths[rows]
+        max_lengths = np.maximum(lengths, len(query))
+        if floor > 0:
+            max_distances = np.floor((1 - floor) * max_lengths + 1e-9).astype(np.int64)
+        else:
+            max_distances = max_lengths
+        distances = self.get_distances(query, max_distances, rows)
+
+        similarities = 1 - np.divide(distances, max_lengths, out=np.zeros(len(lengths)), where=max_lengths > 0)
+        similarities[similarities < floor] = 0
+        return np.maximum(similarities, 0)
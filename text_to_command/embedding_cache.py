@@ -0,0 +1,108 @@
+import atexit
+import dbm
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+_NO_VECTOR = b""  # strings without vector are cached too, so they don't go through the model again
+
+
+class EmbeddingCache:
+    """
+    Embeddings of already seen strings, keyed by the string and the identity of the model that embedded it.
+    ---
+    The memory tier is an LRU of up to max_size entries, which expire ttl seconds after they were stored.
+    The disk tier (a dbm file, when cache_file is given) is not bounded and survives restarts:
+    entries of another model never match, so it doesn't need invalidation when the model changes.
+    Cached arrays are read-only, callers that need to modify an embedding should copy it.
+    """
+    max_size: int
+    ttl: Optional[float]
+    cache_file: Optional[str]
+
+    _memory: 'OrderedDict[str, Tuple[Optional[np.ndarray], float]]'  # key -> (embedding, expiration time)
+    _disk: Optional[Any]  # dbm database
+    _lock: threading.Lock
+    _stats: Dict[str, int]
+
+    def __init__(self, cache_file: Optional[str] = None, max_size: int = 10000, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_file = cache_file
+
+        self._memory = OrderedDict()
+        self._disk = None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if cache_file:
+            self._disk = dbm.open(cache_file, 'c')
+            atexit.register(self.close)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters since the cache was created"""
+        with self._lock:
+            return {**self._stats, "memory_size": len(self._memory)}
+
+    @staticmethod
+    def get_key(model_id: str, s: str) -> str:
+        return f"{model_id}\x00{s}"
+
+    def get(self, key: str) -> Tuple[bool, Optional[np.ndarray]]:
+        """Returns (found, embedding), embedding is None for strings the model has no vector for."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                embedding, expires = entry
+                if expires >= monotonic():
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return True, embedding
+                del self._memory[key]
+
+            if self._disk is not None:
+                data = self._disk.get(key.encode())
+                if data is not None:
+                    embedding = self._decode(data)
+                    self._remember(key, embedding)
+                    self._stats["disk_hits"] += 1
+                    return True, embedding
+
+            self._stats["misses"] += 1
+            return False, None
+
+    def put(self, key: str, embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Stores embedding, returns its read-only cached copy."""
+        if embedding is not None:
+            embedding = np.array(embedding, dtype=np.float32)
+            embedding.flags.writeable = False
+
+        with self._lock:
+            self._remember(key, embedding)
+            if self._disk is not None:
+                self._disk[key.encode()] = embedding.tobytes() if embedding is not None else _NO_VECTOR
+        return embedding
+
+    def _remember(self, key: str, embedding: Optional[np.ndarray]):
+        expires = monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._memory[key] = (embedding, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def _decode(data: bytes) -> Optional[np.ndarray]:
+        if data == _NO_VECTOR:
+            return None
+        return np.frombuffer(data, dtype=np.float32)  # read-only, as it is backed by bytes
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
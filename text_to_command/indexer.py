@@ -1,14 +1,42 @@
 import re
-from typing import Any, List, Union
+from typing import Any, List, Union, Optional
+
+import numpy as np
 
 from text_to_command.configuration_units import SkillFunction, IndexedData, SkillConfiguration
+from text_to_command.embedding_cache import EmbeddingCache
+
+
+# pipeline components that don't affect doc.vector, which is the average of static token vectors
+VECTOR_FREE_COMPONENTS = (
+    "tok2vec", "tagger", "morphologizer", "parser", "senter", "ner", "attribute_ruler", "lemmatizer"
+)
 
 
 class Indexer:
     word_2_vec_mapper: Any  # spacy.lang.en.English for now
+    model_id: str  # identity of the model embeddings, cached embeddings of other models are not reused
+    cache: Optional[EmbeddingCache]
+    batch_size: int
+    n_process: int
 
-    def __init__(self, word_2_vec_mapper: Any):
+    _disabled: List[str]  # components of the pipeline skipped when only vectors are needed
+
+    def __init__(
+            self, word_2_vec_mapper: Any, cache: Optional[EmbeddingCache] = None, batch_size: int = 256,
+            n_process: int = 1
+    ):
         self.word_2_vec_mapper = word_2_vec_mapper
+        self.cache = cache
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._disabled = [
+            name for name in getattr(word_2_vec_mapper, "pipe_names", []) if name in VECTOR_FREE_COMPONENTS
+        ]
+
+        meta = getattr(word_2_vec_mapper, "meta", None) or {}
+        name = meta.get('name', type(word_2_vec_mapper).__name__)
+        self.model_id = f"{meta.get('lang', '')}_{name}-{meta.get('version', '')}"
 
     @staticmethod
     def clear_string(data: str) -> str:
@@ -17,11 +45,50 @@ class Indexer:
         lc_cleared = re.sub(r"\s+", " ", lc_cleared)
         return lc_cleared.strip()
 
+    def _get_doc(self, s: str):
+        if self._disabled:
+            return self.word_2_vec_mapper(s, disable=self._disabled)
+        return self.word_2_vec_mapper(s)
+
+    def _pipe(self, strings: List[str], batch_size: Optional[int], n_process: Optional[int]):
+        kwargs = dict(batch_size=batch_size or self.batch_size)
+        if (n_process or self.n_process) != 1:
+            kwargs['n_process'] = n_process or self.n_process
+        if self._disabled:
+            kwargs['disable'] = self._disabled
+        return self.word_2_vec_mapper.pipe(strings, **kwargs)
+
     def get_embedding(self, s: str):
-        token = self.word_2_vec_mapper(s)
+        if self.cache is not None:
+            key = self.cache.get_key(self.model_id, s)
+            found, embedding = self.cache.get(key)
+            if not found:
+                token = self._get_doc(s)
+                embedding = self.cache.put(key, token.vector if token.has_vector else None)
+            return embedding
+
+        token = self._get_doc(s)
         if token.has_vector:
             return token.vector
 
+    def get_embeddings(
+            self, strings: List[str], batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> List[Optional[np.ndarray]]:
+        """Same as get_embedding for each string, but all strings go through the model in one pass"""
+        if self.cache is None:
+            return [doc.vector if doc.has_vector else None for doc in self._pipe(strings, batch_size, n_process)]
+
+        embeddings = {}
+        for s in dict.fromkeys(strings):
+            found, embedding = self.cache.get(self.cache.get_key(self.model_id, s))
+            if found:
+                embeddings[s] = embedding
+
+        missing = [s for s in dict.fromkeys(strings) if s not in embeddings]
+        for s, doc in zip(missing, self._pipe(missing, batch_size, n_process)):
+            embeddings[s] = self.cache.put(self.cache.get_key(self.model_id, s), doc.vector if doc.has_vector else None)
+        return [embeddings[s] for s in strings]
+
     def get_index_function_data(self, function: SkillFunction):
         data = [
             self.clear_string(function.name),
@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+
+class Projection:
+    """
+    PCA projection of embeddings to n_components dimensions, fitted offline and applied to index and queries.
+    ---
+    Both sides have to be projected with the same fitted projection, similarities are then calculated
+    in the reduced space.
+    """
+    mean: np.ndarray  # (dim,)
+    components: np.ndarray  # (n_components, dim), principal axes
+    explained_variance_ratio: np.ndarray  # (n_components,)
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, explained_variance_ratio: np.ndarray):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+        self.explained_variance_ratio = np.asarray(explained_variance_ratio, dtype=np.float32)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, n_components: int) -> 'Projection':
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if n_components > min(vectors.shape):
+            raise ValueError(f"Can't fit {n_components} components on {vectors.shape[0]}x{vectors.shape[1]} vectors.")
+
+        mean = vectors.mean(axis=0)
+        _, singular_values, axes = np.linalg.svd(vectors - mean, full_matrices=False)
+        variance = singular_values ** 2
+        return cls(mean, axes[:n_components], variance[:n_components] / variance.sum())
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Projects a vector (dim,) or vectors (n, dim)"""
+        return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(
+                f, mean=self.mean, components=self.components, explained_variance_ratio=self.explained_variance_ratio
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'Projection':
+        with np.load(path) as data:
+            return cls(data['mean'], data['components'], data['explained_variance_ratio'])
+
+
+def load_projection(path: Optional[str]) -> Optional[Projection]:
+    """Projection saved at path, None when there is no path or nothing was fitted there yet"""
+    if not path or not os.path.exists(path):
+        return None
+    return Projection.load(path)
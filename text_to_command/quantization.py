@@ -0,0 +1,82 @@
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+
+class QuantizedMatrix:
+    """
+    Rows of a float matrix stored as float16 or as int8 with a per-row scale, 2x or 4x smaller than float32.
+    ---
+    Products are computed in blocks of block_size rows: each block is decoded to float32 right before
+    its product, so only one decoded block exists at a time and it stays in cache.
+    Scores are approximate (errors are about 1e-4 for float16 and 2e-3 for int8 on unit vectors),
+    callers that need exact ones should re-rank the best candidates at full precision.
+    """
+    dtype: str
+    block_size: int = 256
+
+    _codes: np.ndarray  # (n, dim) float16 or int8
+    _scales: Optional[np.ndarray]  # (n,) float32 scale of each int8 row
+
+    def __init__(self, matrix: np.ndarray, dtype: str = "int8"):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype}, expected one of {DTYPES}.")
+        self.dtype = dtype
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self._scales = None
+
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127 if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+            scales[scales == 0] = 1
+            self._codes = np.round(matrix / scales[:, None]).astype(np.int8)
+            self._scales = scales.astype(np.float32)
+        else:
+            self._codes = matrix.astype(dtype)
+
+    @property
+    def shape(self):
+        return self._codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self._codes.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def decode(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximation of the original rows (all of them by default) as float32"""
+        codes = self._codes if rows is None else self._codes[rows]
+        decoded = codes.astype(np.float32)
+        if self._scales is not None:
+            decoded *= (self._scales if rows is None else self._scales[rows])[:, None]
+        return decoded
+
+    def dot(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate matrix @ queries.T: (n,) for a single query, (n, n_queries) for a batch"""
+        queries = np.asarray(queries, dtype=np.float32)
+        result = np.empty((len(self),) + queries.shape[:-1], dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            end = start + self.block_size
+            block = self._codes[start:end].astype(np.float32)
+            product = block @ queries.T
+            if self._scales is not None:
+                product *= self._scales[start:end].reshape((-1,) + (1,) * (queries.ndim - 1))
+            result[start:end] = product
+        return result
+
+
+def spill_to_memmap(matrix: np.ndarray) -> np.ndarray:
+    """
+    Copy of matrix backed by an anonymous temp file, so its pages can be evicted by the OS when they aren't used.
+    Used for full precision rows that are only read to re-rank a few candidates.
+    """
+    with tempfile.TemporaryFile() as f:
+        spilled = np.memmap(f, dtype=matrix.dtype, mode='w+', shape=matrix.shape) if matrix.size else matrix.copy()
+    if matrix.size:
+        spilled[:] = matrix
+        spilled.flush()
+    return spilled
@@ -0,0 +1,82 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+RatingKey = Tuple[str, int]  # (cleared query, index version)
+
+
+class RatingCache:
+    """
+    Ratings of already rated queries, keyed by the cleared query and the version of the index that rated it.
+    ---
+    An LRU bounded by max_size entries and by max_bytes, the estimated memory of the stored ratings.
+    Ratings of another index version never match, invalidate drops them all at once when the index changes,
+    so they don't take memory until they are evicted.
+    Stored ratings are shared with the callers and must not be changed.
+    """
+    max_size: int
+    max_bytes: int
+
+    _ratings: 'OrderedDict[RatingKey, Tuple[Dict[str, float], int]]'  # key -> (rating, estimated size)
+    _bytes: int
+    _lock: threading.Lock
+    _stats: Dict[str, int]
+
+    def __init__(self, max_size: int = 10000, max_bytes: int = 16 * 2 ** 20):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+
+        self._ratings = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Hit and miss counters since the cache was created"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.,
+                "size": len(self._ratings),
+                "bytes": self._bytes
+            }
+
+    def get(self, query: str, index_version: int) -> Optional[Dict[str, float]]:
+        with self._lock:
+            entry = self._ratings.get((query, index_version))
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._ratings.move_to_end((query, index_version))
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, query: str, index_version: int, rating: Dict[str, float]) -> None:
+        size = self._get_size(query, rating)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._ratings.pop((query, index_version), None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._ratings[(query, index_version)] = (rating, size)
+            self._bytes += size
+            while len(self._ratings) > self.max_size or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._ratings.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._ratings.clear()
+            self._bytes = 0
+            self._stats["invalidations"] += 1
+
+    @staticmethod
+    def _get_size(query: str, rating: Dict[str, float]) -> int:
+        # keys of the rating are the ids of the index entities, shared by all ratings, so only the dict is counted
+        return sys.getsizeof(query) + sys.getsizeof(rating) + sys.getsizeof(0.) * len(rating)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from text_to_command.ann import ExactIndex, IVFIndex, get_recall_report
+
+
+def get_clustered_vectors(n_clusters: int, per_cluster: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    return (centers.repeat(per_cluster, 0) + 0.1 * rng.normal(size=(n_clusters * per_cluster, dim))).astype(np.float32)
+
+
+class TestExactIndex:
+
+    def test_search_orders_by_cosine_similarity(self):
+        index = ExactIndex(2)
+        index.add(["x", "y", "xy"], np.array([[1, 0], [0, 1], [1, 1]]))
+        assert [key for key, _ in index.search(np.array([1, 0.1]), 3)] == ["x", "xy", "y"]
+
+    def test_remove(self):
+        index = ExactIndex(2)
+        index.add(["x", "y"], np.array([[1, 0], [0, 1]]))
+        index.remove(["x"])
+        assert "x" not in index
+        assert [key for key, _ in index.search(np.array([1, 0]), 2)] == ["y"]
+
+
+class TestIVFIndex:
+    vectors = get_clustered_vectors(16, 20)
+    keys = [str(i) for i in range(len(vectors))]
+
+    def get_index(self, n_probe: int) -> IVFIndex:
+        index = IVFIndex(self.vectors.shape[1], n_lists=16, n_probe=n_probe)
+        index.train(self.vectors)
+        index.add(self.keys, self.vectors)
+        return index
+
+    def test_full_probe_is_exact(self):
+        index = self.get_index(n_probe=16)
+        exact = ExactIndex(self.vectors.shape[1])
+        exact.add(self.keys, self.vectors)
+        assert get_recall_report(index, exact, self.vectors[::7], k=5)['recall'] == 1
+
+    @pytest.mark.parametrize("n_probe,min_recall", [(1, 0.8), (4, 0.95)])
+    def test_recall(self, n_probe, min_recall):
+        exact = ExactIndex(self.vectors.shape[1])
+        exact.add(self.keys, self.vectors)
+        assert get_recall_report(self.get_index(n_probe), exact, self.vectors[::7], k=5)['recall'] >= min_recall
+
+    def test_incremental_insert_and_delete(self):
+        index = self.get_index(n_probe=2)
+        index.remove(self.keys[:10])
+        index.add(["new"], self.vectors[:1] * 2)
+
+        assert len(index) == len(self.keys) - 9
+        assert index.search(self.vectors[0], 1)[0][0] == "new"
+        assert not {key for key, _ in index.search(self.vectors[0], 20)} & set(self.keys[:10])
+
+    def test_persistence(self, tmp_path):
+        index = self.get_index(n_probe=2)
+        index.remove(self.keys[:3])
+        index.save(str(tmp_path / "index.npz"))
+        loaded = IVFIndex.load(str(tmp_path / "index.npz"))
+
+        assert len(loaded) == len(index)
+        for query in self.vectors[::11]:
+            assert loaded.search(query, 5) == index.search(query, 5)
+
+    def test_copy_is_not_affected_by_changes(self):
+        index = self.get_index(n_probe=2)
+        copy = index.copy()
+        expected = [copy.search(query, 5) for query in self.vectors[::11]]
+
+        index.remove(self.keys[::2])
+        index.add(["new"], self.vectors[:1] * 2)
+        index.train()
+
+        assert len(copy) == len(self.keys) and "new" not in copy
+        assert [copy.search(query, 5) for query in self.vectors[::11]] == expected
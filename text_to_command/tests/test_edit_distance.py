@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+from text_to_command.edit_distance import VariantsDistance
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def random_strings(n: int, max_length: int, seed: int = 0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("abc de") for _ in range(rng.randint(0, max_length))) for _ in range(n)]
+
+
+class TestVariantsDistance:
+    variants = random_strings(200, 20) + random_strings(5, 90, seed=1) + ["a" * 64, "b" * 65]
+
+    @pytest.mark.parametrize("query", ["", "a", "abc de", "send mail", "ab" * 40] + random_strings(10, 25, seed=2))
+    def test_matches_reference(self, query):
+        expected = [levenshtein(query, v) for v in self.variants]
+        assert VariantsDistance(self.variants).get_distances(query).tolist() == expected
+
+    @pytest.mark.parametrize("floor", [0.3, 0.6, 0.9])
+    def test_similarity_floor(self, floor):
+        query = "abc de ab"
+        similarities = VariantsDistance(self.variants).get_similarities(query, floor)
+        for variant, similarity in zip(self.variants, similarities):
+            max_length = max(len(query), len(variant))
+            expected = 1 - levenshtein(query, variant) / max_length
+            assert similarity == pytest.approx(expected if expected >= floor else 0)
+
+    def test_empty(self):
+        assert VariantsDistance(["", "abc"]).get_similarities("").tolist() == [1, 0]
+        assert len(VariantsDistance([]).get_similarities("abc")) == 0
+        assert np.array_equal(VariantsDistance([""]).get_distances("ab"), [2])
+
+    def test_rows_subset(self):
+        rows = np.array([3, 0, 201, 204, 206, 150])
+        query = "abc de ab"
+        variants_distance = VariantsDistance(self.variants)
+        assert variants_distance.get_distances(query, rows=rows).tolist() == [
+            levenshtein(query, self.variants[row]) for row in rows
+        ]
+        assert np.allclose(
+            variants_distance.get_similarities(query, 0.5, rows=rows),
+            variants_distance.get_similarities(query, 0.5)[rows]
+        )
@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+
+from text_to_command.embedding_cache import EmbeddingCache
+from text_to_command.indexer import Indexer
+
+
+class FakeDoc:
+    def __init__(self, text: str):
+        self.text = text
+
+    @property
+    def has_vector(self):
+        return bool(self.text)
+
+    @property
+    def vector(self):
+        return np.full(4, len(self.text), dtype=np.float32)
+
+
+class FakeModel:
+    meta = {"lang": "en", "name": "fake", "version": "1.0"}
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text: str):
+        self.calls += 1
+        return FakeDoc(text)
+
+    def pipe(self, texts, **kwargs):
+        for text in texts:
+            yield self(text)
+
+
+class TestEmbeddingCache:
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_size=2)
+        for key in ["a", "b"]:
+            cache.put(key, np.zeros(2))
+        cache.get("a")
+        cache.put("c", np.zeros(2))
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a")[0] and cache.get("c")[0]
+        assert cache.stats["evictions"] == 1
+
+    def test_ttl(self):
+        cache = EmbeddingCache(ttl=0.01)
+        cache.put("a", np.zeros(2))
+        time.sleep(0.02)
+        assert cache.get("a") == (False, None)
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        cache_file = str(tmp_path / "cache")
+        cache = EmbeddingCache(cache_file)
+        cache.put("a", np.arange(3))
+        cache.put("empty", None)
+        cache.close()
+
+        cache = EmbeddingCache(cache_file)
+        found, embedding = cache.get("a")
+        assert found and embedding.tolist() == [0, 1, 2]
+        assert cache.get("empty") == (True, None)
+        assert cache.stats["disk_hits"] == 2
+        cache.close()
+
+    def test_cached_embeddings_are_read_only(self):
+        embedding = EmbeddingCache().put("a", np.zeros(2))
+        with pytest.raises(ValueError):
+            embedding += 1
+
+
+class TestIndexerCache:
+    def test_repeated_strings_skip_model(self):
+        model = FakeModel()
+        indexer = Indexer(model, EmbeddingCache())
+
+        indexer.get_embedding("send mail")
+        embeddings = indexer.get_embeddings(["send mail", "any messages", "any messages", ""])
+
+        assert model.calls == 3
+        assert embeddings[1] is embeddings[2] and embeddings[3] is None
+        assert indexer.cache.stats["memory_hits"] == 1
+
+    def test_model_identity_is_part_of_key(self):
+        cache = EmbeddingCache()
+        Indexer(FakeModel(), cache).get_embedding("send mail")
+
+        other_model = FakeModel()
+        other_model.meta = {**FakeModel.meta, "version": "2.0"}
+        Indexer(other_model, cache).get_embedding("send mail")
+        assert other_model.calls == 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from text_to_command.projection import Projection, load_projection
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(200, 16)).astype(np.float32) * np.linspace(4, 0.1, 16, dtype=np.float32)
+
+
+class TestProjection:
+    def test_fit_transform(self, vectors):
+        projection = Projection.fit(vectors, 4)
+
+        assert projection.input_dim == 16 and projection.n_components == 4
+        assert projection.transform(vectors).shape == (200, 4)
+        assert projection.transform(vectors[0]).shape == (4,)
+        assert np.all(np.diff(projection.explained_variance_ratio) <= 0)
+        assert projection.explained_variance_ratio.sum() < 1
+
+    def test_too_many_components(self, vectors):
+        with pytest.raises(ValueError):
+            Projection.fit(vectors[:3], 4)
+
+    def test_save_load(self, vectors, tmp_path):
+        path = str(tmp_path / "projection.npz")
+        assert load_projection(path) is None
+
+        projection = Projection.fit(vectors, 4)
+        projection.save(path)
+        loaded = load_projection(path)
+        assert np.allclose(loaded.transform(vectors), projection.transform(vectors))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from text_to_command.quantization import QuantizedMatrix, spill_to_memmap
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 32)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestQuantizedMatrix:
+    @pytest.mark.parametrize("dtype, atol, ratio", [("float16", 1e-3, 0.5), ("int8", 1e-2, 0.3)])
+    def test_products_are_close(self, matrix, dtype, atol, ratio):
+        quantized = QuantizedMatrix(matrix, dtype)
+        quantized.block_size = 300
+        queries = matrix[:3]
+
+        assert quantized.nbytes <= ratio * matrix.nbytes
+        assert np.allclose(quantized.dot(queries[0]), matrix @ queries[0], atol=atol)
+        assert np.allclose(quantized.dot(queries), matrix @ queries.T, atol=atol)
+        assert np.allclose(quantized.decode(np.asarray([5, 7])), matrix[[5, 7]], atol=atol)
+
+    def test_zero_rows(self):
+        quantized = QuantizedMatrix(np.zeros((2, 4)), "int8")
+        assert np.array_equal(quantized.dot(np.ones(4)), np.zeros(2))
+
+
+def test_spill_to_memmap(matrix):
+    spilled = spill_to_memmap(matrix)
+    assert isinstance(spilled, np.memmap)
+    assert np.array_equal(spilled, matrix)
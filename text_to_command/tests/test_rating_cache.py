@@ -0,0 +1,45 @@
+from text_to_command.rating_cache import RatingCache
+
+
+class TestRatingCache:
+    def test_keyed_by_index_version(self):
+        cache = RatingCache()
+        cache.put("send mail", 1, {"email.send-mail": 0.9})
+        assert cache.get("send mail", 1) == {"email.send-mail": 0.9}
+        assert cache.get("send mail", 2) is None
+        assert cache.get("list mail", 1) is None
+
+    def test_lru_eviction(self):
+        cache = RatingCache(max_size=2)
+        cache.put("a", 1, {"a": 1.})
+        cache.put("b", 1, {"b": 1.})
+        cache.get("a", 1)
+        cache.put("c", 1, {"c": 1.})
+        assert cache.get("b", 1) is None
+        assert cache.get("a", 1) is not None
+        assert cache.stats["evictions"] == 1
+
+    def test_memory_cap(self):
+        rating = {f"skill-{i}": float(i) for i in range(10)}
+        size = RatingCache._get_size("query 0", rating)
+        cache = RatingCache(max_bytes=size * 3)
+        for i in range(10):
+            cache.put(f"query {i}", 1, rating)
+        assert cache.stats["size"] == 3
+        assert cache.stats["bytes"] <= size * 3
+        assert cache.get("query 9", 1) is rating
+
+        cache.put("too big", 1, {f"skill-{i}": float(i) for i in range(1000)})
+        assert cache.get("too big", 1) is None
+
+    def test_invalidate_and_hit_rate(self):
+        cache = RatingCache()
+        cache.put("send mail", 1, {"email.send-mail": 0.9})
+        cache.get("send mail", 1)
+        cache.invalidate()
+        assert cache.get("send mail", 1) is None
+
+        stats = cache.stats
+        assert (stats["hits"], stats["misses"], stats["invalidations"], stats["size"]) == (1, 1, 1, 0)
+        assert stats["hit_rate"] == 0.5
+        assert stats["bytes"] == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from text_to_command.trigram_index import TrigramIndex, get_trigrams
+
+VARIANTS = ["send mail", "send email", "read mail", "start timer", "stop timer", "write note", "mail"]
+
+
+def get_dice(query: str, variant: str) -> float:
+    query_trigrams, variant_trigrams = get_trigrams(query), get_trigrams(variant)
+    return 2 * len(query_trigrams & variant_trigrams) / (len(query_trigrams) + len(variant_trigrams))
+
+
+class TestTrigramIndex:
+
+    def test_trigrams_are_padded(self):
+        assert get_trigrams("ab") == {"  a", " ab", "ab "}
+
+    @pytest.mark.parametrize("query", ["send mail", "sent a mail", "timer", "notes"])
+    @pytest.mark.parametrize("min_overlap", [0.1, 0.2, 0.5, 1.])
+    def test_shortlist_by_dice_threshold(self, query, min_overlap):
+        expected = [i for i, variant in enumerate(VARIANTS) if get_dice(query, variant) >= min_overlap]
+        assert TrigramIndex(VARIANTS).shortlist(query, min_overlap).tolist() == expected
+
+    def test_threshold_is_inclusive(self):
+        index = TrigramIndex(VARIANTS)
+        assert index.shortlist("mail", 1.).tolist() == [VARIANTS.index("mail")]
+        dice = get_dice("mail", "read mail")
+        assert VARIANTS.index("read mail") in index.shortlist("mail", dice).tolist()
+        assert VARIANTS.index("read mail") not in index.shortlist("mail", np.nextafter(dice, 1)).tolist()
+
+    def test_query_of_unknown_trigrams(self):
+        shortlist = TrigramIndex(VARIANTS).shortlist("xyz", 0.)
+        assert len(shortlist) == 0 and shortlist.dtype == np.intp
+
+    def test_empty_index(self):
+        index = TrigramIndex([])
+        assert len(index) == 0
+        assert len(index.shortlist("send mail")) == 0
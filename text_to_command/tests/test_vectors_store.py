@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from text_to_command.vectors_store import export_vectors, MmapWordVectors
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    return [f"word{i}" for i in range(100)], rng.normal(size=(100, 16)).astype(np.float32)
+
+
+class TestMmapWordVectors:
+    @pytest.mark.parametrize("dtype, atol", [("float32", 0), ("float16", 1e-2), ("int8", 5e-2)])
+    def test_doc_vector_is_average_with_zero_oov(self, tmp_path, table, dtype, atol):
+        words, vectors = table
+        export_vectors(words, vectors, str(tmp_path / "vectors"), dtype)
+        store = MmapWordVectors(str(tmp_path / "vectors"))
+
+        doc = store("word1 unknown word7")
+        assert len(doc) == 3 and doc.has_vector
+        assert np.allclose(doc.vector, (vectors[1] + vectors[7]) / 3, atol=atol)
+        assert np.allclose(doc[2:3].vector, vectors[7], atol=atol)
+
+    def test_pruning_keeps_top_n_and_kept_words(self, tmp_path, table):
+        words, vectors = table
+        rows = export_vectors(words, vectors, str(tmp_path / "vectors"), top_n=10, keep_words=["word50"])
+        store = MmapWordVectors(str(tmp_path / "vectors"))
+
+        assert rows == len(store) == 11
+        assert "word9" in store and "word50" in store and "word10" not in store
+        assert store.meta["name"] == "vectors_float32_top10"
+
+    def test_shared_rows_are_stored_once(self, tmp_path, table):
+        words, vectors = table
+        rows = export_vectors(["a", "A", "b"], vectors, str(tmp_path / "vectors"), word_rows=[3, 3, 4])
+        store = MmapWordVectors(str(tmp_path / "vectors"))
+
+        assert rows == 2 and len(store) == 3
+        assert np.array_equal(store("a").vector, store("A").vector)
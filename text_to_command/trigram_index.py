@@ -0,0 +1,46 @@
+from typing import Dict, List, Set
+
+import numpy as np
+
+
+def get_trigrams(s: str) -> Set[str]:
+    """Char trigrams of the string padded the same way as pg_trgm does: 2 spaces before and 1 after"""
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from char trigrams to variants.
+    ---
+    Used to shortlist variants that share enough trigrams with a query to be worth an exact edit distance:
+    a shortlist costs as much as the postings of the query trigrams, not as the whole catalog.
+    """
+    _postings: Dict[str, np.ndarray]  # trigram -> sorted ids of variants containing it
+    _trigrams_counts: np.ndarray  # number of distinct trigrams of each variant
+
+    def __init__(self, variants: List[str]):
+        postings = {}
+        counts = []
+        for i, variant in enumerate(variants):
+            trigrams = get_trigrams(variant)
+            counts.append(len(trigrams))
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(i)
+
+        self._postings = {trigram: np.asarray(ids, dtype=np.intp) for trigram, ids in postings.items()}
+        self._trigrams_counts = np.asarray(counts, dtype=np.intp)
+
+    def __len__(self):
+        return len(self._trigrams_counts)
+
+    def shortlist(self, query: str, min_overlap: float = 0.2) -> np.ndarray:
+        """Ids of variants with Dice coefficient of trigram sets >= min_overlap, sorted"""
+        trigrams = get_trigrams(query)
+        postings = [self._postings[t] for t in trigrams if t in self._postings]
+        if not postings:
+            return np.zeros(0, dtype=np.intp)
+
+        ids, shared = np.unique(np.concatenate(postings), return_counts=True)
+        overlap = 2 * shared / (len(trigrams) + self._trigrams_counts[ids])
+        return ids[overlap >= min_overlap]
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def get_vectors_files(path: str) -> Dict[str, str]:
+    """Files of a vectors store saved under path prefix: vectors table, int8 row scales and vocabulary"""
+    return {
+        "vectors": path + ".npy",
+        "scales": path + ".scales.npy",
+        "vocab": path + ".vocab.json"
+    }
+
+
+def export_vectors(
+        words: Sequence[str],
+        vectors: np.ndarray,
+        path: str,
+        dtype: str = "float32",
+        word_rows: Optional[Sequence[int]] = None,
+        keep_words: Optional[Iterable[str]] = None,
+        top_n: Optional[int] = None,
+        meta: Optional[dict] = None
+) -> int:
+    """
+    Saves vectors of words as a memory-mappable store, returns the number of stored rows.
+    ---
+    word_rows are rows of words in vectors (words share rows in pruned spaCy tables), by default i-th word has
+    i-th row. words should be ordered by frequency (as in spaCy and GloVe tables): with top_n only the top_n most
+    frequent words are stored together with keep_words (usually the tokens of the skills config).
+    int8 rows are stored with a per-row scale, so each row keeps its own precision.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype {dtype}, expected one of {DTYPES}.")
+    if word_rows is None:
+        word_rows = range(len(words))
+    # stores with other precision or vocabulary give other embeddings, so they get their own model identity
+    meta = dict(meta or {})
+    meta["name"] = f"{meta.get('name') or 'vectors'}_{dtype}" + (f"_top{top_n}" if top_n is not None else "")
+
+    keep_words = set(keep_words or [])
+    kept = [
+        (word, row) for i, (word, row) in enumerate(zip(words, word_rows))
+        if top_n is None or i < top_n or word in keep_words
+    ]
+    rows, positions = np.unique(np.asarray([row for _, row in kept], dtype=np.intp), return_inverse=True)
+    table = np.asarray(vectors[rows], dtype=np.float32)
+    files = get_vectors_files(path)
+
+    if dtype == "int8":
+        scales = np.abs(table).max(axis=1) / 127
+        scales[scales == 0] = 1
+        np.save(files["scales"], scales.astype(np.float32))
+        table = np.round(table / scales[:, None]).astype(np.int8)
+    elif os.path.exists(files["scales"]):
+        os.remove(files["scales"])
+    np.save(files["vectors"], table.astype(dtype))
+
+    with open(files["vocab"], 'w') as f:
+        json.dump({
+            "dtype": dtype,
+            "meta": meta,
+            "words": {word: int(position) for (word, _), position in zip(kept, positions)}
+        }, f)
+    return len(rows)
+
+
+def export_spacy_vectors(nlp: Any, path: str, **kwargs) -> int:
+    """Exports static vectors of a spaCy model, words are ordered by their row in the model table"""
+    vectors = nlp.vocab.vectors
+    keys = sorted(vectors.key2row.items(), key=lambda item: item[1])
+    meta = {key: nlp.meta.get(key) for key in ("lang", "name", "version")}
+    return export_vectors(
+        [nlp.vocab.strings[key] for key, _ in keys],
+        np.asarray(vectors.data),
+        path,
+        word_rows=[row for _, row in keys],
+        meta=meta,
+        **kwargs
+    )
+
+
+def tokenize(text: str) -> List[str]:
+    """Words and single punctuation marks, which matches spaCy tokenization of cleared strings"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class VectorsDoc:
+    """
+    Tokenized text with the subset of spaCy Doc interface the indexer and intent resolver use.
+    ---
+    vector is the average of token vectors, where tokens without a vector count as zeros, as in Doc.vector.
+    """
+    tokens: List[str]
+    _store: 'MmapWordVectors'
+    _rows: np.ndarray  # row of each token in the store, -1 for out of vocabulary tokens
+    _vector: Optional[np.ndarray]
+
+    def __init__(self, store: 'MmapWordVectors', tokens: List[str], rows: np.ndarray):
+        self.tokens = tokens
+        self._store = store
+        self._rows = rows
+        self._vector = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.tokens)
+
+    @property
+    def has_vector(self) -> bool:
+        return len(self._store) > 0
+
+    @property
+    def vector(self) -> np.ndarray:
+        if self._vector is None:
+            known = self._rows[self._rows >= 0]
+            self._vector = self._store.get_vectors(known).sum(axis=0) / max(len(self._rows), 1)
+        return self._vector
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __getitem__(self, item: slice) -> 'VectorsDoc':
+        if not isinstance(item, slice):
+            raise TypeError("Only slices of a doc are supported.")
+        return VectorsDoc(self._store, self.tokens[item], self._rows[item])
+
+
+class MmapWordVectors:
+    """
+    Static word vectors backend, used instead of a full spaCy model when only doc vectors are needed.
+    ---
+    The vectors table is memory-mapped, so loading takes milliseconds and the pages are shared
+    through the page cache by all processes using the same store.
+    """
+    dtype: str
+    meta: dict
+    pipe_names: List[str] = []
+
+    _words: Dict[str, int]
+    _vectors: np.ndarray
+    _scales: Optional[np.ndarray]
+
+    def __init__(self, path: str):
+        files = get_vectors_files(path)
+        with open(files["vocab"]) as f:
+            vocab = json.load(f)
+        self.dtype = vocab["dtype"]
+        self.meta = vocab["meta"]
+        self._words = vocab["words"]
+        self._vectors = np.load(files["vectors"], mmap_mode='r')
+        self._scales = np.load(files["scales"], mmap_mode='r') if self.dtype == "int8" else None
+
+    @property
+    def dim(self) -> int:
+        return self._vectors.shape[1]
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def get_vectors(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    def __call__(self, text: str, disable: Iterable[str] = ()) -> VectorsDoc:
+        tokens = tokenize(text)
+        rows = np.asarray([self._words.get(token, -1) for token in tokens], dtype=np.intp)
+        return VectorsDoc(self, tokens, rows)
+
+    def pipe(self, texts: Iterable[str], **kwargs) -> Iterable[VectorsDoc]:
+        """Same as nlp.pipe, batching and pipeline arguments are accepted and ignored"""
+        for text in texts:
+            yield self(text)